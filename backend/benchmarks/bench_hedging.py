@@ -0,0 +1,61 @@
+"""
+Tail latency of model calls with and without hedging.
+
+Runs the same number of calls against the fake backend with heavy-tailed
+latency (most calls near the median, slow_fraction of them slow_factor
+times slower), once plainly and once through a Hedger, and reports
+p50/p90/p99 plus the extra calls hedging spent. The latency tracker is
+warmed up first so the numbers reflect steady state.
+
+Usage: python -m benchmarks.bench_hedging [calls] [concurrency]
+"""
+import asyncio
+import random
+import sys
+import time
+from services.hedging import HEDGE_MAX_EXTRA_FRACTION, HEDGE_PERCENTILE, Hedger, LatencyTracker
+from services.model_backend import FakeBackend, heavy_tailed_latency
+
+
+def quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(hedger: Hedger, calls: int, concurrency: int, backend: FakeBackend):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await hedger.call("file", lambda: backend.generate("prompt", "fake", {}))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def run(calls: int = 2000, concurrency: int = 50, warmup: int = 200):
+    print(f"{'mode':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'calls':>8}{'extra':>8}")
+    for label, enabled in (("plain", False), ("hedged", True)):
+        random.seed(7)
+        backend = FakeBackend(latency=heavy_tailed_latency(median=0.02, slow_fraction=0.05, slow_factor=20))
+        hedger = Hedger(
+            enabled=False,
+            percentile=HEDGE_PERCENTILE,
+            max_extra_fraction=HEDGE_MAX_EXTRA_FRACTION,
+            tracker=LatencyTracker(min_samples=20)
+        )
+        asyncio.run(measure(hedger, warmup, concurrency, backend))
+        hedger.enabled = enabled
+        hedger.primary_calls = backend.calls = 0
+        latencies = asyncio.run(measure(hedger, calls, concurrency, backend))
+        extra = (backend.calls - calls) / calls * 100
+        print(f"{label:>10}{quantile(latencies, 0.5):>9.1f}{quantile(latencies, 0.9):>9.1f}"
+              f"{quantile(latencies, 0.99):>9.1f}{backend.calls:>8}{extra:>7.1f}%")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
@@ -0,0 +1,112 @@
+"""
+Event loop lag under generation load.
+
+Starts the app in-process with the fake model backend and runs concurrent
+generation sessions through POST /api/generate/stream while the loop
+monitor measures lag. Reports the lag histogram and every stall with the
+stack that blocked the loop. With --max-lag-ms the run fails (exit 1)
+when the worst lag exceeds the budget, so code that blocks the loop in
+services/ shows up as a failing benchmark.
+
+Usage: python -m benchmarks.bench_loop_lag [sessions] [concurrency] [--max-lag-ms N]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("TRAFFIC_CAPTURE_PATH", "")
+
+import main
+from services.loop_monitor import LAG_BUCKETS, loop_monitor
+from services.metrics import metrics
+
+PROMPTS = ["todo app with tags", "recipe catalog", "weather dashboard", "kanban board", "expense tracker"]
+
+
+async def stream_session(prompt: str) -> int:
+    """Run one SSE generation session through the ASGI app; returns the body size"""
+    body = json.dumps({"prompt": prompt}).encode()
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/generate/stream", "raw_path": b"/api/generate/stream",
+        "query_string": b"", "headers": [(b"content-type", b"application/json")],
+        "http_version": "1.1", "scheme": "http", "server": ("bench", 80), "client": ("bench", 1), "root_path": "",
+    }
+    received = False
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return size
+
+
+def quantile(buckets, count: int, q: float) -> str:
+    """Upper bound of the histogram bucket holding quantile q"""
+    seen = 0
+    for bound, n in zip(list(LAG_BUCKETS) + [float("inf")], buckets.values()):
+        seen += n
+        if seen >= q * count:
+            return f"<={bound:g}"
+    return "-"
+
+
+async def load(sessions: int, concurrency: int, model_latency: float) -> float:
+    main.api_key, main.MODEL_PRELOAD = "placeholder", False
+    async with main.lifespan(main.app):
+        main.websocket_handler.ado_generator.backend.latency = lambda: model_latency
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int):
+            async with semaphore:
+                await stream_session(f"{PROMPTS[i % len(PROMPTS)]} #{i}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(sessions)))
+        return time.perf_counter() - start
+
+
+def run(sessions: int = 200, concurrency: int = 10, max_lag_ms: float = 0, model_latency: float = 0.02) -> bool:
+    metrics.reset()
+    # Measure often enough for a short run to give a usable histogram
+    loop_monitor.interval = 0.005
+    elapsed = asyncio.run(load(sessions, concurrency, model_latency))
+    lag = metrics.snapshot()["summaries"].get("event_loop_lag_ms")
+    report = loop_monitor.report()
+
+    print(f"{sessions} sessions, {concurrency} at a time, in {elapsed:.2f}s")
+    if lag:
+        print(f"lag samples {lag['count']}, mean {lag['mean']:.1f}ms, "
+              f"p50 {quantile(lag['buckets'], lag['count'], 0.5)}ms, "
+              f"p99 {quantile(lag['buckets'], lag['count'], 0.99)}ms, max {lag['max']:.1f}ms")
+    print(f"stalls over {report['threshold_ms']:g}ms: {len(report['stalls'])}")
+    for stall in report["stalls"]:
+        print(f"  {stall['duration_ms']:>7.1f}ms  {' > '.join(stall['stack'][-4:]) or 'unknown'}")
+
+    if max_lag_ms and report["max_lag_ms"] > max_lag_ms:
+        print(f"❌ Max lag {report['max_lag_ms']}ms is over the {max_lag_ms:g}ms budget")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    budget = 0.0
+    if "--max-lag-ms" in args:
+        i = args.index("--max-lag-ms")
+        budget = float(args[i + 1])
+        del args[i:i + 2]
+    ok = run(*[int(a) for a in args], max_lag_ms=budget)
+    sys.exit(0 if ok else 1)
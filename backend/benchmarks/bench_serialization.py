@@ -0,0 +1,49 @@
+"""
+Benchmark ADO serialization: the old model_dump() + json.dumps path against
+the services.serialization byte path with per-ADO caching.
+
+One "turn" is what a generation or chat turn does with a single ADO: build
+the modification prompt, then send it in two events (ado_generated/finish
+or chat_response).
+
+Usage: python -m benchmarks.bench_serialization [num_files ...]
+"""
+import json
+import sys
+import time
+from services import serialization
+from benchmarks.fixtures import make_sample_ado
+
+
+def legacy_turn(ado):
+    json.dumps(ado.model_dump(), indent=2)
+    for event in ("ado_generated", "finish"):
+        json.dumps({"event": event, "ado": ado.model_dump(), "message": "done"}, separators=(",", ":"))
+
+
+def fast_turn(ado):
+    serialization.dumps(ado.model_dump(), indent=True)
+    for event in ("ado_generated", "finish"):
+        serialization.encode_event({"event": event, "ado": serialization.raw_ado(ado), "message": "done"})
+
+
+def timeit(fn, ado, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(ado)
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes, repeat: int = 20):
+    print(f"orjson available: {serialization.orjson is not None}")
+    print(f"{'files':>6}{'legacy ms/turn':>16}{'fast ms/turn':>14}{'speedup':>9}")
+    for num_files in sizes:
+        ado = make_sample_ado(num_files)
+        legacy = timeit(legacy_turn, ado, repeat)
+        serialization.invalidate(ado)
+        fast = timeit(fast_turn, ado, repeat)
+        print(f"{num_files:>6}{legacy * 1000:>16.2f}{fast * 1000:>14.2f}{legacy / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [50, 200])
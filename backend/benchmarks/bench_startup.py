@@ -0,0 +1,91 @@
+"""
+Cold-start time of the API.
+
+Measures, in fresh interpreters, how long importing main takes (and
+whether the model SDK came with it), then starts uvicorn and reports how
+long until /health/live answers and until /health/ready reports the model
+SDK loaded. A placeholder API key is used; no model call is made.
+
+Usage: python -m benchmarks.bench_startup [runs]
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ENV = dict(os.environ, GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", "placeholder"), MODEL_BACKEND="gemini")
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, int("google.generativeai" in sys.modules))
+"""
+
+EAGER_SCRIPT = """
+import time
+start = time.perf_counter()
+import main, google.generativeai
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def serve_once() -> tuple:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        live = wait_for(f"http://127.0.0.1:{port}/health/live", start + 30)
+        ready = wait_for(f"http://127.0.0.1:{port}/health/ready", start + 30)
+        return (live - start) * 1000, (ready - start) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def python(script: str) -> list:
+    out = subprocess.run([sys.executable, "-c", script], env=ENV, capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def run(runs: int = 5):
+    imports = [python(IMPORT_SCRIPT) for _ in range(runs)]
+    eager = [float(python(EAGER_SCRIPT)[0]) for _ in range(runs)]
+    served = [serve_once() for _ in range(runs)]
+
+    print(f"{'measure':>28}{'median ms':>12}")
+    print(f"{'import main':>28}{statistics.median(float(i[0]) for i in imports):>12.0f}")
+    print(f"{'import main + model SDK':>28}{statistics.median(eager):>12.0f}")
+    print(f"{'process start -> live':>28}{statistics.median(s[0] for s in served):>12.0f}")
+    print(f"{'process start -> ready':>28}{statistics.median(s[1] for s in served):>12.0f}")
+    print(f"model SDK imported by main: {'yes' if imports[0][1] == '1' else 'no'}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
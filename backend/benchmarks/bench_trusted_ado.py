@@ -0,0 +1,48 @@
+"""
+Micro-benchmark for trusted-path ADO construction.
+
+Per chat turn the server used to fully validate the client's current_ado,
+and a validate_ado request validated it again. With TrustedADOCache an ADO
+the server produced itself is recognised by its version hash instead.
+
+The last column is a top-level model_construct on the same data for
+reference. It is only that cheap because it does not recurse: files,
+components and dependencies stay plain dicts, so it is not usable for ADOs
+the rest of the pipeline reads by attribute.
+
+Usage: python -m benchmarks.bench_trusted_ado [num_files ...]
+"""
+import sys
+import time
+from schemas.application_definition import ApplicationDefinitionObject
+from services import serialization
+from services.trusted_ado import TrustedADOCache
+from benchmarks.fixtures import make_sample_ado
+
+
+def per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(sizes, repeat: int = 20):
+    print(f"{'files':>6}{'validate ms':>13}{'trusted ms':>12}{'saved/turn':>12}{'construct ms':>14}")
+    for num_files in sizes:
+        ado = make_sample_ado(num_files)
+        client_data = serialization.loads(serialization.ado_json(ado))
+        cache = TrustedADOCache()
+        cache.remember(ado)
+
+        validated = per_call(lambda: ApplicationDefinitionObject(**client_data), repeat)
+        trusted = per_call(lambda: cache.validate(client_data), repeat)
+        constructed = per_call(lambda: ApplicationDefinitionObject.model_construct(**client_data), repeat)
+
+        # A chat turn validates current_ado once; a validate_ado message once more
+        saved = 2 * (validated - trusted)
+        print(f"{num_files:>6}{validated:>13.2f}{trusted:>12.2f}{saved:>10.2f}ms{constructed:>14.2f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [50, 100, 200])
@@ -0,0 +1,53 @@
+"""
+Benchmark WebSocket event encodings: bytes on the wire and CPU per frame
+for the full event sequence of one generated project.
+
+permessage-deflate is simulated with a raw-deflate stream that keeps its
+context between messages (the default "context takeover" mode).
+
+Usage: python -m benchmarks.bench_ws_encoding [num_files]
+"""
+import sys
+import time
+import zlib
+from services.ws_codec import FramedCodec, JsonCodec, MsgpackCodec, msgpack, WS_DEFLATE_LEVEL
+from benchmarks.fixtures import make_sample_ado, generation_events
+
+
+def per_message_deflate(frames, level):
+    """Size of frames after permessage-deflate with context takeover"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    total = 0
+    for frame in frames:
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        out = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        total += len(out) - 4  # The trailing 00 00 ff ff is stripped on the wire
+    return total
+
+
+def run(num_files: int = 50, batch_size: int = 16):
+    ado = make_sample_ado(num_files)
+    events = list(generation_events(ado))
+
+    codecs = [JsonCodec(), FramedCodec(compress_level=0), FramedCodec()]
+    if msgpack is not None:
+        codecs.insert(1, MsgpackCodec())
+
+    print(f"📦 {num_files} files, {len(events)} events")
+    print(f"{'encoding':<18}{'frames':>8}{'raw bytes':>12}{'deflate bytes':>15}{'µs/frame':>10}")
+    for codec in codecs:
+        start = time.perf_counter()
+        if codec.batching:
+            frames = [codec.encode_batch(events[i:i + batch_size]) for i in range(0, len(events), batch_size)]
+        else:
+            frames = [codec.encode(event) for event in events]
+        elapsed = time.perf_counter() - start
+
+        raw = sum(len(f.encode("utf-8")) if isinstance(f, str) else len(f) for f in frames)
+        label = codec.name if not codec.batching else f"{codec.name}(z{codec.compress_level})"
+        deflated = per_message_deflate(frames, WS_DEFLATE_LEVEL)
+        print(f"{label:<18}{len(frames):>8}{raw:>12}{deflated:>15}{elapsed / len(frames) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
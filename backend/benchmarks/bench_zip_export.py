@@ -0,0 +1,65 @@
+"""
+Benchmark the streaming ZIP export: throughput and peak memory against
+building the whole archive in a BytesIO, plus aggregate throughput with
+several concurrent downloads (StreamingResponse drains sync iterators in
+the threadpool, so threads model concurrent clients).
+
+Usage: python -m benchmarks.bench_zip_export [num_files] [concurrency]
+"""
+import io
+import sys
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from services.zip_export import stream_zip
+from benchmarks.fixtures import make_sample_ado
+
+
+def project_files(num_files: int):
+    ado = make_sample_ado(num_files)
+    # Make file contents distinct so the compressor cannot cheat across files
+    return [(f.path, f.content + f"\n// {f.path}\n" + "/* padding */\n" * 200) for f in ado.files]
+
+
+def buffered_zip(files) -> int:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, content in files:
+            archive.writestr(f"project/{path}", content)
+    return len(buffer.getvalue())
+
+
+def streamed_zip(files) -> int:
+    return sum(len(chunk) for chunk in stream_zip(files))
+
+
+def measure(fn, files):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn(files)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def run(num_files: int = 1000, concurrency: int = 8):
+    files = project_files(num_files)
+    raw = sum(len(content) for _, content in files)
+    print(f"📦 {num_files} files, {raw / 1e6:.1f} MB uncompressed")
+    print(f"{'mode':<10}{'zip MB':>8}{'MB/s':>8}{'peak MB':>9}")
+    for name, fn in (("buffered", buffered_zip), ("streamed", streamed_zip)):
+        size, elapsed, peak = measure(fn, files)
+        print(f"{name:<10}{size / 1e6:>8.2f}{raw / 1e6 / elapsed:>8.1f}{peak / 1e6:>9.2f}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: streamed_zip(files), range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"{concurrency} concurrent downloads: {concurrency * raw / 1e6 / elapsed:.1f} MB/s aggregate")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
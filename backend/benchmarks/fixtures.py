@@ -0,0 +1,124 @@
+"""
+Synthetic projects shared by the offline benchmarks
+"""
+from schemas.application_definition import (
+    ApplicationDefinitionObject,
+    ComponentDefinition,
+    ComponentProp,
+    ComponentType,
+    Dependency,
+    FileDefinition,
+    FileType,
+    RouteDefinition
+)
+
+COMPONENT_TEMPLATE = """import React, {{ useState, useEffect }} from 'react';
+import {{ motion }} from 'framer-motion';
+
+export default function {name}({{ title, items = [], onSelect }}) {{
+  const [selected, setSelected] = useState(null);
+  const [query, setQuery] = useState('');
+
+  useEffect(() => {{
+    if (selected && onSelect) {{
+      onSelect(selected);
+    }}
+  }}, [selected, onSelect]);
+
+  const filtered = items.filter((item) =>
+    item.name.toLowerCase().includes(query.toLowerCase())
+  );
+
+  return (
+    <motion.section className="p-6 bg-white rounded-lg shadow-md dark:bg-gray-800">
+      <h2 className="text-xl font-semibold text-gray-900 dark:text-white">{{title}}</h2>
+      <input
+        className="mt-4 w-full rounded border border-gray-300 px-3 py-2"
+        placeholder="Search {lower}..."
+        value={{query}}
+        onChange={{(e) => setQuery(e.target.value)}}
+      />
+      <ul className="mt-4 space-y-2">
+        {{filtered.map((item) => (
+          <li
+            key={{item.id}}
+            className="flex items-center justify-between rounded px-3 py-2 hover:bg-gray-100"
+            onClick={{() => setSelected(item)}}
+          >
+            <span>{{item.name}}</span>
+            <span className="text-sm text-gray-500">{{item.detail}}</span>
+          </li>
+        ))}}
+      </ul>
+    </motion.section>
+  );
+}}
+"""
+
+
+def make_sample_ado(num_files: int = 50, with_content: bool = True) -> ApplicationDefinitionObject:
+    """Build a React project ADO with num_files files"""
+    files = [
+        FileDefinition(
+            path="package.json",
+            type=FileType.JSON,
+            content='{"name": "sample-app", "dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0"}}' if with_content else "",
+            description="Package configuration"
+        )
+    ]
+    components = []
+    routes = []
+
+    for i in range(num_files - 1):
+        name = f"Feature{i}Panel"
+        path = f"src/components/{name}.jsx"
+        files.append(FileDefinition(
+            path=path,
+            type=FileType.JSX,
+            content=COMPONENT_TEMPLATE.format(name=name, lower=name.lower()) if with_content else "",
+            description=f"Panel for feature {i}",
+            component=name
+        ))
+        components.append(ComponentDefinition(
+            name=name,
+            type=ComponentType.FUNCTIONAL,
+            file_path=path,
+            props=[
+                ComponentProp(name="title", type="string", required=True, description="Panel title"),
+                ComponentProp(name="items", type="array", default_value=[], description="Items to list"),
+                ComponentProp(name="onSelect", type="function", description="Selection callback"),
+            ],
+            imports=["react", "framer-motion"],
+            exports=["default"],
+            description=f"Feature {i} panel"
+        ))
+        routes.append(RouteDefinition(path=f"/feature-{i}", component=name))
+
+    return ApplicationDefinitionObject(
+        name="sample-app",
+        description="Synthetic benchmark project",
+        files=files,
+        components=components,
+        routes=routes,
+        dependencies=[
+            Dependency(name="react", version="^18.2.0"),
+            Dependency(name="react-dom", version="^18.2.0"),
+            Dependency(name="framer-motion", version="^10.16.0"),
+            Dependency(name="tailwindcss", version="^3.3.0", dev=True),
+        ]
+    )
+
+
+def generation_events(ado: ApplicationDefinitionObject, chunk_size: int = 100):
+    """The event sequence handle_generate_stream emits for an ADO"""
+    yield {"event": "status", "message": "🧠 Analyzing requirements and creating application structure..."}
+    yield {"event": "ado_generated", "ado": ado.model_dump(mode="json"), "message": f"📋 Created application definition with {len(ado.files)} files"}
+    yield {"event": "structure_generated", "files": [f.path for f in ado.files]}
+    yield {"event": "status", "message": "⚡ Generating code files..."}
+    total = len(ado.files)
+    for i, file_def in enumerate(ado.files):
+        yield {"event": "file_start", "path": file_def.path, "description": file_def.description}
+        for j in range(0, len(file_def.content), chunk_size):
+            yield {"event": "code_chunk", "path": file_def.path, "chunk": file_def.content[j:j + chunk_size]}
+        yield {"event": "file_end", "path": file_def.path, "progress": ((i + 1) / total) * 100}
+    yield {"event": "finish", "message": "✅ Application generated successfully!", "ado": ado.model_dump(mode="json")}
@@ -0,0 +1,233 @@
+"""
+Replay a traffic capture against a local instance.
+
+Requests from a capture (TRAFFIC_CAPTURE_PATH) are sent at their recorded
+offsets divided by --speed: each /ws/generate-stream request on its own
+socket until a terminal event, /ws/chat messages on one socket per
+recorded connection, /api/generate as HTTP posts. With --serve a local
+uvicorn is started whose model backend answers from the same capture at
+the same speed, so nothing reaches the live API. Reports per-endpoint
+outcomes, latency and how far sends slipped behind schedule.
+
+Usage: python -m benchmarks.replay_traffic capture.jsonl [--speed 10] [--serve | --url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from typing import Any, Dict, List
+import websockets
+
+GENERATE_TERMINAL = {"finish", "error", "cancelled", "rejected"}
+CHAT_TERMINAL = {"chat_response", "error", "rejected", "turn_cancelled"}
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    requests = [e for e in entries if e.get("kind") == "request"]
+    return sorted(requests, key=lambda e: e["t"])
+
+
+def quantile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Replay:
+    def __init__(self, base_url: str, speed: float):
+        self.base_url = base_url.rstrip("/")
+        self.ws_url = "ws" + self.base_url[4:]
+        self.speed = speed
+        self.results: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.slips: List[float] = []
+        self.origin = 0.0
+
+    def _query(self, entry) -> str:
+        return "?" + urllib.parse.urlencode({"tenant": entry["tenant"]}) if entry.get("tenant") else ""
+
+    async def _at(self, offset: float):
+        """Sleep until a recorded offset on the scaled clock; records the slip"""
+        due = self.origin + offset / self.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.slips.append(max(0.0, time.perf_counter() - due) * 1000)
+
+    async def generate_stream(self, entry):
+        await self._at(entry["t"])
+        start = time.perf_counter()
+        outcome = "closed"
+        async with websockets.connect(self.ws_url + "/ws/generate-stream" + self._query(entry), max_size=None) as ws:
+            await ws.send(json.dumps(entry["payload"]))
+            async for message in ws:
+                event = json.loads(message).get("event")
+                if event in GENERATE_TERMINAL:
+                    outcome = event
+                    break
+        self.results["/ws/generate-stream"].append({"outcome": outcome, "ms": (time.perf_counter() - start) * 1000})
+
+    async def chat(self, entries):
+        await self._at(entries[0]["t"])
+        sent: Dict[Any, float] = {}
+        async with websockets.connect(self.ws_url + "/ws/chat" + self._query(entries[0]), max_size=None) as ws:
+            async def receive():
+                async for message in ws:
+                    reply = json.loads(message)
+                    turn_id = reply.get("turn_id")
+                    if reply.get("type") in CHAT_TERMINAL and turn_id in sent:
+                        self.results["/ws/chat"].append({
+                            "outcome": reply["type"],
+                            "ms": (time.perf_counter() - sent.pop(turn_id)) * 1000
+                        })
+                    if not sent and done_sending.is_set():
+                        return
+
+            done_sending = asyncio.Event()
+            receiver = asyncio.create_task(receive())
+            for index, entry in enumerate(entries):
+                await self._at(entry["t"])
+                payload = dict(entry["payload"])
+                if payload.get("type") == "chat_message":
+                    # Tag turns so replies can be matched to their message
+                    payload["turn_id"] = payload.get("turn_id") or f"replay-{index}"
+                    sent[payload["turn_id"]] = time.perf_counter()
+                await ws.send(json.dumps(payload))
+            done_sending.set()
+            if sent:
+                await receiver
+            receiver.cancel()
+
+    async def rest_generate(self, entry):
+        await self._at(entry["t"])
+        start = time.perf_counter()
+
+        def post():
+            request = urllib.request.Request(
+                self.base_url + "/api/generate" + self._query(entry),
+                data=json.dumps(entry["payload"]).encode("utf-8"),
+                headers={"Content-Type": "application/json"}
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=600) as response:
+                    return "ok" if json.loads(response.read()).get("success") else "error"
+            except urllib.error.HTTPError as e:
+                return "rejected" if e.code == 503 else f"http_{e.code}"
+
+        outcome = await asyncio.to_thread(post)
+        self.results["/api/generate"].append({"outcome": outcome, "ms": (time.perf_counter() - start) * 1000})
+
+    async def _guard(self, coroutine, endpoint: str):
+        try:
+            await coroutine
+        except Exception as e:
+            self.results[endpoint].append({"outcome": type(e).__name__, "ms": 0.0})
+
+    async def run(self, requests: List[Dict[str, Any]]):
+        chats = defaultdict(list)
+        tasks = []
+        self.origin = time.perf_counter() - requests[0]["t"] / self.speed if requests else 0.0
+        for entry in requests:
+            endpoint = entry["endpoint"]
+            if endpoint == "/ws/chat":
+                chats[entry.get("connection")].append(entry)
+            elif endpoint == "/ws/generate-stream":
+                tasks.append(self._guard(self.generate_stream(entry), endpoint))
+            elif endpoint == "/api/generate":
+                tasks.append(self._guard(self.rest_generate(entry), endpoint))
+        tasks += [self._guard(self.chat(entries), "/ws/chat") for entries in chats.values()]
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float, recorded: float):
+        print(f"replayed {recorded:.1f}s of traffic in {elapsed:.1f}s at {self.speed:g}x")
+        print(f"{'endpoint':>22}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}  outcomes")
+        for endpoint, results in sorted(self.results.items()):
+            latencies = [r["ms"] for r in results if r["ms"]]
+            outcomes = defaultdict(int)
+            for r in results:
+                outcomes[r["outcome"]] += 1
+            print(f"{endpoint:>22}{len(results):>7}{quantile(latencies, 0.5):>9.0f}{quantile(latencies, 0.95):>9.0f}  {dict(outcomes)}")
+        print(f"send slip behind schedule: p50 {quantile(self.slips, 0.5):.1f} ms, max {max(self.slips, default=0):.1f} ms")
+
+    def report_model_matches(self):
+        """How the server's replay backend matched prompts to the capture"""
+        try:
+            with urllib.request.urlopen(self.base_url + "/metrics", timeout=5) as response:
+                snapshot = json.loads(response.read())
+            counters = snapshot["counters"]
+        except (urllib.error.URLError, OSError, KeyError):
+            return
+        matched = {k: int(v) for k, v in counters.items() if k.startswith("replay_model_calls")}
+        if matched:
+            print(f"replay backend answers: {matched}")
+        reuse = snapshot.get("prompt_reuse")
+        if reuse and reuse["lookups"]:
+            print(f"prompt reuse: hit rate {reuse['hit_rate']:.0%} ({reuse['reused']} reused, "
+                  f"{reuse['adapted']} adapted), ~{reuse['saved_ms'] / 1000:.1f}s of ADO generation saved")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(capture: str, speed: float):
+    """Local instance whose model backend answers from the capture"""
+    port = free_port()
+    env = dict(os.environ, MODEL_BACKEND="replay", MODEL_REPLAY_PATH=capture,
+               MODEL_REPLAY_SPEED=str(speed), MODEL_PRELOAD="0", TRAFFIC_CAPTURE_PATH="")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + "/health/live", timeout=0.5).close()
+            return server, url
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.05)
+    server.terminate()
+    raise TimeoutError("local instance did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression, e.g. 1, 10 or 100")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", action="store_true", help="start a local replay-backed instance")
+    args = parser.parse_args()
+
+    requests = load_requests(args.capture)
+    server = None
+    if args.serve:
+        server, args.url = serve(args.capture, args.speed)
+    try:
+        replay = Replay(args.url, args.speed)
+        elapsed = asyncio.run(replay.run(requests))
+        recorded = requests[-1]["t"] - requests[0]["t"] if requests else 0.0
+        replay.report(elapsed, recorded)
+        replay.report_model_matches()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
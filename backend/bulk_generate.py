@@ -0,0 +1,49 @@
+"""
+Generate many applications offline, e.g. to pre-generate the gallery catalog.
+
+Input is JSONL, one GenerationRequest per line (optional "id" field); output
+is JSONL, one result per line. Rerunning with the same output file resumes
+an interrupted run: items that already succeeded are skipped.
+
+Usage: python bulk_generate.py requests.jsonl results.jsonl [--workers 4] [--rate 60]
+"""
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.ado_generator import ADOGenerator
+from services.bulk_generation import BULK_RATE_PER_MINUTE, BULK_WORKERS, BulkRunner
+from services.model_backend import MODEL_BACKEND
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk application generation (JSONL in, JSONL out)")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="items generated at once")
+    parser.add_argument("--rate", type=float, default=BULK_RATE_PER_MINUTE, help="model calls per minute, 0 for no limit")
+    parser.add_argument("--no-batch-files", action="store_true", help="one model call per file")
+    parser.add_argument("--accept-fallbacks", action="store_true", help="count template or stub results as successes")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if MODEL_BACKEND == "gemini" and not api_key:
+        raise SystemExit("GOOGLE_API_KEY environment variable not set.")
+
+    runner = BulkRunner(
+        ADOGenerator(api_key),
+        workers=args.workers,
+        rate_per_minute=args.rate,
+        batch_files=not args.no_batch_files,
+        accept_fallbacks=args.accept_fallbacks
+    )
+    summary = asyncio.run(runner.run(args.input, args.output))
+    if summary["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
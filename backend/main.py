@@ -1,31 +1,107 @@
-from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import google.generativeai as genai
 import os
 import json
 import time
 import hashlib
+import hmac
 import asyncio
-from google.api_core.exceptions import ResourceExhausted, GoogleAPIError
 from dotenv import load_dotenv
-from typing import Dict, Any
-from services.websocket_handler import EnhancedWebSocketHandler
-from schemas.application_definition import GenerationRequest, GenerationResponse
+from typing import Dict, Any, List, Optional, Set
 
-# Load environment variables from .env
+# Load environment variables from .env before services read their settings
 load_dotenv()
 
-# Configure the Gemini API key
+from services.websocket_handler import EnhancedWebSocketHandler
+from services.metrics import metrics
+from services.model_backend import MODEL_BACKEND
+from services.model_router import model_router
+from services.fallbacks import template_summaries
+from services.admission import admission, degraded_mode
+from services.tenancy import current_tenant, tenants
+from services.serialization import FastJSONResponse
+from services.traffic_capture import MODEL_REPLAY_PATH, traffic_recorder
+from services.sse import SSE_ABANDON_AFTER, cancel_when_abandoned, parse_event_id, session_stream
+from services.profiler import profiler
+from services.prompt_reuse import prompt_index
+from services.loop_monitor import LOOP_MONITOR, loop_monitor
+from services.zip_export import stream_zip, archive_name
+from schemas.application_definition import GenerationRequest, GenerationResponse, ApplicationDefinitionObject
+
+# Load the model SDK in the background right after startup ("0" to load on first use)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"
+
 api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
+# Token for the /admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Created at startup, once the configuration is known to be valid
+websocket_handler: Optional[EnhancedWebSocketHandler] = None
+ready = asyncio.Event()
+# Tasks cancelling abandoned SSE sessions, referenced until they finish
+_watchdogs: Set[asyncio.Task] = set()
+
+
+def config_problems(api_key: Optional[str], backend: str = MODEL_BACKEND) -> List[str]:
+    """Configuration errors that would stop the app from serving requests"""
+    problems = []
+    if backend not in ("gemini", "fake", "replay"):
+        problems.append(f"MODEL_BACKEND must be 'gemini', 'fake' or 'replay', got {backend!r}")
+    if backend == "gemini" and not api_key:
+        problems.append("GOOGLE_API_KEY environment variable not set.")
+    if backend == "replay" and not os.path.isfile(MODEL_REPLAY_PATH):
+        problems.append(f"MODEL_REPLAY_PATH must name a traffic capture, got {MODEL_REPLAY_PATH!r}")
+    return problems
+
+
+async def _preload_backend(backend):
+    """Import the model SDK off the event loop, then mark the replica ready"""
+    start = time.perf_counter()
+    try:
+        if hasattr(backend, "load"):
+            await asyncio.to_thread(backend.load)
+            print(f"📦 Model SDK loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+        ready.set()
+    except Exception as e:
+        print(f"❌ Model SDK failed to load: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate configuration and build the handler; the model SDK loads lazily"""
+    global websocket_handler
+    problems = config_problems(api_key)
+    if problems:
+        raise RuntimeError("Invalid configuration: " + "; ".join(problems))
+    
+    websocket_handler = EnhancedWebSocketHandler(api_key)
+    if LOOP_MONITOR:
+        loop_monitor.start()
+    ready.clear()
+    preload = None
+    if MODEL_PRELOAD:
+        preload = asyncio.create_task(_preload_backend(websocket_handler.ado_generator.backend))
+    else:
+        ready.set()
+    try:
+        yield
+    finally:
+        if preload is not None:
+            preload.cancel()
+        await loop_monitor.stop()
+        await websocket_handler.bus.close()
+        traffic_recorder.close()
+
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="Enhanced AI Code Generation API",
     description="An advanced API to generate and modify full project structures using Application Definition Objects (ADO).",
-    version="4.0.0"
+    version="4.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS Middleware ---
@@ -37,34 +113,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize enhanced WebSocket handler
-websocket_handler = EnhancedWebSocketHandler(api_key)
-
 @app.websocket("/ws/generate-stream")
 async def websocket_generate_stream(ws: WebSocket):
     """Enhanced real-time streaming experience for project generation using ADO."""
     await websocket_handler.handle_generate_stream(ws)
 
+@app.websocket("/ws/sessions/{session_id}")
+async def websocket_session(ws: WebSocket, session_id: str):
+    """Follow (or resume, with ?from=<seq>) a generation session from any replica"""
+    await websocket_handler.handle_attach(ws, session_id)
+
 @app.websocket("/ws/chat")
 async def websocket_chat(ws: WebSocket):
     """Enhanced conversational AI chat for modifying projects using ADO."""
     await websocket_handler.handle_chat(ws)
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving; does not touch the model SDK"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Configuration is valid and the model SDK is loaded"""
+    if websocket_handler is None or not ready.is_set():
+        raise HTTPException(status_code=503, detail="Starting up")
+    return {"status": "ready"}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify API key and quota status."""
+    model = None
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
+        route = model_router.route("health")
+        model = route.model
         generation_config = {
             "temperature": 0.1,
-            "max_output_tokens": 100,
+            "max_output_tokens": route.max_output_tokens,
         }
-        response = model.generate_content("Say 'API is working'", generation_config=generation_config)
+        response = await websocket_handler.ado_generator.backend.generate(
+            "Say 'API is working'", route.model, generation_config
+        )
         return {
             "status": "healthy",
             "api_key_status": "valid",
             "quota_status": "available",
-            "model": "gemini-2.5-flash",
+            "model": route.model,
             "message": response.text if hasattr(response, 'text') else "API working",
             "features": {
                 "ado_support": True,
@@ -78,7 +172,7 @@ async def health_check():
             "status": "error",
             "api_key_status": "unknown",
             "quota_status": "unknown",
-            "model": "gemini-2.5-flash",
+            "model": model,
             "message": str(e),
             "features": {
                 "ado_support": False,
@@ -88,49 +182,45 @@ async def health_check():
             }
         }
 
+@app.get("/metrics")
+async def get_metrics(http_request: Request):
+    """In-process counters, gauges and latency summaries; per-tenant series need the admin token"""
+    return {
+        **metrics.snapshot(exclude_labels=() if _is_admin(http_request) else ("tenant",)),
+        "model_tiers": model_router.snapshot(),
+        "admission": admission.snapshot(),
+        "prompt_reuse": prompt_index.snapshot()
+    }
+
+@app.get("/api/usage")
+async def get_usage(http_request: Request):
+    """Per-tenant sessions, model calls, tokens and latency"""
+    _require_admin(http_request)
+    return {"tenants": tenants.usage()}
+
 @app.get("/api/templates")
 async def get_templates():
     """Get available application templates"""
-    templates = [
-        {
-            "id": "todo-app",
-            "name": "Todo Application",
-            "description": "A modern todo app with categories, due dates, and local storage",
-            "tags": ["productivity", "react", "localStorage"]
-        },
-        {
-            "id": "ecommerce-catalog",
-            "name": "E-commerce Catalog",
-            "description": "Product catalog with filtering, search, and shopping cart",
-            "tags": ["ecommerce", "react", "shopping"]
-        },
-        {
-            "id": "blog-platform",
-            "name": "Blog Platform",
-            "description": "Personal blog with markdown support and responsive design",
-            "tags": ["blog", "markdown", "cms"]
-        },
-        {
-            "id": "weather-dashboard",
-            "name": "Weather Dashboard",
-            "description": "Weather dashboard with multiple cities and forecasts",
-            "tags": ["weather", "api", "dashboard"]
-        },
-        {
-            "id": "portfolio-site",
-            "name": "Portfolio Website",
-            "description": "Personal portfolio with project showcase and contact form",
-            "tags": ["portfolio", "showcase", "professional"]
-        }
-    ]
+    templates = template_summaries()
     return {"templates": templates}
 
 @app.post("/api/generate")
-async def generate_application(request: GenerationRequest):
+async def generate_application(request: GenerationRequest, http_request: Request):
     """Generate application using ADO (for non-WebSocket clients)"""
+    tenant = tenants.identify(http_request.scope, http_request.query_params)
+    traffic_recorder.record_request("/api/generate", request.model_dump(mode="json"), tenant=tenant)
+    decision = admission.admit("rest", tenant=tenant)
+    if not decision.admitted:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy ({decision.reason}), please retry shortly.",
+            headers={"Retry-After": str(int(decision.retry_after))}
+        )
+    tenant_token = current_tenant.set(tenant)
+    token = degraded_mode.set(decision.degraded)
+    profile = profiler.start("/api/generate") if profiler.requested(http_request.scope, http_request.query_params) else None
     try:
-        from services.ado_generator import ADOGenerator
-        generator = ADOGenerator(api_key)
+        generator = websocket_handler.ado_generator
         
         # Generate ADO
         ado = await generator.generate_ado_from_prompt(request)
@@ -138,18 +228,181 @@ async def generate_application(request: GenerationRequest):
         # Generate files
         files = await generator.generate_files_from_ado(ado)
         
-        return GenerationResponse(
+        return FastJSONResponse(GenerationResponse(
             success=True,
             ado=ado,
             files=files
-        )
+        ))
         
     except Exception as e:
-        return GenerationResponse(
+        return FastJSONResponse(GenerationResponse(
             success=False,
             errors=[str(e)]
+        ))
+    finally:
+        profiler.finish(profile)
+        degraded_mode.reset(token)
+        current_tenant.reset(tenant_token)
+        admission.release(tenant)
+
+def _is_admin(http_request: Request) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(http_request.headers.get("x-admin-token", ""), ADMIN_TOKEN)
+
+def _require_admin(http_request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not _is_admin(http_request):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float  # fraction of sessions profiled without an X-Profile flag
+
+@app.get("/admin/profiling")
+async def get_profiling(http_request: Request):
+    """Profiling settings and the profiles on disk"""
+    _require_admin(http_request)
+    return {"sample_rate": profiler.sample_rate, "profiles": profiler.list()}
+
+@app.post("/admin/profiling")
+async def set_profiling(settings: ProfilingSettings, http_request: Request):
+    """Turn sampled profiling on (sample_rate > 0) or off at runtime"""
+    _require_admin(http_request)
+    profiler.sample_rate = min(max(settings.sample_rate, 0.0), 1.0)
+    return {"sample_rate": profiler.sample_rate}
+
+@app.get("/admin/profiles")
+async def list_profiles(http_request: Request):
+    """Profiles on disk, newest first"""
+    _require_admin(http_request)
+    return {"profiles": profiler.list()}
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, http_request: Request):
+    """A profile as collapsed stacks (flamegraph.pl, speedscope)"""
+    _require_admin(http_request)
+    path = profiler.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
+@app.get("/admin/loop")
+async def loop_report(http_request: Request):
+    """Event loop lag and the recent stalls, with the stack that blocked the loop"""
+    _require_admin(http_request)
+    return loop_monitor.report()
+
+def _sse_response(session_id: str, start: int = 0) -> StreamingResponse:
+    return StreamingResponse(
+        session_stream(websocket_handler.bus, session_id, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _resume_sse(last_event_id: Optional[str], expected_session: Optional[str] = None) -> StreamingResponse:
+    resume = parse_event_id(last_event_id)
+    if resume is None or (expected_session and resume[0] != expected_session):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    session_id, seq = resume
+    if await websocket_handler.bus.get_state(f"session:{session_id}") is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return _sse_response(session_id, seq + 1)
+
+@app.post("/api/generate/stream")
+async def generate_application_stream(http_request: Request):
+    """
+    Stream generation over Server-Sent Events, for clients whose proxies
+    break WebSockets. Emits the same events as /ws/generate-stream; each
+    event id is "<session_id>:<seq>". Repeating the POST with a
+    Last-Event-ID header resumes the session instead of starting a new one.
+    """
+    last_event_id = http_request.headers.get("last-event-id")
+    if last_event_id:
+        return await _resume_sse(last_event_id)
+    
+    try:
+        data = await http_request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be JSON")
+    if not isinstance(data, dict) or not data.get("prompt"):
+        raise HTTPException(status_code=400, detail="Prompt is required.")
+    
+    tenant = tenants.identify(http_request.scope, http_request.query_params)
+    traffic_recorder.record_request("/api/generate/stream", data, tenant=tenant)
+    decision = admission.admit("sse", tenant=tenant)
+    if not decision.admitted:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is busy ({decision.reason}), please retry shortly.",
+            headers={"Retry-After": str(int(decision.retry_after))}
         )
+    
+    profile = None
+    if profiler.requested(http_request.scope, http_request.query_params):
+        profile = profiler.start("/api/generate/stream", include_current=False)
+    # The session outlives a dropped connection so the client can resume it
+    try:
+        publisher, generation = await websocket_handler.start_generation(data, tenant, decision.degraded, resumable=True)
+    except BaseException:
+        admission.release(tenant)
+        profiler.finish(profile)
+        raise
+    generation.add_done_callback(lambda _: admission.release(tenant))
+    if profile is not None:
+        profile.root = generation
+        generation.add_done_callback(lambda _: profiler.finish(profile))
+    if SSE_ABANDON_AFTER > 0:
+        session_id = publisher.session_id
+        watchdog = asyncio.create_task(cancel_when_abandoned(
+            websocket_handler.bus, session_id, generation,
+            lambda: websocket_handler.cancel_generation(session_id, "No client is following the session.")
+        ))
+        _watchdogs.add(watchdog)
+        watchdog.add_done_callback(_watchdogs.discard)
+    return _sse_response(publisher.session_id)
+
+@app.post("/api/generate/stream/{session_id}/cancel")
+async def cancel_generation_stream(session_id: str):
+    """Abort a session started on this server; followers receive a cancelled event"""
+    if not await websocket_handler.cancel_generation(session_id):
+        raise HTTPException(status_code=404, detail="No running session with this id")
+    return {"success": True, "session_id": session_id}
+
+@app.get("/api/generate/stream/{session_id}")
+async def follow_generation_stream(session_id: str, http_request: Request):
+    """Follow a session over SSE; EventSource reconnects resume via Last-Event-ID"""
+    last_event_id = http_request.headers.get("last-event-id")
+    if last_event_id:
+        return await _resume_sse(last_event_id, session_id)
+    if await websocket_handler.bus.get_state(f"session:{session_id}") is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return _sse_response(session_id)
+
+def _zip_response(files, name: str) -> StreamingResponse:
+    root = archive_name(name)
+    return StreamingResponse(
+        stream_zip(files, root=root),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{root}.zip"'}
+    )
+
+@app.get("/api/projects/{project_id}/export.zip")
+async def export_project(project_id: str, version: Optional[int] = None):
+    """Stream a ZIP of a stored project version (latest by default)"""
+    store = websocket_handler.project_store
+    project_version = store.get(project_id, version) if version else store.latest(project_id)
+    if project_version is None:
+        raise HTTPException(status_code=404, detail="Project or version not found")
+    
+    # Resolve contents now: undo or eviction may release the blobs while the ZIP streams
+    files = store.files(project_version)
+    return _zip_response(files.items(), project_version.ado.name)
+
+@app.post("/api/export.zip")
+async def export_ado(ado: ApplicationDefinitionObject):
+    """Stream a ZIP built from the files of a posted ADO"""
+    return _zip_response(((f.path, f.content) for f in ado.files), ado.name)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from services.ws_codec import tuned_deflate_protocol
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws=tuned_deflate_protocol())
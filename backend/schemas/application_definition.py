@@ -92,6 +92,7 @@ class FileDefinition(BaseModel):
     content: str
     description: Optional[str] = None
     component: Optional[str] = None  # If file contains a component
+    content_hash: Optional[str] = None  # sha256 of content, set when a version is stored
 
 class ApplicationDefinitionObject(BaseModel):
     """
@@ -0,0 +1,140 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel
+from services.metrics import metrics
+from services.tenancy import TenantRegistry, tenants
+
+# Generations (streams, chat turns, REST calls) running at once
+ADMISSION_SOFT_SESSIONS = int(os.getenv("ADMISSION_SOFT_SESSIONS", "32"))
+ADMISSION_HARD_SESSIONS = int(os.getenv("ADMISSION_HARD_SESSIONS", "64"))
+# Model calls waiting or in flight
+ADMISSION_SOFT_MODEL_QUEUE = int(os.getenv("ADMISSION_SOFT_MODEL_QUEUE", "48"))
+ADMISSION_HARD_MODEL_QUEUE = int(os.getenv("ADMISSION_HARD_MODEL_QUEUE", "128"))
+# Seconds a rejected client is told to wait before retrying
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+# Set for work admitted past a soft limit; read by the generator and router
+degraded_mode: ContextVar[bool] = ContextVar("degraded_mode", default=False)
+
+
+def is_degraded() -> bool:
+    return degraded_mode.get()
+
+
+class AdmissionLevel(str, Enum):
+    NORMAL = "normal"
+    DEGRADED = "degraded"
+    REJECTED = "rejected"
+
+
+class AdmissionDecision(BaseModel):
+    level: AdmissionLevel
+    reason: Optional[str] = None
+    retry_after: Optional[float] = None
+
+    @property
+    def admitted(self) -> bool:
+        return self.level != AdmissionLevel.REJECTED
+
+    @property
+    def degraded(self) -> bool:
+        return self.level == AdmissionLevel.DEGRADED
+
+
+class AdmissionController:
+    """
+    Admit, degrade or reject new generations based on current load.
+
+    Load is the number of admitted sessions plus the model-call queue
+    depth. Below the soft limits work runs normally; between soft and hard
+    limits it is admitted in degraded mode (cheaper tiers, batched files,
+    templates first); at a hard limit it is rejected at once with a
+    retry-after instead of queueing behind everything else.
+    """
+
+    def __init__(
+        self,
+        soft_sessions: int = ADMISSION_SOFT_SESSIONS,
+        hard_sessions: int = ADMISSION_HARD_SESSIONS,
+        soft_model_queue: int = ADMISSION_SOFT_MODEL_QUEUE,
+        hard_model_queue: int = ADMISSION_HARD_MODEL_QUEUE,
+        retry_after: float = ADMISSION_RETRY_AFTER,
+        tenant_registry: Optional[TenantRegistry] = None
+    ):
+        self.soft_sessions = soft_sessions
+        self.hard_sessions = hard_sessions
+        self.soft_model_queue = soft_model_queue
+        self.hard_model_queue = hard_model_queue
+        self.retry_after = retry_after
+        self.tenants = tenant_registry or tenants
+        self.sessions = 0
+        self.model_queue = 0
+
+    def evaluate(self) -> AdmissionDecision:
+        """Decision for a new session under the current load"""
+        if self.sessions >= self.hard_sessions:
+            return AdmissionDecision(level=AdmissionLevel.REJECTED, reason="too many sessions", retry_after=self.retry_after)
+        if self.model_queue >= self.hard_model_queue:
+            return AdmissionDecision(level=AdmissionLevel.REJECTED, reason="model queue full", retry_after=self.retry_after)
+        if self.sessions >= self.soft_sessions:
+            return AdmissionDecision(level=AdmissionLevel.DEGRADED, reason="session soft limit")
+        if self.model_queue >= self.soft_model_queue:
+            return AdmissionDecision(level=AdmissionLevel.DEGRADED, reason="model queue soft limit")
+        return AdmissionDecision(level=AdmissionLevel.NORMAL)
+
+    def admit(self, kind: str, tenant: Optional[str] = None) -> AdmissionDecision:
+        """Evaluate and, unless rejected, count a new session; pair with release(tenant)"""
+        decision = self.evaluate()
+        if decision.admitted and tenant is not None and not self.tenants.try_acquire(tenant):
+            decision = AdmissionDecision(
+                level=AdmissionLevel.REJECTED,
+                reason="tenant concurrency limit",
+                retry_after=self.retry_after
+            )
+        metrics.incr("admission_decisions", kind=kind, level=decision.level.value)
+        if decision.admitted:
+            self.sessions += 1
+            self._report()
+        else:
+            print(f"🚦 Rejected {kind}: {decision.reason}")
+        return decision
+
+    def release(self, tenant: Optional[str] = None):
+        if tenant is not None:
+            self.tenants.release(tenant)
+        self.sessions = max(0, self.sessions - 1)
+        self._report()
+
+    @contextmanager
+    def model_call(self):
+        """Count a model call in the queue depth while it waits or runs"""
+        self.model_queue += 1
+        self._report()
+        try:
+            yield
+        finally:
+            self.model_queue -= 1
+            self._report()
+
+    def _report(self):
+        metrics.set_gauge("admission_sessions", self.sessions)
+        metrics.set_gauge("admission_model_queue", self.model_queue)
+
+    def snapshot(self):
+        return {
+            "sessions": self.sessions,
+            "model_queue": self.model_queue,
+            "limits": {
+                "soft_sessions": self.soft_sessions,
+                "hard_sessions": self.hard_sessions,
+                "soft_model_queue": self.soft_model_queue,
+                "hard_model_queue": self.hard_model_queue,
+            },
+            "level": self.evaluate().level.value,
+        }
+
+
+admission = AdmissionController()
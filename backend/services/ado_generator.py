@@ -1,6 +1,8 @@
-import google.generativeai as genai
 import json
 import asyncio
+import os
+import re
+import time
 from typing import Dict, List, Optional
 from schemas.application_definition import (
     ApplicationDefinitionObject, 
@@ -13,6 +15,35 @@ from schemas.application_definition import (
     FileType,
     ComponentType
 )
+from services.search_index import SearchIndexCache
+from services import serialization
+from services.singleflight import SingleFlight, request_key
+from services.model_backend import ModelResponse, make_backend
+from services.traffic_capture import RecordingBackend, traffic_recorder
+from services.hedging import Hedger
+from services.model_router import RouteDecision, classify_file, estimate_tokens, model_router
+from services.continuation import MODEL_MAX_CONTINUATIONS, continuation_prompt, is_truncated, stitch
+from services.metrics import metrics
+from services.circuit_breaker import CircuitOpenError, CircuitState
+from services.fallbacks import ADOResultCache, fallback_enabled, match_template, note_fallback, stub_file_content, template_ado
+from services.admission import admission, is_degraded
+from services.tenancy import current_tenant, fair_scheduler, tenants
+from services.prompt_reuse import PROMPT_REUSE, PromptMatch, prompt_index
+
+# Identical model calls in flight at the same time share one request,
+# across every ADOGenerator in the process
+model_calls = SingleFlight("model_calls")
+# Slow calls may be hedged with a duplicate request (off unless MODEL_HEDGING=true)
+hedger = Hedger()
+# Earlier results served by the fallback chain when the model is unavailable
+ado_results = ADOResultCache()
+# Small files generated per model call while degraded under load
+DEGRADED_FILE_BATCH = int(os.getenv("DEGRADED_FILE_BATCH", "4"))
+
+# Fields of an ADO that are bookkeeping for clients and never sent to the model
+_PROMPT_EXCLUDE = {"files": {"__all__": {"content_hash"}}}
+
+_BATCH_FILE_PATTERN = re.compile(r"=== FILE: (.+?) ===\n(.*?)\n?=== END FILE ===", re.S)
 
 class ADOGenerator:
     """
@@ -20,16 +51,17 @@ class ADOGenerator:
     Uses structured prompts to generate consistent, high-quality applications
     """
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "max_output_tokens": 4096,
-            }
-        )
+    def __init__(self, api_key: str, backend=None, router=None):
+        self.backend = backend or make_backend(api_key)
+        if traffic_recorder.enabled:
+            self.backend = RecordingBackend(self.backend, traffic_recorder)
+        # Model and max_output_tokens are chosen per call by the router
+        self.router = router or model_router
+        self.generation_config = {
+            "temperature": 0.7,
+            "top_p": 0.9,
+        }
+        self.search_indexes = SearchIndexCache()
     
     async def generate_ado_from_prompt(self, request: GenerationRequest) -> ApplicationDefinitionObject:
         """Generate a complete ADO from a natural language prompt"""
@@ -113,11 +145,27 @@ class ADOGenerator:
         
         JSON Response:"""
         
+        # Under load, skip the model for prompts a project template covers
+        if is_degraded() and fallback_enabled("template"):
+            template = match_template(request.prompt)
+            if template is not None:
+                metrics.incr("degraded_template_first")
+                print(f"🚦 Degraded: using the {template['id']} template")
+                return template_ado(template, request)
+        
+        # A near-identical earlier prompt: start from its ADO
+        match = prompt_index.lookup(request) if PROMPT_REUSE else None
+        if match is not None:
+            reused = await self._reuse_ado(request, match)
+            if reused is not None:
+                return reused
+        
         # Try multiple times with different approaches if JSON parsing fails
+        start = time.perf_counter()
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = await self._generate_with_retry(ado_prompt)
+                response = await self._generate_with_retry(ado_prompt, call_type="ado")
                 
                 # Extract and validate JSON
                 json_str = self._extract_json(response.text)
@@ -128,6 +176,8 @@ class ADOGenerator:
                 
                 # Validate and create ADO
                 ado = ApplicationDefinitionObject(**ado_data)
+                ado_results.put(request, ado)
+                prompt_index.add(request, ado, (time.perf_counter() - start) * 1000)
                 return ado
                 
             except json.JSONDecodeError as e:
@@ -156,14 +206,91 @@ class ADOGenerator:
                     }}"""
                     continue
                 else:
-                    # Final fallback: create a minimal ADO
-                    return self._create_fallback_ado(request)
+                    return self._fallback_ado(request)
+            
+            except CircuitOpenError as e:
+                # Every model tier is failing fast; retrying would only wait
+                print(f"ADO generation skipped: {str(e)}")
+                return self._fallback_ado(request)
             
             except Exception as e:
                 print(f"ADO generation failed on attempt {attempt + 1}: {str(e)}")
                 if attempt == max_retries - 1:
-                    return self._create_fallback_ado(request)
+                    return self._fallback_ado(request)
+        
+        return self._fallback_ado(request)
+    
+    async def _reuse_ado(self, request: GenerationRequest, match: PromptMatch) -> Optional[ApplicationDefinitionObject]:
+        """
+        The matched ADO as-is when the prompts are equivalent, otherwise
+        adapted to the new prompt by one cheap model call; None to fall
+        back to full generation.
+        """
+        if match.similarity >= prompt_index.exact:
+            print(f"♻️ Reusing the ADO of a similar prompt: \"{match.prompt[:60]}\"")
+            prompt_index.record_hit("reused", match.cost_ms)
+            return match.ado.model_copy(deep=True)
+        
+        start = time.perf_counter()
+        try:
+            ado = await self._adapt_ado(match.ado, match.prompt, request)
+        except Exception as e:
+            print(f"Adapting a similar ADO failed, generating from scratch: {str(e)}")
+            metrics.incr("prompt_reuse", outcome="adapt_failed")
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"♻️ Adapted the ADO of a similar prompt ({match.similarity:.2f}) in {elapsed_ms:.0f}ms")
+        prompt_index.record_hit("adapted", match.cost_ms - elapsed_ms)
+        return ado
+    
+    async def _adapt_ado(
+        self,
+        base: ApplicationDefinitionObject,
+        base_prompt: str,
+        request: GenerationRequest
+    ) -> ApplicationDefinitionObject:
+        """Rework an ADO made for a similar prompt to fit this one"""
+        base_json = serialization.dumps(base.model_dump(exclude=_PROMPT_EXCLUDE), indent=True).decode("utf-8")
+        adapt_prompt = f"""
+        The Application Definition Object below was generated for a similar request.
+        Adapt it to the new request and return the complete ADO.
+        
+        Original request: "{base_prompt}"
+        New request: "{request.prompt}"
+        
+        ADO:
+        {base_json}
+        
+        Rules:
+        1. Keep everything the two requests have in common unchanged
+        2. Add, remove or rename only the files, components, routes and dependencies the difference calls for
+        3. Update the name and descriptions to match the new request
+        4. Keep file content empty
         
+        Return only the JSON object.
+        """
+        response = await self._generate_with_retry(
+            adapt_prompt,
+            call_type="adapt",
+            estimated_tokens=estimate_tokens(base_json)
+        )
+        ado_data = self._fix_ado_validation_issues(json.loads(self._extract_json(response.text)))
+        return ApplicationDefinitionObject(**ado_data)
+    
+    def _fallback_ado(self, request: GenerationRequest) -> ApplicationDefinitionObject:
+        """Walk the fallback chain: cached result, precomputed template, minimal ADO"""
+        if fallback_enabled("cached"):
+            cached = ado_results.get(request)
+            if cached is not None:
+                note_fallback("cached", "ado")
+                return cached
+        if fallback_enabled("template"):
+            template = match_template(request.prompt)
+            if template is not None:
+                note_fallback("template", "ado")
+                return template_ado(template, request)
+        note_fallback("minimal", "ado")
+        # Final fallback: create a minimal ADO
         return self._create_fallback_ado(request)
     
     def _create_fallback_ado(self, request: GenerationRequest) -> ApplicationDefinitionObject:
@@ -211,13 +338,32 @@ class ADOGenerator:
     async def modify_ado(self, request: ModificationRequest) -> ApplicationDefinitionObject:
         """Modify an existing ADO based on user request"""
         
-        current_ado_json = request.current_ado.model_dump()
+        # Narrow the edit to the relevant files before calling the model
+        if request.files_to_modify is None:
+            search_index = self.search_indexes.get(request.current_ado)
+            targets = search_index.select_targets(request.modification_prompt)
+            if targets:
+                request.files_to_modify = targets
+        
+        current_ado_json = request.current_ado.model_dump(exclude=_PROMPT_EXCLUDE)
+        
+        # Only targeted files are sent with content; the rest are restored afterwards
+        omitted_contents = {}
+        if request.files_to_modify:
+            targets = set(request.files_to_modify)
+            for file_obj in current_ado_json["files"]:
+                if file_obj["path"] not in targets and file_obj["content"]:
+                    omitted_contents[file_obj["path"]] = file_obj["content"]
+                    file_obj["content"] = ""
+        
+        # The model returns the ADO it was sent, so its size estimates the output
+        prompt_ado_json = serialization.dumps(current_ado_json, indent=True).decode("utf-8")
         
         modification_prompt = f"""
         Modify the following Application Definition Object based on the user's request:
         
         Current ADO:
-        {json.dumps(current_ado_json, indent=2)}
+        {prompt_ado_json}
         
         User Request: "{request.modification_prompt}"
         
@@ -232,11 +378,16 @@ class ADOGenerator:
         3. Update dependencies if new features require them
         4. Preserve existing styling framework unless explicitly changed
         5. Keep file structure consistent
+        6. Content of files outside "Files to modify" is omitted; return those files with empty content unless they must change
         
         Return only the JSON object.
         """
         
-        response = await self._generate_with_retry(modification_prompt)
+        response = await self._generate_with_retry(
+            modification_prompt,
+            call_type="modify",
+            estimated_tokens=estimate_tokens(prompt_ado_json)
+        )
         
         try:
             json_str = self._extract_json(response.text)
@@ -245,17 +396,23 @@ class ADOGenerator:
             # Fix common validation issues
             ado_data = self._fix_ado_validation_issues(ado_data)
             
+            for file_obj in ado_data.get("files", []):
+                if not file_obj.get("content") and file_obj.get("path") in omitted_contents:
+                    file_obj["content"] = omitted_contents[file_obj["path"]]
+            
             modified_ado = ApplicationDefinitionObject(**ado_data)
             return modified_ado
             
         except Exception as e:
             raise Exception(f"Failed to modify ADO: {str(e)}")
     
-    async def generate_files_from_ado(self, ado: ApplicationDefinitionObject) -> Dict[str, str]:
-        """Generate actual file contents from an ADO"""
-        files = {}
+    async def generate_files_from_ado(self, ado: ApplicationDefinitionObject, batch: bool = False) -> Dict[str, str]:
+        """Generate actual file contents from an ADO; batch packs small files several per call"""
+        files = await self.generate_batched_files(ado, force=batch)
         
         for file_def in ado.files:
+            if file_def.path in files:
+                continue
             if file_def.content and file_def.content.strip():
                 # Content already exists in ADO
                 files[file_def.path] = file_def.content
@@ -266,6 +423,79 @@ class ADOGenerator:
         
         return files
     
+    async def generate_batched_files(self, ado: ApplicationDefinitionObject, force: bool = False) -> Dict[str, str]:
+        """
+        While degraded under load (or when forced, e.g. for bulk runs),
+        generate the small non-component files several per model call.
+        Returns {} otherwise; files missing from a batch answer are left
+        to per-file generation.
+        """
+        if not (force or is_degraded()):
+            return {}
+        
+        small_files = []
+        for file_def in ado.files:
+            if not (file_def.content and file_def.content.strip()) and classify_file(file_def, ado)[0] == "file":
+                small_files.append(file_def)
+        
+        files = {}
+        for i in range(0, len(small_files), DEGRADED_FILE_BATCH):
+            batch = small_files[i:i + DEGRADED_FILE_BATCH]
+            if len(batch) < 2:
+                break
+            try:
+                files.update(await self._generate_file_batch(batch, ado))
+            except CircuitOpenError:
+                break
+            metrics.incr("degraded_file_batches")
+        return files
+    
+    async def _generate_file_batch(self, file_defs: List[FileDefinition], ado: ApplicationDefinitionObject) -> Dict[str, str]:
+        """Generate several files in one model call"""
+        listing = "\n".join(
+            f"        - {f.path} ({f.type.value}): {f.description or 'N/A'}" for f in file_defs
+        )
+        batch_prompt = f"""
+        Generate complete code for each of these files of the application "{ado.name}":
+{listing}
+        
+        Application context:
+        - Framework: {ado.framework}
+        - Style framework: {ado.style_config.framework}
+        
+        Available components: {[comp.name for comp in ado.components]}
+        
+        Dependencies: {[dep.name for dep in ado.dependencies]}
+        
+        Rules:
+        1. Generate complete, functional code for every file
+        2. Include all necessary imports
+        3. No placeholder comments
+        
+        Return every file in this exact format and nothing else:
+        === FILE: <path> ===
+        <file content>
+        === END FILE ===
+        """
+        
+        estimated_tokens = sum(classify_file(f, ado)[1] for f in file_defs)
+        response = await self._generate_with_retry(batch_prompt, call_type="file", estimated_tokens=estimated_tokens)
+        
+        wanted = {f.path for f in file_defs}
+        files = {}
+        for match in _BATCH_FILE_PATTERN.finditer(response.text):
+            path = match.group(1).strip()
+            if path in wanted:
+                files[path] = self._strip_code_fence(match.group(2)).strip()
+        return files
+    
+    @staticmethod
+    def _strip_code_fence(content: str) -> str:
+        content = content.strip()
+        if content.startswith("```") and content.endswith("```"):
+            content = content[content.find("\n") + 1:-3]
+        return content
+    
     async def _generate_file_content(self, file_def: FileDefinition, ado: ApplicationDefinitionObject) -> str:
         """Generate content for a specific file based on the ADO context"""
         
@@ -305,22 +535,116 @@ class ADOGenerator:
         Return only the file content.
         """
         
-        response = await self._generate_with_retry(content_prompt)
+        call_type, estimated_tokens = classify_file(file_def, ado)
+        try:
+            response = await self._generate_with_retry(content_prompt, call_type=call_type, estimated_tokens=estimated_tokens)
+        except CircuitOpenError:
+            if not fallback_enabled("template"):
+                raise
+            note_fallback("template", call_type)
+            return stub_file_content(file_def, ado)
         return response.text.strip()
     
-    async def _generate_with_retry(self, prompt: str, max_retries: int = 3) -> any:
-        """Generate content with retry logic"""
+    async def _generate_with_retry(
+        self,
+        prompt: str,
+        max_retries: int = 3,
+        call_type: str = "file",
+        estimated_tokens: Optional[int] = None
+    ) -> any:
+        """Generate content with retry logic, continuing output cut off at the token limit"""
+        response = await self._call_routed(prompt, max_retries, call_type, estimated_tokens)
+        
+        # Ask for the missing tail instead of regenerating the whole answer
+        text = response.text
+        continuations = 0
+        while is_truncated(response) and continuations < MODEL_MAX_CONTINUATIONS:
+            continuations += 1
+            metrics.incr("model_continuations", call_type=call_type)
+            print(f"✂️ {call_type} output hit the token limit, requesting continuation {continuations}")
+            response = await self._call_routed(continuation_prompt(prompt, text), max_retries, call_type, estimated_tokens)
+            text = stitch(text, response.text)
+        
+        if is_truncated(response):
+            metrics.incr("model_truncated", call_type=call_type)
+        if continuations:
+            return ModelResponse(text, finish_reason=response.finish_reason, model=response.model)
+        return response
+    
+    async def _call_routed(
+        self,
+        prompt: str,
+        max_retries: int,
+        call_type: str,
+        estimated_tokens: Optional[int]
+    ) -> ModelResponse:
+        """One routed model call, falling back to the next tier when a tier fails"""
+        failed_tiers = set()
+        last_error = None
+        while True:
+            route = self.router.route(call_type, estimated_tokens, exclude=failed_tiers, degraded=is_degraded())
+            if route is None:
+                raise last_error
+            if failed_tiers:
+                note_fallback("alternate_model", call_type)
+            config = {**self.generation_config, "max_output_tokens": route.max_output_tokens}
+            key = request_key(route.model, config, prompt)
+            try:
+                with admission.model_call():
+                    return await model_calls.do(key, lambda: self._call_with_retry(prompt, max_retries, route, config))
+            except Exception as e:
+                if not fallback_enabled("alternate_model"):
+                    raise
+                last_error = e
+                failed_tiers.add(route.tier)
+    
+    async def _call_with_retry(self, prompt: str, max_retries: int, route: RouteDecision, config: dict) -> any:
+        """Call the model, backing off between failed attempts unless its circuit opens"""
+        breaker = self.router.breakers.get(route.model)
+        tenant = current_tenant.get()
+        prompt_tokens = estimate_tokens(prompt)
+        # Fair-queuing cost in thousands of tokens
+        cost = (prompt_tokens + (route.estimated_tokens or route.max_output_tokens)) / 1000
         for attempt in range(max_retries):
+            if not breaker.allow():
+                raise CircuitOpenError(route.model)
+            start = None  # set once a fair-queuing slot is granted
+            outcome_recorded = False
             try:
-                response = self.model.generate_content(prompt)
-                if response.text:
-                    return response
-                else:
+                async with fair_scheduler.slot(tenant, cost):
+                    start = time.perf_counter()
+                    # Hedging thresholds are kept per call type and tier
+                    response = await hedger.call(
+                        f"{route.call_type}:{route.tier}",
+                        lambda: self.backend.generate(prompt, route.model, config)
+                    )
+                latency_ms = (time.perf_counter() - start) * 1000
+                breaker.record_success()
+                outcome_recorded = True
+                tenants.record_call(
+                    tenant,
+                    response.prompt_tokens or prompt_tokens,
+                    response.output_tokens or estimate_tokens(response.text),
+                    latency_ms,
+                    ok=bool(response.text)
+                )
+                if not response.text:
                     raise Exception("Empty response from model")
+                self.router.record(route.tier, latency_ms, ok=True)
+                return response
             except Exception as e:
-                if attempt == max_retries - 1:
+                latency_ms = (time.perf_counter() - start) * 1000 if start else 0.0
+                if not outcome_recorded:
+                    breaker.record_failure()
+                    outcome_recorded = True
+                    tenants.record_call(tenant, prompt_tokens, 0, latency_ms, ok=False)
+                self.router.record(route.tier, latency_ms, ok=False)
+                if attempt == max_retries - 1 or breaker.state == CircuitState.OPEN:
                     raise e
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
+            finally:
+                if not outcome_recorded:
+                    breaker.release()
         
         raise Exception("Max retries exceeded")
     
@@ -530,4 +854,5 @@ class ADOValidator:
                 if dep.name not in dep_names:
                     ado.dependencies.append(dep)
         
+        serialization.invalidate(ado)
         return ado
@@ -0,0 +1,205 @@
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from schemas.application_definition import ApplicationDefinitionObject
+from services.metrics import metrics
+from services.project_index import compute_content_hash
+
+
+def new_project_id() -> str:
+    return uuid.uuid4().hex
+
+
+class BlobStore:
+    """
+    Content-addressed, reference-counted store for file contents.
+
+    Identical contents are kept once: put() hands back the canonical string
+    object for a hash, so every ADO version referencing an unchanged file
+    points at the same string in memory.
+    """
+
+    def __init__(self):
+        self._blobs: Dict[str, str] = {}
+        self._refs: Dict[str, int] = {}
+        self.total_bytes = 0
+
+    def put(self, content: str) -> Tuple[str, str]:
+        """Store content and return (hash, canonical string), adding a reference"""
+        content_hash = compute_content_hash(content)
+        canonical = self._blobs.get(content_hash)
+        if canonical is None:
+            canonical = self._blobs[content_hash] = content
+            self._refs[content_hash] = 0
+            self.total_bytes += len(content)
+        self._refs[content_hash] += 1
+        self._report()
+        return content_hash, canonical
+
+    def get(self, content_hash: str) -> str:
+        return self._blobs[content_hash]
+
+    def release(self, content_hash: str):
+        """Drop a reference, freeing the blob once nothing points at it"""
+        refs = self._refs.get(content_hash)
+        if refs is None:
+            return
+        if refs > 1:
+            self._refs[content_hash] = refs - 1
+            return
+        del self._refs[content_hash]
+        self.total_bytes -= len(self._blobs.pop(content_hash))
+        self._report()
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def _report(self):
+        metrics.set_gauge("blob_store_blobs", len(self._blobs))
+        metrics.set_gauge("blob_store_bytes", self.total_bytes)
+
+
+class ProjectVersion(BaseModel):
+    """One entry in a project's version history"""
+    version: int
+    ado: ApplicationDefinitionObject
+    manifest: Dict[str, str] = Field(default_factory=dict)  # file path -> blob hash
+    message: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+
+    def changed_files(self, previous: Optional["ProjectVersion"]) -> List[str]:
+        """Paths added or modified relative to an earlier version"""
+        if previous is None:
+            return list(self.manifest)
+        return [path for path, h in self.manifest.items() if previous.manifest.get(path) != h]
+
+    def summary(self, previous: Optional["ProjectVersion"] = None) -> Dict:
+        return {
+            "version": self.version,
+            "message": self.message,
+            "created_at": self.created_at,
+            "files": len(self.manifest),
+            "changed_files": self.changed_files(previous),
+        }
+
+
+class ProjectStore:
+    """
+    Version history per project with file contents held in a BlobStore.
+
+    Committing a version interns every file through the blob store, so a
+    project's memory grows with the size of its edits rather than with the
+    number of versions, and undo is just dropping the newest version.
+    """
+
+    def __init__(self, blob_store: Optional[BlobStore] = None, max_versions: int = 50, max_projects: int = 1000):
+        self.blobs = blob_store or BlobStore()
+        self.max_versions = max_versions
+        self.max_projects = max_projects
+        self._projects: "OrderedDict[str, List[ProjectVersion]]" = OrderedDict()
+
+    def commit(
+        self,
+        project_id: str,
+        ado: ApplicationDefinitionObject,
+        files: Optional[Dict[str, str]] = None,
+        message: Optional[str] = None,
+        version: Optional[int] = None
+    ) -> ProjectVersion:
+        """
+        Record a new version. files (path -> content) overrides the content
+        stored in the ADO, e.g. for files generated after the ADO was built.
+        version keeps the numbering of a version made elsewhere.
+        """
+        files = files or {}
+        manifest = {}
+        stored_files = []
+        for file_def in ado.files:
+            content_hash, content = self.blobs.put(files.get(file_def.path, file_def.content))
+            manifest[file_def.path] = content_hash
+            stored_files.append(file_def.model_copy(update={"content": content, "content_hash": content_hash}))
+
+        history = self._projects.setdefault(project_id, [])
+        self._projects.move_to_end(project_id)
+        entry = ProjectVersion(
+            version=version or ((history[-1].version + 1) if history else 1),
+            ado=ado.model_copy(update={"files": stored_files}),
+            manifest=manifest,
+            message=message
+        )
+        history.append(entry)
+
+        while len(history) > self.max_versions:
+            self._release(history.pop(0))
+        while len(self._projects) > self.max_projects:
+            _, dropped = self._projects.popitem(last=False)
+            for old in dropped:
+                self._release(old)
+
+        metrics.incr("project_versions_committed")
+        return entry
+
+    def latest(self, project_id: str) -> Optional[ProjectVersion]:
+        history = self._projects.get(project_id)
+        return history[-1] if history else None
+
+    def get(self, project_id: str, version: int) -> Optional[ProjectVersion]:
+        for entry in self._projects.get(project_id, []):
+            if entry.version == version:
+                return entry
+        return None
+
+    def history(self, project_id: str) -> List[Dict]:
+        history = self._projects.get(project_id, [])
+        return [v.summary(history[i - 1] if i else None) for i, v in enumerate(history)]
+
+    def undo(self, project_id: str) -> Optional[ProjectVersion]:
+        """Drop the newest version and return the one before it"""
+        history = self._projects.get(project_id)
+        if not history or len(history) < 2:
+            return None
+        self._release(history.pop())
+        metrics.incr("project_versions_undone")
+        return history[-1]
+
+    def files(self, version: ProjectVersion) -> Dict[str, str]:
+        """path -> content for a version"""
+        return {path: self.blobs.get(h) for path, h in version.manifest.items()}
+
+    def delta(self, version: ProjectVersion, held: Dict[str, str]) -> Tuple[Dict[str, str], List[str]]:
+        """
+        What a client holding `held` (path -> content hash) is missing for
+        a version: (path -> content of new or changed files, removed paths)
+        """
+        changes = {path: self.blobs.get(h) for path, h in version.manifest.items() if held.get(path) != h}
+        removed = [path for path in held if path not in version.manifest]
+        return changes, removed
+
+    def elide(self, version: ProjectVersion, held: Dict[str, str]) -> ApplicationDefinitionObject:
+        """A version's ADO with the contents the client already holds left empty"""
+        files = [
+            f.model_copy(update={"content": ""}) if held.get(f.path) == f.content_hash else f
+            for f in version.ado.files
+        ]
+        return version.ado.model_copy(update={"files": files})
+
+    def hydrate(self, ado: ApplicationDefinitionObject, version: ProjectVersion) -> ApplicationDefinitionObject:
+        """
+        Fill in file contents a client left out, by content hash. Only the
+        version's own files are used, so a hash cannot reach other projects.
+        """
+        known = set(version.manifest.values())
+        if not any(not f.content and f.content_hash in known for f in ado.files):
+            return ado
+        files = [
+            f.model_copy(update={"content": self.blobs.get(f.content_hash)})
+            if not f.content and f.content_hash in known else f
+            for f in ado.files
+        ]
+        return ado.model_copy(update={"files": files})
+
+    def _release(self, version: ProjectVersion):
+        for content_hash in version.manifest.values():
+            self.blobs.release(content_hash)
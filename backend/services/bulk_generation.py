@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from schemas.application_definition import GenerationRequest
+from services import serialization
+from services.fallbacks import fallbacks_used
+from services.metrics import metrics
+from services.tenancy import current_tenant
+
+# Items generated at once in a bulk run
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+# Model calls per minute across all workers of a run; 0 for no limit
+BULK_RATE_PER_MINUTE = float(os.getenv("BULK_RATE_PER_MINUTE", "60"))
+# Tenant bulk model calls are accounted to
+BULK_TENANT = os.getenv("BULK_TENANT", "bulk")
+
+
+class RateLimiter:
+    """Token bucket shared by every caller: `rate` acquisitions per second, bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Callers queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                metrics.observe("bulk_rate_limit_wait_ms", wait * 1000)
+                await asyncio.sleep(wait)
+                self._tokens = 1
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
+class RateLimitedBackend:
+    """Model backend wrapper that takes a rate limiter token per call"""
+
+    def __init__(self, inner, limiter: RateLimiter):
+        self.inner = inner
+        self.limiter = limiter
+        self.name = inner.name
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    async def generate(self, prompt: str, model_name: str, generation_config: Dict[str, Any]):
+        await self.limiter.acquire()
+        return await self.inner.generate(prompt, model_name, generation_config)
+
+
+def read_items(path: str) -> Tuple[List[Tuple[str, GenerationRequest]], List[Dict[str, Any]]]:
+    """
+    (id, request) pairs from a JSONL file of GenerationRequests, plus
+    failure records for lines that do not parse. A line's optional "id"
+    field names its output; otherwise it is "line-<n>".
+    """
+    items, invalid = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item_id = f"line-{number}"
+            try:
+                data = json.loads(line)
+                item_id = str(data.pop("id", item_id))
+                items.append((item_id, GenerationRequest(**data)))
+            except (ValueError, TypeError, ValidationError) as e:
+                invalid.append({"id": item_id, "success": False, "errors": [f"Invalid request: {str(e)}"]})
+    return items, invalid
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Items an earlier run already generated successfully"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # A line cut short when the run was interrupted
+                continue
+            if result.get("success"):
+                done.add(result["id"])
+    return done
+
+
+def compact_output(path: str):
+    """
+    Rewrite an output file with only the newest record per item, dropping
+    lines cut short by an interruption. Two passes over the file, so only
+    the ids are held in memory; the rewrite replaces the file atomically.
+    """
+    newest: Dict[str, int] = {}
+    with open(path, "rb") as f:
+        for number, line in enumerate(f):
+            try:
+                newest[json.loads(line)["id"]] = number
+            except (ValueError, KeyError, TypeError):
+                continue
+    kept = set(newest.values())
+
+    compacted = path + ".compact"
+    with open(path, "rb") as source, open(compacted, "wb") as target:
+        for number, line in enumerate(source):
+            if number in kept:
+                target.write(line if line.endswith(b"\n") else line + b"\n")
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(compacted, path)
+
+
+class BulkRunner:
+    """
+    Generate many applications from a JSONL file of requests.
+
+    Items are spread over `workers` concurrent tasks sharing one generator,
+    so identical model calls are coalesced and every call passes the same
+    rate limiter. Each result is appended to the output as one JSONL line
+    and synced to disk before the next is written, so the output doubles as
+    the checkpoint: a rerun skips items that already succeeded and retries
+    the rest. At the end the output is compacted to one record per item. With batch_files, small files are generated several per model
+    call. Results that relied on a fallback (template, stub, minimal ADO)
+    count as failed unless accept_fallbacks is set.
+    """
+
+    def __init__(
+        self,
+        generator,
+        workers: int = BULK_WORKERS,
+        rate_per_minute: float = BULK_RATE_PER_MINUTE,
+        batch_files: bool = True,
+        accept_fallbacks: bool = False
+    ):
+        self.generator = generator
+        self.generator.backend = RateLimitedBackend(generator.backend, RateLimiter(rate_per_minute / 60))
+        self.workers = max(1, workers)
+        self.batch_files = batch_files
+        self.accept_fallbacks = accept_fallbacks
+        self._write_lock = asyncio.Lock()
+
+    async def run(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        items, invalid = read_items(input_path)
+        done = completed_ids(output_path)
+        pending = [(item_id, request) for item_id, request in items if item_id not in done]
+        summary = {"total": len(items) + len(invalid), "skipped": len(items) - len(pending), "succeeded": 0, "failed": 0}
+        print(f"📦 Bulk run: {len(pending)} to generate, {summary['skipped']} already done, {len(invalid)} invalid")
+
+        with open(output_path, "ab+") as output:
+            if output.tell():
+                # Start on a fresh line after a line cut short by an interruption
+                output.seek(-1, os.SEEK_END)
+                if output.read(1) != b"\n":
+                    output.write(b"\n")
+            for record in invalid:
+                await self._write(output, record)
+            summary["failed"] += len(invalid)
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for item in pending:
+                queue.put_nowait(item)
+
+            async def worker():
+                while not queue.empty():
+                    item_id, request = queue.get_nowait()
+                    result = await self._generate(item_id, request)
+                    await self._write(output, result)
+                    summary["succeeded" if result["success"] else "failed"] += 1
+                    metrics.incr("bulk_items", outcome="ok" if result["success"] else "failed")
+
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(pending)) or 1)))
+        compact_output(output_path)
+
+        summary["elapsed_s"] = round(time.perf_counter() - start, 2)
+        print(f"✅ Bulk run finished: {summary}")
+        return summary
+
+    async def _generate(self, item_id: str, request: GenerationRequest) -> Dict[str, Any]:
+        start = time.perf_counter()
+        current_tenant.set(BULK_TENANT)
+        fallbacks_used.set(())
+        try:
+            ado = await self.generator.generate_ado_from_prompt(request)
+            files = await self.generator.generate_files_from_ado(ado, batch=self.batch_files)
+        except Exception as e:
+            print(f"❌ Bulk item {item_id} failed: {str(e)}")
+            return {"id": item_id, "success": False, "errors": [str(e)], "elapsed_ms": round((time.perf_counter() - start) * 1000)}
+
+        fallbacks = sorted(set(fallbacks_used.get()) - {"alternate_model"})
+        result = {
+            "id": item_id,
+            "success": self.accept_fallbacks or not fallbacks,
+            "ado": serialization.raw_ado(ado),
+            "files": files,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000),
+        }
+        if fallbacks:
+            result["fallbacks"] = fallbacks
+        return result
+
+    async def _write(self, output, record: Dict[str, Any]):
+        line = serialization.encode_event(record) + b"\n"
+        async with self._write_lock:
+            output.write(line)
+            output.flush()
+            os.fsync(output.fileno())
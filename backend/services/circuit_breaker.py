@@ -0,0 +1,120 @@
+import os
+import time
+from enum import Enum
+from typing import Dict
+from services.metrics import metrics
+
+# Consecutive failures that open a circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit waits before letting a probe call through
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+STATE_GAUGE = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a target whose circuit is open"""
+
+    def __init__(self, target: str):
+        super().__init__(f"Circuit open for {target}")
+        self.target = target
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one call target.
+
+    failure_threshold consecutive failures open the circuit and calls fail
+    fast. After reset_timeout a limited number of probe calls are let
+    through (half-open): a success closes the circuit, a failure opens it
+    again for another reset_timeout.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        half_open_max_calls: int = 1
+    ):
+        self.target = target
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._report()
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; counts it as a probe when half-open"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        metrics.incr("circuit_rejected", target=self.target)
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self._state != CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self._state == CircuitState.HALF_OPEN or (
+            self._state == CircuitState.CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+
+    def release(self):
+        """A call allowed through ended without an outcome (e.g. cancelled)"""
+        if self._state == CircuitState.HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def _transition(self, state: CircuitState):
+        self._state = state
+        self._probes = 0
+        print(f"🔌 Circuit for {self.target} is now {state.value}")
+        metrics.incr("circuit_transitions", target=self.target, state=state.value)
+        self._report()
+
+    def _report(self):
+        metrics.set_gauge("circuit_state", STATE_GAUGE[self._state], target=self.target)
+
+    def snapshot(self) -> Dict:
+        return {"state": self.state.value, "failures": self.failures}
+
+
+class BreakerRegistry:
+    """One breaker per target, created on first use"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, target: str) -> CircuitBreaker:
+        breaker = self._breakers.get(target)
+        if breaker is None:
+            breaker = self._breakers[target] = CircuitBreaker(target, **self.settings)
+        return breaker
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {target: breaker.snapshot() for target, breaker in self._breakers.items()}
@@ -0,0 +1,52 @@
+import os
+import re
+
+# Follow-up requests allowed after an output cut off at the token limit
+MODEL_MAX_CONTINUATIONS = int(os.getenv("MODEL_MAX_CONTINUATIONS", "3"))
+# How much of the cut-off output is quoted back so the model knows where it stopped
+CONTINUATION_ANCHOR_CHARS = int(os.getenv("CONTINUATION_ANCHOR_CHARS", "1500"))
+
+TRUNCATED_FINISH_REASONS = {"MAX_TOKENS"}
+
+_LEADING_FENCE = re.compile(r"^\s*```[\w-]*[ \t]*\n")
+
+
+def is_truncated(response) -> bool:
+    return getattr(response, "finish_reason", None) in TRUNCATED_FINISH_REASONS
+
+
+def continuation_prompt(prompt: str, partial: str, anchor_chars: int = CONTINUATION_ANCHOR_CHARS) -> str:
+    """
+    Prompt for the rest of a cut-off answer.
+
+    Only the end of the partial output is quoted back, so the request stays
+    small and the answer covers just the missing tail.
+    """
+    anchor = partial[-anchor_chars:]
+    return f"""{prompt}
+
+Your previous answer was cut off by the output limit. It ended with:
+<<<PARTIAL_END
+{anchor}
+PARTIAL_END
+
+Continue from exactly where it stopped. Output only the remaining text: do not repeat
+anything already written, do not restart the answer and do not add any introduction."""
+
+
+def stitch(partial: str, continuation: str, max_overlap: int = CONTINUATION_ANCHOR_CHARS) -> str:
+    """
+    Append a continuation to a cut-off output.
+
+    Drops a code fence the model opened again and any text it repeated
+    from the end of the partial output.
+    """
+    continuation = _LEADING_FENCE.sub("", continuation, count=1)
+    limit = min(len(partial), len(continuation), max_overlap)
+    for size in range(limit, 0, -1):
+        if partial.endswith(continuation[:size]):
+            # Single characters match by chance too often to count as a repeat
+            if size >= 8 or size == len(continuation):
+                return partial + continuation[size:]
+            break
+    return partial + continuation
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from schemas.application_definition import (
+    ApplicationDefinitionObject, ComponentDefinition, ComponentType, Dependency,
+    FileDefinition, FileType, GenerationRequest, StyleConfig
+)
+from services.metrics import metrics
+from services.singleflight import request_key
+from services.tenancy import current_tenant
+
+# Steps tried in order when the model cannot answer:
+# alternate_model (next tier), cached (earlier result for the same request),
+# template (precomputed project template), minimal (_create_fallback_ado)
+MODEL_FALLBACK_CHAIN = [
+    step.strip() for step in
+    os.getenv("MODEL_FALLBACK_CHAIN", "alternate_model,cached,template,minimal").split(",")
+    if step.strip()
+]
+
+
+def fallback_enabled(step: str) -> bool:
+    return step in MODEL_FALLBACK_CHAIN
+
+
+# Fallback stages used by the current task, for callers that must tell a
+# model answer from a substitute (e.g. bulk runs); reset per unit of work
+fallbacks_used: ContextVar[Tuple[str, ...]] = ContextVar("fallbacks_used", default=())
+
+
+def note_fallback(stage: str, call_type: str):
+    metrics.incr("model_fallbacks", stage=stage, call_type=call_type)
+    fallbacks_used.set(fallbacks_used.get() + (stage,))
+
+
+class ADOResultCache:
+    """Recently generated ADOs by tenant and request, served when the model is unavailable"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ApplicationDefinitionObject]" = OrderedDict()
+
+    @staticmethod
+    def key(request: GenerationRequest) -> str:
+        prompt = " ".join(request.prompt.lower().split())
+        return request_key(
+            current_tenant.get(), prompt, request.framework, request.style_framework.value,
+            request.additional_requirements
+        )
+
+    def put(self, request: GenerationRequest, ado: ApplicationDefinitionObject):
+        key = self.key(request)
+        self._entries[key] = ado
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, request: GenerationRequest) -> Optional[ApplicationDefinitionObject]:
+        key = self.key(request)
+        ado = self._entries.get(key)
+        if ado is not None:
+            self._entries.move_to_end(key)
+        return ado
+
+
+PROJECT_TEMPLATES = [
+    {
+        "id": "todo-app",
+        "name": "Todo Application",
+        "description": "A modern todo app with categories, due dates, and local storage",
+        "tags": ["productivity", "react", "localStorage"],
+        "keywords": ["todo", "task", "checklist", "reminder"],
+        "components": [
+            ("TodoForm", "Form to add a todo with category and due date"),
+            ("TodoList", "List of todos with completion toggles"),
+            ("CategoryFilter", "Filter todos by category"),
+        ],
+    },
+    {
+        "id": "ecommerce-catalog",
+        "name": "E-commerce Catalog",
+        "description": "Product catalog with filtering, search, and shopping cart",
+        "tags": ["ecommerce", "react", "shopping"],
+        "keywords": ["shop", "store", "product", "cart", "ecommerce", "catalog"],
+        "components": [
+            ("ProductGrid", "Grid of product cards"),
+            ("SearchBar", "Search and filter products"),
+            ("Cart", "Shopping cart summary"),
+        ],
+    },
+    {
+        "id": "blog-platform",
+        "name": "Blog Platform",
+        "description": "Personal blog with markdown support and responsive design",
+        "tags": ["blog", "markdown", "cms"],
+        "keywords": ["blog", "post", "article", "markdown"],
+        "components": [
+            ("PostList", "List of blog post previews"),
+            ("PostView", "Single post rendered from markdown"),
+        ],
+    },
+    {
+        "id": "weather-dashboard",
+        "name": "Weather Dashboard",
+        "description": "Weather dashboard with multiple cities and forecasts",
+        "tags": ["weather", "api", "dashboard"],
+        "keywords": ["weather", "forecast", "temperature", "city"],
+        "components": [
+            ("CitySelector", "Add and switch between cities"),
+            ("CurrentWeather", "Current conditions for the selected city"),
+            ("Forecast", "Multi-day forecast"),
+        ],
+    },
+    {
+        "id": "portfolio-site",
+        "name": "Portfolio Website",
+        "description": "Personal portfolio with project showcase and contact form",
+        "tags": ["portfolio", "showcase", "professional"],
+        "keywords": ["portfolio", "resume", "personal", "showcase"],
+        "components": [
+            ("Hero", "Introduction section"),
+            ("ProjectShowcase", "Grid of projects"),
+            ("ContactForm", "Contact form"),
+        ],
+    },
+]
+
+
+def template_summaries() -> List[Dict]:
+    """Template metadata as listed by /api/templates"""
+    return [{k: t[k] for k in ("id", "name", "description", "tags")} for t in PROJECT_TEMPLATES]
+
+
+def match_template(prompt: str) -> Optional[Dict]:
+    """Template whose keywords best match the prompt, if any match"""
+    words = set(re.findall(r"[a-z]+", prompt.lower()))
+    best, best_hits = None, 0
+    for template in PROJECT_TEMPLATES:
+        hits = sum(1 for keyword in template["keywords"] if keyword in words or keyword + "s" in words)
+        if hits > best_hits:
+            best, best_hits = template, hits
+    return best
+
+
+def template_ado(template: Dict, request: GenerationRequest) -> ApplicationDefinitionObject:
+    """Precomputed project structure for a template; file contents are filled in later"""
+    files = [
+        FileDefinition(path="package.json", type=FileType.JSON, content="", description="Package configuration"),
+        FileDefinition(path="src/App.jsx", type=FileType.JSX, content="", description=template["description"], component="App"),
+    ]
+    components = [
+        ComponentDefinition(
+            name="App",
+            type=ComponentType.PAGE,
+            file_path="src/App.jsx",
+            imports=["react"] + [f"./components/{name}" for name, _ in template["components"]],
+            exports=["default"],
+            description=template["description"],
+            dependencies=[name for name, _ in template["components"]]
+        )
+    ]
+    for name, description in template["components"]:
+        path = f"src/components/{name}.jsx"
+        files.append(FileDefinition(path=path, type=FileType.JSX, content="", description=description, component=name))
+        components.append(ComponentDefinition(
+            name=name,
+            type=ComponentType.FUNCTIONAL,
+            file_path=path,
+            imports=["react"],
+            exports=["default"],
+            description=description
+        ))
+
+    return ApplicationDefinitionObject(
+        name=template["id"],
+        description=template["description"],
+        framework=request.framework,
+        files=files,
+        components=components,
+        dependencies=[
+            Dependency(name="react", version="^18.2.0", dev=False),
+            Dependency(name="react-dom", version="^18.2.0", dev=False)
+        ],
+        style_config=StyleConfig(framework=request.style_framework)
+    )
+
+
+def stub_file_content(file_def: FileDefinition, ado: ApplicationDefinitionObject) -> str:
+    """Minimal working content for a file when the model is unavailable"""
+    if file_def.path.endswith("package.json"):
+        package = {
+            "name": ado.name,
+            "version": ado.version,
+            "private": True,
+            "dependencies": {d.name: d.version for d in ado.dependencies if not d.dev},
+            "devDependencies": {d.name: d.version for d in ado.dependencies if d.dev},
+        }
+        return json.dumps(package, indent=2) + "\n"
+
+    if file_def.type in (FileType.JSX, FileType.TSX) and file_def.component:
+        component = next((c for c in ado.components if c.name == file_def.component), None)
+        children = component.dependencies if component else []
+        imports = "".join(f"import {name} from './components/{name}';\n" for name in children)
+        body = "".join(f"      <{name} />\n" for name in children)
+        description = file_def.description or file_def.component
+        return (
+            f"import React from 'react';\n{imports}\n"
+            f"export default function {file_def.component}() {{\n"
+            f"  return (\n"
+            f"    <div className=\"p-4\">\n"
+            f"      <h2 className=\"text-lg font-semibold\">{file_def.component}</h2>\n"
+            f"      <p>{description}</p>\n"
+            f"{body}"
+            f"    </div>\n"
+            f"  );\n"
+            f"}}\n"
+        )
+
+    if file_def.type in (FileType.CSS, FileType.SCSS):
+        return "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+    return ""
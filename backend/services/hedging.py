@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from services.metrics import metrics
+
+T = TypeVar("T")
+
+# Hedging is opt-in
+MODEL_HEDGING = os.getenv("MODEL_HEDGING", "false").lower() == "true"
+# Fire the hedge once a call is slower than this percentile of its class
+HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "0.95"))
+# At most this fraction of extra calls on top of primary calls
+HEDGE_MAX_EXTRA_FRACTION = float(os.getenv("MODEL_HEDGE_MAX_EXTRA_FRACTION", "0.1"))
+
+
+class LatencyTracker:
+    """Rolling latency window per prompt class"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, prompt_class: str, latency: float):
+        samples = self._samples.get(prompt_class)
+        if samples is None:
+            samples = self._samples[prompt_class] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def percentile(self, prompt_class: str, p: float) -> Optional[float]:
+        """p-quantile of recent latencies, or None until there is enough data"""
+        samples = self._samples.get(prompt_class)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Hedger:
+    """
+    Hedged requests for tail latency.
+
+    If a call has not answered within the rolling HEDGE_PERCENTILE latency
+    of its prompt class, an identical second call is fired and whichever
+    succeeds first wins; the other is cancelled. Extra calls are capped at
+    max_extra_fraction of primary calls so hedging cannot run away with
+    the quota when the backend is uniformly slow.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = MODEL_HEDGING,
+        percentile: float = HEDGE_PERCENTILE,
+        max_extra_fraction: float = HEDGE_MAX_EXTRA_FRACTION,
+        tracker: Optional[LatencyTracker] = None
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_extra_fraction = max_extra_fraction
+        self.tracker = tracker or LatencyTracker()
+        self.primary_calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _budget_allows(self) -> bool:
+        return self.hedges < self.max_extra_fraction * self.primary_calls
+
+    async def _timed(self, prompt_class: str, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await fn()
+        latency = time.perf_counter() - start
+        self.tracker.record(prompt_class, latency)
+        metrics.observe("model_call_latency_ms", latency * 1000, call_type=prompt_class)
+        return result
+
+    async def call(self, prompt_class: str, fn: Callable[[], Awaitable[T]]) -> T:
+        self.primary_calls += 1
+        threshold = self.tracker.percentile(prompt_class, self.percentile) if self.enabled else None
+
+        primary = asyncio.create_task(self._timed(prompt_class, fn))
+        tasks = {primary}
+        try:
+            if threshold is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if done or not self._budget_allows():
+                return await primary
+
+            self.hedges += 1
+            metrics.incr("model_hedges_fired", call_type=prompt_class)
+            hedge = asyncio.create_task(self._timed(prompt_class, fn))
+            tasks.add(hedge)
+
+            first_error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            metrics.incr("model_hedge_wins", call_type=prompt_class)
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from services.metrics import metrics
+from services.profiler import thread_stack
+
+# Run the monitor in the API process
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1") != "0"
+# Milliseconds between lag measurements
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+# Lag above which the loop counts as blocked and the blocking stack is captured
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+# Recent stalls kept for /admin/loop
+LOOP_STALLS_KEPT = int(os.getenv("LOOP_STALLS_KEPT", "50"))
+
+LAG_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _task_label(task: Optional[asyncio.Task]) -> Optional[str]:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', type(coro).__name__)})"
+
+
+class LoopMonitor:
+    """
+    Continuous event loop lag measurement with stall capture.
+
+    A heartbeat task sleeps for the interval and records how late it woke
+    up as event_loop_lag_ms. A watchdog thread watches the heartbeat: once
+    it is overdue by the threshold, the loop is stuck in one callback or
+    coroutine step, and the watchdog takes the loop thread's stack right
+    then, so the stall is reported with the code that caused it rather
+    than whatever runs after it.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_LAG_INTERVAL_MS,
+        threshold_ms: float = LOOP_STALL_THRESHOLD_MS,
+        keep: int = LOOP_STALLS_KEPT
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.stalls: deque = deque(maxlen=keep)
+        self.max_lag_ms = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._beat = 0.0
+        self._stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Monitor the running loop until stop() or the loop ends"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-monitor")
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _heartbeat(self):
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._beat = now
+                self._record((now - expected) * 1000)
+        finally:
+            self._stop.set()
+
+    def _record(self, lag_ms: float):
+        lag_ms = max(0.0, lag_ms)
+        metrics.observe("event_loop_lag_ms", lag_ms, buckets=LAG_BUCKETS)
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+            metrics.set_gauge("event_loop_lag_max_ms", round(lag_ms, 1))
+        with self._lock:
+            stall, self._stall = self._stall, None
+        if lag_ms < self.threshold * 1000:
+            return
+
+        metrics.incr("event_loop_stalls")
+        metrics.observe("event_loop_stall_ms", lag_ms, buckets=LAG_BUCKETS)
+        if stall is None:
+            # Over the threshold by less than a watchdog tick; no stack
+            stall = {"at": time.time(), "task": None, "stack": []}
+        stall["duration_ms"] = round(lag_ms, 1)
+        self.stalls.append(stall)
+        where = stall["stack"][-1] if stall["stack"] else "unknown"
+        print(f"🐢 Event loop blocked for {lag_ms:.0f}ms in {where} (task: {stall['task']})")
+
+    def _watch(self):
+        period = min(self.interval, self.threshold) / 4
+        while not self._stop.wait(period):
+            overdue = time.monotonic() - self._beat - self.interval
+            if overdue < self.threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            try:
+                task = _task_label(asyncio.current_task(self._loop))
+                stack = thread_stack(frame) if frame is not None else []
+            except (RuntimeError, ValueError, AttributeError):
+                # The loop thread moved on while we were reading it
+                continue
+            with self._lock:
+                self._stall = {"at": time.time(), "task": task, "stack": stack}
+
+    def report(self) -> Dict[str, Any]:
+        """Lag summary and recent stalls, newest first"""
+        stalls: List[Dict[str, Any]] = list(self.stalls)
+        stalls.reverse()
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stalls": stalls,
+        }
+
+
+loop_monitor = LoopMonitor()
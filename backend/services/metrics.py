@@ -0,0 +1,115 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple:
+    return (name,) + tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: Tuple) -> str:
+    name, labels = key[0], key[1:]
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+class Summary:
+    """Running count/sum/min/max plus fixed histogram buckets"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": (self.total / self.count) if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "buckets": dict(zip(labels, self.bucket_counts)),
+        }
+
+
+DEFAULT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry.
+
+    Counters, gauges and summaries are keyed by name plus optional labels
+    and exposed as a JSON snapshot on the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._summaries: Dict[Tuple, Summary] = {}
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary(buckets)
+            summary.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels) -> float:
+        return self._gauges.get(_key(name, labels), 0)
+
+    def snapshot(self, exclude_labels: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """Every series, except those carrying one of exclude_labels"""
+        def shown(key: Tuple) -> bool:
+            return not any(label in exclude_labels for label, _ in key[1:])
+
+        with self._lock:
+            return {
+                "counters": {_format_key(k): v for k, v in self._counters.items() if shown(k)},
+                "gauges": {_format_key(k): v for k, v in self._gauges.items() if shown(k)},
+                "summaries": {_format_key(k): s.snapshot() for k, s in self._summaries.items() if shown(k)},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# "gemini" for the real model, "fake" for offline development,
+# "replay" to answer from a traffic capture (MODEL_REPLAY_PATH)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+
+
+class ModelResponse:
+    """Backend-neutral model response"""
+
+    def __init__(
+        self,
+        text: str,
+        finish_reason: str = "STOP",
+        model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None
+    ):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.model = model
+        # Token counts when the backend reports them
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+
+
+class GeminiBackend:
+    """Google Gemini via google-generativeai"""
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._genai = None
+        self._load_lock = threading.Lock()
+        self._models: Dict[str, Any] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._genai is not None
+
+    def load(self):
+        """
+        Import and configure the SDK. Its gRPC/protobuf stack takes most of
+        a cold start, so this happens on first use (or in a background
+        preload) rather than at import time. Safe to call from a thread.
+        """
+        with self._load_lock:
+            if self._genai is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+        return self._genai
+
+    def _model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._models[model_name] = self.load().GenerativeModel(model_name)
+        return model
+
+    async def generate(self, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> ModelResponse:
+        # Async call so cancelling the caller aborts the request
+        response = await self._model(model_name).generate_content_async(
+            prompt,
+            generation_config=generation_config
+        )
+
+        finish_reason = "STOP"
+        if response.candidates:
+            reason = response.candidates[0].finish_reason
+            finish_reason = getattr(reason, "name", str(reason))
+
+        try:
+            text = response.text
+        except ValueError:
+            # Raised when the candidate has no text parts (e.g. blocked)
+            text = ""
+
+        # Not every library version reports usage
+        usage = getattr(response, "usage_metadata", None)
+        return ModelResponse(
+            text,
+            finish_reason=finish_reason,
+            model=model_name,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None)
+        )
+
+
+def heavy_tailed_latency(median: float = 0.05, slow_fraction: float = 0.1, slow_factor: float = 10.0) -> Callable[[], float]:
+    """Latency sampler: mostly lognormal around median, with occasional very slow calls"""
+    def sample() -> float:
+        latency = random.lognormvariate(0, 0.25) * median
+        if random.random() < slow_fraction:
+            latency *= slow_factor * random.uniform(0.5, 1.5)
+        return latency
+    return sample
+
+
+def default_fake_responder(prompt: str, model_name: str) -> str:
+    """Plausible canned output for the prompts ADOGenerator sends"""
+    if "Application Definition Object" in prompt:
+        return json.dumps({
+            "name": "fake-app",
+            "description": "Generated by the fake backend",
+            "framework": "react",
+            "files": [
+                {"path": "package.json", "type": "json", "content": "", "description": "Package configuration"},
+                {"path": "src/App.jsx", "type": "jsx", "content": "", "description": "Main component", "component": "App"}
+            ],
+            "components": [
+                {"name": "App", "type": "functional", "file_path": "src/App.jsx", "props": [], "imports": ["react"], "exports": ["default"], "description": "Main component"}
+            ],
+            "dependencies": [{"name": "react", "version": "^18.2.0", "dev": False}],
+            "style_config": {"framework": "tailwindcss", "theme": {}, "custom_css": None}
+        })
+    return "export default function App() {\n  return <div className=\"p-4\">Hello from the fake backend</div>;\n}\n"
+
+
+class FakeBackend:
+    """
+    In-process backend for benchmarks and offline development.
+
+    latency() is sampled per call; responder(prompt, model_name) produces
+    the text, cut off at max_output_tokens. Calls honour cancellation like
+    real ones.
+    """
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: Optional[Callable[[], float]] = None,
+        responder: Optional[Callable[[str, str], str]] = None,
+        failure_rate: float = 0.0
+    ):
+        self.latency = latency or (lambda: 0.0)
+        self.responder = responder or default_fake_responder
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> ModelResponse:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise Exception("Fake backend failure")
+        text = self.responder(prompt, model_name)
+        # Cut off at the output budget like the real API (about four characters per token)
+        limit = generation_config.get("max_output_tokens")
+        if limit and len(text) > limit * 4:
+            return ModelResponse(text[:limit * 4], finish_reason="MAX_TOKENS", model=model_name)
+        return ModelResponse(text, model=model_name)
+
+
+def make_backend(api_key: str, kind: str = MODEL_BACKEND):
+    """Backend selected by MODEL_BACKEND"""
+    if kind == "fake":
+        return FakeBackend()
+    if kind == "gemini":
+        return GeminiBackend(api_key)
+    if kind == "replay":
+        from services.traffic_capture import ReplayBackend
+        return ReplayBackend()
+    raise ValueError(f"Unknown model backend: {kind}")
@@ -0,0 +1,287 @@
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from pydantic import BaseModel, Field
+from schemas.application_definition import (
+    ApplicationDefinitionObject, ComponentType, FileDefinition, FileType
+)
+from services.metrics import metrics
+from services.circuit_breaker import BreakerRegistry, CircuitState
+
+# JSON policy (inline or a path to a file) merged over DEFAULT_POLICY
+MODEL_ROUTING_POLICY = os.getenv("MODEL_ROUTING_POLICY", "")
+# Print every routing decision
+MODEL_ROUTING_LOG = os.getenv("MODEL_ROUTING_LOG", "true").lower() == "true"
+
+
+class TierConfig(BaseModel):
+    """A model tier calls can be routed to"""
+    model: str
+    max_output_tokens: int = 8192
+    latency_slo_ms: Optional[float] = None  # skip the tier while its p90 is above this
+
+
+class RouteRule(BaseModel):
+    """How one call type is routed"""
+    tiers: List[str]  # in order of preference
+    min_output_tokens: int = 1024
+    max_output_tokens: Optional[int] = None
+    large_output_tokens: Optional[int] = None  # estimates above this use large_tiers
+    large_tiers: List[str] = Field(default_factory=list)
+    degraded_tiers: List[str] = Field(default_factory=list)  # used instead while overloaded
+
+
+class RoutingPolicy(BaseModel):
+    tiers: Dict[str, TierConfig]
+    routes: Dict[str, RouteRule]
+    headroom: float = 1.5  # output budget = estimate * headroom, clamped to the rule/tier limits
+    max_error_rate: float = 0.5
+    min_samples: int = 10
+    window: int = 100
+    stats_ttl_s: float = 120.0  # older outcomes are forgotten, so a skipped tier is retried
+
+
+DEFAULT_POLICY = {
+    "tiers": {
+        "lite": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 8192},
+        "flash": {"model": "gemini-2.5-flash", "max_output_tokens": 16384},
+        "pro": {"model": "gemini-2.5-pro", "max_output_tokens": 16384},
+    },
+    "routes": {
+        "ado": {"tiers": ["flash", "pro"], "min_output_tokens": 4096, "degraded_tiers": ["lite", "flash"]},
+        "modify": {"tiers": ["flash", "pro"], "min_output_tokens": 4096, "degraded_tiers": ["flash"]},
+        "adapt": {"tiers": ["lite", "flash"], "min_output_tokens": 4096, "degraded_tiers": ["lite"]},
+        "component": {
+            "tiers": ["flash", "pro"],
+            "min_output_tokens": 2048,
+            "large_output_tokens": 6000,
+            "large_tiers": ["pro", "flash"],
+            "degraded_tiers": ["lite", "flash"]
+        },
+        "file": {"tiers": ["lite", "flash"], "min_output_tokens": 1024, "degraded_tiers": ["lite"]},
+        "health": {"tiers": ["lite", "flash"], "min_output_tokens": 100, "max_output_tokens": 100},
+    },
+}
+
+
+def load_policy(source: str = MODEL_ROUTING_POLICY) -> RoutingPolicy:
+    """DEFAULT_POLICY with tiers, routes and settings from source merged over it"""
+    data = json.loads(json.dumps(DEFAULT_POLICY))
+    if source:
+        if os.path.isfile(source):
+            with open(source, "r", encoding="utf-8") as f:
+                source = f.read()
+        override = json.loads(source)
+        data["tiers"].update(override.pop("tiers", {}))
+        data["routes"].update(override.pop("routes", {}))
+        data.update(override)
+    return RoutingPolicy(**data)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+# Typical generated size per file type, in tokens
+FILE_TYPE_TOKENS = {
+    FileType.JSON: 250,
+    FileType.HTML: 250,
+    FileType.MARKDOWN: 400,
+    FileType.CSS: 600,
+    FileType.SCSS: 600,
+    FileType.JAVASCRIPT: 700,
+    FileType.TYPESCRIPT: 700,
+    FileType.JSX: 900,
+    FileType.TSX: 900,
+}
+
+COMPLEX_COMPONENT_TOKENS = 1500
+
+
+def classify_file(file_def: FileDefinition, ado: ApplicationDefinitionObject) -> Tuple[str, int]:
+    """(call type, estimated output tokens) for generating a file"""
+    estimate = FILE_TYPE_TOKENS.get(file_def.type, 700)
+    if file_def.description:
+        # Longer descriptions tend to ask for more code
+        estimate += 4 * estimate_tokens(file_def.description)
+
+    component = None
+    if file_def.component:
+        component = next((c for c in ado.components if c.name == file_def.component), None)
+    if component is None:
+        return "file", estimate
+
+    estimate += 120 * len(component.props) + 60 * (len(component.dependencies) + len(component.imports))
+    if component.type in (ComponentType.PAGE, ComponentType.LAYOUT):
+        estimate += 800
+    if component.type in (ComponentType.PAGE, ComponentType.LAYOUT) or estimate >= COMPLEX_COMPONENT_TOKENS:
+        return "component", estimate
+    return "file", estimate
+
+
+class RouteDecision(BaseModel):
+    call_type: str
+    tier: str
+    model: str
+    max_output_tokens: int
+    estimated_tokens: Optional[int] = None
+    reason: str
+
+
+class _TierStats:
+    __slots__ = ("samples", "ttl")
+
+    def __init__(self, window: int, ttl: float):
+        self.samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window)  # (time, latency, ok)
+        self.ttl = ttl
+
+    def add(self, latency_ms: float, ok: bool):
+        self.samples.append((time.monotonic(), latency_ms, ok))
+
+    def expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def p90_ms(self) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))]
+
+
+class ModelRouter:
+    """
+    Pick a model tier and output budget per call.
+
+    Each call type has tiers in order of preference (a separate list for
+    calls expected to produce large outputs). The first tier that is not
+    currently degraded - error rate above max_error_rate or p90 latency
+    above its SLO over its recent calls - is used. A skipped tier gets no
+    traffic, so its outcomes age out after stats_ttl_s and it is tried
+    again. The output
+    budget follows the size estimate instead of one fixed limit.
+    """
+
+    def __init__(
+        self,
+        policy: Optional[RoutingPolicy] = None,
+        log: bool = MODEL_ROUTING_LOG,
+        breakers: Optional[BreakerRegistry] = None
+    ):
+        self.policy = policy or load_policy()
+        self.log = log
+        # Circuit breakers per model; a tier whose circuit is open is skipped
+        self.breakers = breakers or BreakerRegistry()
+        self._stats: Dict[str, _TierStats] = {}
+
+    def _tier_stats(self, tier: str) -> _TierStats:
+        stats = self._stats.get(tier)
+        if stats is None:
+            stats = self._stats[tier] = _TierStats(self.policy.window, self.policy.stats_ttl_s)
+        stats.expire()
+        return stats
+
+    def _degraded(self, tier: str) -> Optional[str]:
+        if self.breakers.get(self.policy.tiers[tier].model).state == CircuitState.OPEN:
+            return f"{tier} circuit open"
+        stats = self._tier_stats(tier)
+        if len(stats.samples) < self.policy.min_samples:
+            return None
+        error_rate = stats.error_rate()
+        if error_rate > self.policy.max_error_rate:
+            return f"{tier} error rate {error_rate:.0%}"
+        slo = self.policy.tiers[tier].latency_slo_ms
+        p90 = stats.p90_ms()
+        if slo is not None and p90 is not None and p90 > slo:
+            return f"{tier} p90 {p90:.0f}ms over {slo:.0f}ms"
+        return None
+
+    def route(
+        self,
+        call_type: str,
+        estimated_tokens: Optional[int] = None,
+        exclude: Optional[Set[str]] = None,
+        degraded: bool = False
+    ) -> Optional[RouteDecision]:
+        """Decision for a call, or None when every tier for it is excluded"""
+        rule = self.policy.routes.get(call_type) or self.policy.routes["file"]
+        candidates = rule.tiers
+        reason = "preferred"
+        if rule.large_tiers and rule.large_output_tokens and (estimated_tokens or 0) > rule.large_output_tokens:
+            candidates = rule.large_tiers
+            reason = f"large output (~{estimated_tokens} tokens)"
+        if degraded and rule.degraded_tiers:
+            candidates = rule.degraded_tiers
+            reason = "degraded under load"
+        if exclude:
+            candidates = [tier for tier in candidates if tier not in exclude]
+            if not candidates:
+                return None
+            reason = "fallback after " + ", ".join(sorted(exclude))
+
+        tier = None
+        skipped = []
+        for candidate in candidates:
+            problem = self._degraded(candidate)
+            if problem is None:
+                tier = candidate
+                break
+            skipped.append(problem)
+        if tier is None:
+            tier = candidates[0]
+            reason = "all tiers degraded"
+        elif skipped:
+            reason += "; skipped " + ", ".join(skipped)
+
+        config = self.policy.tiers[tier]
+        budget = rule.min_output_tokens
+        if estimated_tokens:
+            budget = max(budget, int(estimated_tokens * self.policy.headroom))
+        budget = min(budget, rule.max_output_tokens or config.max_output_tokens, config.max_output_tokens)
+
+        decision = RouteDecision(
+            call_type=call_type,
+            tier=tier,
+            model=config.model,
+            max_output_tokens=budget,
+            estimated_tokens=estimated_tokens,
+            reason=reason
+        )
+        metrics.incr("model_routes", call_type=call_type, tier=tier)
+        if self.log:
+            print(f"🧭 {call_type} → {tier} ({config.model}, {budget} tokens): {reason}")
+        return decision
+
+    def record(self, tier: str, latency_ms: float, ok: bool):
+        """Feed a call outcome back into the tier's live stats"""
+        stats = self._tier_stats(tier)
+        stats.add(latency_ms, ok)
+        metrics.set_gauge("model_tier_error_rate", stats.error_rate(), tier=tier)
+        if not ok:
+            metrics.incr("model_tier_errors", tier=tier)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            tier: {
+                "model": self.policy.tiers[tier].model,
+                "samples": len(self._tier_stats(tier).samples),
+                "error_rate": self._tier_stats(tier).error_rate(),
+                "p90_ms": self._tier_stats(tier).p90_ms(),
+                "circuit": self.breakers.get(self.policy.tiers[tier].model).state.value,
+                "degraded": self._degraded(tier),
+            }
+            for tier in self.policy.tiers
+        }
+
+
+# Shared by every ADOGenerator so tier stats reflect all traffic
+model_router = ModelRouter()
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Mapping, Optional
+from services.metrics import metrics
+
+# Where profiles are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Milliseconds between samples while a profile is running
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Fraction of sessions profiled without being asked to; changeable at runtime
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Profiles running at once; further requests run unprofiled
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "4"))
+# Profiles kept on disk; the oldest are deleted
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Profile the current request or session belongs to; read by the task factory
+active_profile: ContextVar[Optional["Profile"]] = ContextVar("active_profile", default=None)
+
+# Leading frames of the event loop machinery, left out of stacks
+_LOOP_MODULES = (os.sep + "asyncio" + os.sep, os.sep + "uvicorn" + os.sep, os.sep + "starlette" + os.sep, "threading.py")
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def thread_stack(frame) -> List[str]:
+    """Frames of a running thread, oldest first, starting below the event loop machinery"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    # The callback the loop is running starts after the last loop frame
+    start = 0
+    for i, f in enumerate(frames[:-1]):
+        if any(m in f.f_code.co_filename for m in _LOOP_MODULES):
+            start = i + 1
+    return [_label(f) for f in frames[start:]]
+
+
+def _await_stack(task: asyncio.Task) -> List[str]:
+    """Logical stack of a suspended task: its coroutine's await chain, followed into awaited tasks"""
+    stack = []
+    awaitable: Any = task.get_coro()
+    for _ in range(200):
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is not None:
+            stack.append(_label(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+        elif isinstance(awaitable, asyncio.Task):
+            awaitable = awaitable.get_coro()
+        else:
+            if awaitable is not None:
+                stack.append(type(awaitable).__name__)
+            break
+    return stack
+
+
+class Profile:
+    """Samples collected for one request or session"""
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop, thread_id: int):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.loop = loop
+        self.thread_id = thread_id
+        self.started = time.time()
+        self.duration = 0.0
+        self.tasks: List[asyncio.Task] = []
+        # Task whose await chain stands for the profile while it waits;
+        # defaults to the oldest live task
+        self.root: Optional[asyncio.Task] = None
+        self.samples: Counter = Counter()
+        self.finished = False
+
+    def sample(self, running_frame):
+        """One sample: the running stack if the loop is executing our code, else where we wait"""
+        current = asyncio.current_task(self.loop)
+        if current is not None and current in self.tasks and running_frame is not None:
+            stack = ["[cpu]"] + thread_stack(running_frame)
+        else:
+            root = self.root if self.root is not None and not self.root.done() else None
+            root = root or next((t for t in self.tasks if not t.done()), None)
+            if root is None:
+                return
+            stack = ["[wait]"] + _await_stack(root)
+        self.samples[";".join(stack)] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks ("frame;frame count" per line), as read by flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started": self.started,
+            "duration_s": round(self.duration, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+
+class SamplingProfiler:
+    """
+    Opt-in sampling profiler for single requests and sessions.
+
+    While a profile runs, a background thread wakes every interval and
+    records where the profiled work is: the running stack when the event
+    loop is executing one of its tasks ([cpu] - JSON extraction,
+    validation, sends...) or the await chain of its oldest live task
+    ([wait] - model calls, queues). Tasks join the profile by being
+    created in its context, via a task factory on the loop. Finished
+    profiles are written to PROFILE_DIR as collapsed stacks with a JSON
+    summary next to them.
+    """
+
+    def __init__(
+        self,
+        directory: str = PROFILE_DIR,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        max_active: int = PROFILE_MAX_ACTIVE,
+        keep: int = PROFILE_KEEP
+    ):
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_active = max_active
+        self.keep = keep
+        self._active: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def requested(self, scope: Mapping[str, Any], query_params: Optional[Mapping[str, str]] = None) -> bool:
+        """X-Profile header or ?profile= flag, else the sampling rate decides"""
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        flag = headers.get("x-profile") or (query_params or {}).get("profile")
+        if flag is not None:
+            return flag.lower() in ("1", "true", "yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, name: str, include_current: bool = True) -> Optional[Profile]:
+        """
+        Profile work started from here on in this context; pair with
+        finish(). include_current adds the calling task itself, for
+        requests handled inline rather than by a task started afterwards.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if len(self._active) >= self.max_active:
+                metrics.incr("profiles_skipped")
+                return None
+            profile = Profile(name, loop, threading.get_ident())
+            self._active.append(profile)
+        self._install_task_factory(loop)
+        current = asyncio.current_task()
+        if include_current and current is not None:
+            profile.tasks.append(current)
+        active_profile.set(profile)
+        self._ensure_sampler()
+        print(f"🔬 Profiling {name} ({profile.id})")
+        return profile
+
+    def finish(self, profile: Optional[Profile]):
+        if profile is None or profile.finished:
+            return
+        profile.finished = True
+        profile.duration = time.time() - profile.started
+        with self._lock:
+            self._active.remove(profile)
+        profile.tasks = []
+        profile.root = None
+        self._write(profile)
+        metrics.incr("profiles_written")
+        metrics.observe("profile_duration_ms", profile.duration * 1000)
+
+    def _install_task_factory(self, loop):
+        if getattr(loop.get_task_factory(), "_profiler", None) is self:
+            return
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, context=None):
+            if previous is not None:
+                task = previous(loop, coro) if context is None else previous(loop, coro, context=context)
+            else:
+                task = asyncio.Task(coro, loop=loop, context=context)
+            profile = context.get(active_profile) if context is not None else active_profile.get()
+            if profile is not None and not profile.finished:
+                profile.tasks.append(task)
+            return task
+
+        factory._profiler = self
+        loop.set_task_factory(factory)
+
+    def _ensure_sampler(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    profile.sample(frames.get(profile.thread_id))
+                except (RuntimeError, ValueError, AttributeError):
+                    # The loop thread moved on while we were reading it
+                    pass
+
+    def _write(self, profile: Profile):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile.id}.folded"), "w", encoding="utf-8") as f:
+            f.write(profile.folded())
+        with open(os.path.join(self.directory, f"{profile.id}.json"), "w", encoding="utf-8") as f:
+            json.dump(profile.summary(), f)
+        print(f"🔬 Wrote profile {profile.id}: {sum(profile.samples.values())} samples over {profile.duration:.2f}s")
+
+        summaries = self.list()
+        for old in summaries[self.keep:]:
+            for ext in ("folded", "json"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{old['id']}.{ext}"))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the profiles on disk, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(summaries, key=lambda s: s["started"], reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Path of a profile's collapsed stacks, if it exists"""
+        if not profile_id.isalnum():
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.folded")
+        return path if os.path.isfile(path) else None
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from schemas.application_definition import (
+    ApplicationDefinitionObject,
+    ComponentDefinition,
+    ComponentType,
+    Dependency,
+    FileDefinition,
+    FileType
+)
+
+# File extension -> ADO file type
+EXTENSION_FILE_TYPES = {
+    ".js": FileType.JAVASCRIPT,
+    ".mjs": FileType.JAVASCRIPT,
+    ".jsx": FileType.JSX,
+    ".ts": FileType.TYPESCRIPT,
+    ".tsx": FileType.TSX,
+    ".css": FileType.CSS,
+    ".scss": FileType.SCSS,
+    ".json": FileType.JSON,
+    ".html": FileType.HTML,
+    ".md": FileType.MARKDOWN,
+}
+
+COMPONENT_FILE_TYPES = {FileType.JSX, FileType.TSX}
+# Files whose imports and exports are extracted
+SCRIPT_TYPES = {FileType.JAVASCRIPT, FileType.TYPESCRIPT, FileType.JSX, FileType.TSX}
+
+IMPORT_PATTERN = re.compile(
+    r"""(?:import\s+(?:[\w*{}\s,]+\s+from\s+)?|require\(\s*)['"]([^'"]+)['"]"""
+)
+NAMED_EXPORT_PATTERN = re.compile(
+    r"export\s+(?:async\s+)?(?:const|let|var|function\*?|class)\s+([A-Za-z_$][\w$]*)"
+)
+EXPORT_LIST_PATTERN = re.compile(r"export\s*\{([^}]*)\}")
+DEFAULT_EXPORT_PATTERN = re.compile(r"export\s+default\b")
+
+
+def compute_content_hash(content: str) -> str:
+    """Stable hash of a file's content, used as the index cache key"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def infer_file_type(path: str) -> FileType:
+    """Infer the ADO file type from a path, defaulting to plain JavaScript"""
+    dot = path.rfind(".")
+    if dot == -1:
+        return FileType.JAVASCRIPT
+    return EXTENSION_FILE_TYPES.get(path[dot:].lower(), FileType.JAVASCRIPT)
+
+
+class ContentAnalysis(BaseModel):
+    """Everything we can learn from a file's content alone"""
+    content_hash: str
+    imports: List[str] = Field(default_factory=list)
+    exports: List[str] = Field(default_factory=list)
+    has_default_export: bool = False
+    dependencies: List[Dependency] = Field(default_factory=list)  # package.json only
+
+
+class IndexedFile(BaseModel):
+    """Index entry for a single project file"""
+    path: str
+    type: FileType
+    analysis: ContentAnalysis
+    component_name: Optional[str] = None
+
+
+class ProjectIndex(BaseModel):
+    """Per-project view over indexed files"""
+    files: Dict[str, IndexedFile] = Field(default_factory=dict)
+    dependencies: List[Dependency] = Field(default_factory=list)
+
+    @property
+    def component_files(self) -> List[IndexedFile]:
+        return [f for f in self.files.values() if f.component_name]
+
+
+class ProjectIndexer:
+    """
+    Incremental project indexer keyed on file content hashes.
+
+    Content analysis (imports, exports, package.json dependencies) runs once
+    per unique file content and is shared across messages and sessions, so
+    re-indexing a project only pays for files that actually changed.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, ContentAnalysis]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, path: str, content: str) -> ContentAnalysis:
+        """Return the (cached) content analysis for a file"""
+        content_hash = compute_content_hash(content)
+        # The same content analyzes differently as package.json, a script or anything else
+        key = f"{self._analysis_kind(path)}:{content_hash}"
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        analysis = self._analyze_content(path, content, content_hash)
+        self._cache[key] = analysis
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return analysis
+
+    def index_files(self, files: Dict[str, str]) -> ProjectIndex:
+        """Index a path -> content mapping"""
+        index = ProjectIndex()
+
+        for path, content in files.items():
+            file_type = infer_file_type(path)
+            analysis = self.analyze(path, content)
+
+            component_name = None
+            if file_type in COMPONENT_FILE_TYPES and analysis.has_default_export:
+                component_name = path.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+            index.files[path] = IndexedFile(
+                path=path,
+                type=file_type,
+                analysis=analysis,
+                component_name=component_name
+            )
+
+        package_json = index.files.get("package.json") or index.files.get("frontend/package.json")
+        if package_json:
+            index.dependencies = package_json.analysis.dependencies
+
+        return index
+
+    def build_ado(self, files: Dict[str, str], index: Optional[ProjectIndex] = None) -> ApplicationDefinitionObject:
+        """Create a basic ADO from existing files using the index"""
+        if index is None:
+            index = self.index_files(files)
+
+        file_definitions = [
+            FileDefinition(
+                path=path,
+                type=indexed.type,
+                content=files[path],
+                description="Generated from existing file",
+                component=indexed.component_name
+            )
+            for path, indexed in index.files.items()
+        ]
+
+        components = [
+            ComponentDefinition(
+                name=indexed.component_name,
+                type=ComponentType.FUNCTIONAL,
+                file_path=indexed.path,
+                imports=indexed.analysis.imports,
+                exports=indexed.analysis.exports,
+                description=f"Component from {indexed.path}"
+            )
+            for indexed in index.component_files
+        ]
+
+        return ApplicationDefinitionObject(
+            name="existing-app",
+            description="Application created from existing files",
+            framework="react",
+            files=file_definitions,
+            components=components,
+            dependencies=list(index.dependencies)
+        )
+
+    @staticmethod
+    def _analysis_kind(path: str) -> str:
+        if path.endswith("package.json"):
+            return "package"
+        if infer_file_type(path) in SCRIPT_TYPES:
+            return "script"
+        return "other"
+
+    @classmethod
+    def _analyze_content(cls, path: str, content: str, content_hash: str) -> ContentAnalysis:
+        """Extract imports, exports and dependencies from raw content"""
+        analysis = ContentAnalysis(content_hash=content_hash)
+        kind = cls._analysis_kind(path)
+
+        if kind == "package":
+            try:
+                package_data = json.loads(content)
+                for name, version in package_data.get("dependencies", {}).items():
+                    analysis.dependencies.append(Dependency(name=name, version=version, dev=False))
+                for name, version in package_data.get("devDependencies", {}).items():
+                    analysis.dependencies.append(Dependency(name=name, version=version, dev=True))
+            except (ValueError, AttributeError, TypeError):
+                pass
+            return analysis
+
+        if kind != "script":
+            return analysis
+
+        imports = []
+        for module in IMPORT_PATTERN.findall(content):
+            if module not in imports:
+                imports.append(module)
+        analysis.imports = imports
+
+        exports = []
+        if DEFAULT_EXPORT_PATTERN.search(content):
+            analysis.has_default_export = True
+            exports.append("default")
+        for name in NAMED_EXPORT_PATTERN.findall(content):
+            if name not in exports:
+                exports.append(name)
+        for group in EXPORT_LIST_PATTERN.findall(content):
+            for item in group.split(","):
+                name = item.strip().split(" as ")[-1].strip()
+                if name and name not in exports:
+                    exports.append(name)
+        analysis.exports = exports
+
+        return analysis
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import random
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from schemas.application_definition import ApplicationDefinitionObject, GenerationRequest
+from services.metrics import metrics
+from services.search_index import tokenize
+from services.tenancy import current_tenant
+
+# Start from the ADO of a near-identical earlier prompt instead of generating one
+PROMPT_REUSE = os.getenv("PROMPT_REUSE", "true").lower() == "true"
+# Similarity (Jaccard over prompt terms) from which a stored ADO is adapted
+# by a cheap model call instead of generated from scratch
+PROMPT_REUSE_THRESHOLD = float(os.getenv("PROMPT_REUSE_THRESHOLD", "0.8"))
+# Similarity from which the stored ADO is used as-is, with no model call
+PROMPT_REUSE_EXACT = float(os.getenv("PROMPT_REUSE_EXACT", "1.0"))
+# Prompts kept in the index; the least recently used are dropped
+PROMPT_REUSE_MAX_ENTRIES = int(os.getenv("PROMPT_REUSE_MAX_ENTRIES", "5000"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def prompt_terms(prompt: str) -> FrozenSet[str]:
+    """Word set of a prompt, without stop words, order or simple plurals"""
+    terms = set()
+    for token in tokenize(prompt):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.add(token)
+    return frozenset(terms)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class PromptMatch:
+    """A stored prompt similar to the one looked up"""
+    __slots__ = ("prompt", "ado", "similarity", "cost_ms")
+
+    def __init__(self, prompt: str, ado: ApplicationDefinitionObject, similarity: float, cost_ms: float):
+        self.prompt = prompt
+        self.ado = ado
+        self.similarity = similarity
+        self.cost_ms = cost_ms
+
+
+class PromptReuseIndex:
+    """
+    Similarity index over prompts whose ADOs were generated by the model.
+
+    Prompts are reduced to term sets and MinHash signatures; LSH buckets
+    (bands of the signature) find candidates in constant time, and the
+    exact Jaccard similarity of the term sets ranks them. Requests only
+    match prompts of the same tenant with the same framework, style
+    framework and additional requirements. Entries keep the time the original generation took, so
+    reuse can be reported as time saved.
+    """
+
+    def __init__(
+        self,
+        threshold: float = PROMPT_REUSE_THRESHOLD,
+        exact: float = PROMPT_REUSE_EXACT,
+        max_entries: int = PROMPT_REUSE_MAX_ENTRIES,
+        permutations: int = 64,
+        bands: int = 16
+    ):
+        self.threshold = threshold
+        self.exact = exact
+        self.max_entries = max_entries
+        self.rows = permutations // bands
+        self.bands = bands
+        rng = random.Random(5381)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(self.rows * bands)
+        ]
+        # entry id -> (namespace, terms, band keys, prompt, ado, cost_ms)
+        self._entries: "OrderedDict[int, Tuple]" = OrderedDict()
+        self._buckets: Dict[Tuple, Set[int]] = {}
+        self._next_id = 0
+        self.lookups = 0
+        self.reused = 0
+        self.adapted = 0
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def namespace(request: GenerationRequest) -> Tuple:
+        return (
+            current_tenant.get(), request.framework, request.style_framework.value,
+            request.additional_requirements or ""
+        )
+
+    def signature(self, terms: FrozenSet[str]) -> List[int]:
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in terms] or [0]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._permutations]
+
+    def _band_keys(self, namespace: Tuple, terms: FrozenSet[str]) -> List[Tuple]:
+        signature = self.signature(terms)
+        return [
+            (namespace, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def add(self, request: GenerationRequest, ado: ApplicationDefinitionObject, cost_ms: float):
+        """Remember the ADO generated for a request and how long generating it took"""
+        namespace = self.namespace(request)
+        terms = prompt_terms(request.prompt)
+        if not terms:
+            return
+        keys = self._band_keys(namespace, terms)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (namespace, terms, keys, request.prompt, ado, cost_ms)
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            old_id, old = self._entries.popitem(last=False)
+            for key in old[2]:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+        metrics.set_gauge("prompt_reuse_entries", len(self._entries))
+
+    def lookup(self, request: GenerationRequest) -> Optional[PromptMatch]:
+        """Most similar stored prompt at or above the threshold, if any"""
+        self.lookups += 1
+        namespace = self.namespace(request)
+        terms = prompt_terms(request.prompt)
+        candidates: Set[int] = set()
+        if terms:
+            for key in self._band_keys(namespace, terms):
+                candidates |= self._buckets.get(key, set())
+
+        best_id, best = None, 0.0
+        for entry_id in candidates:
+            similarity = jaccard(terms, self._entries[entry_id][1])
+            if similarity > best or (similarity == best and best_id is not None and entry_id > best_id):
+                best_id, best = entry_id, similarity
+        if best_id is None or best < self.threshold:
+            metrics.incr("prompt_reuse", outcome="miss")
+            return None
+
+        self._entries.move_to_end(best_id)
+        _, _, _, prompt, ado, cost_ms = self._entries[best_id]
+        return PromptMatch(prompt, ado, best, cost_ms)
+
+    def record_hit(self, outcome: str, saved_ms: float):
+        """Count a lookup served from the index: outcome is "reused" or "adapted" """
+        if outcome == "reused":
+            self.reused += 1
+        else:
+            self.adapted += 1
+        self.saved_ms += max(0.0, saved_ms)
+        metrics.incr("prompt_reuse", outcome=outcome)
+        metrics.incr("prompt_reuse_saved_ms", round(max(0.0, saved_ms)))
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+        metrics.set_gauge("prompt_reuse_entries", 0)
+
+    def snapshot(self) -> Dict:
+        hits = self.reused + self.adapted
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "reused": self.reused,
+            "adapted": self.adapted,
+            "hit_rate": round(hits / self.lookups, 3) if self.lookups else 0.0,
+            "saved_ms": round(self.saved_ms),
+        }
+
+
+# Process-wide index shared by every generator
+prompt_index = PromptReuseIndex()
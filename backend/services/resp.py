@@ -0,0 +1,112 @@
+import asyncio
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply from a Redis-compatible server"""
+
+
+def parse_redis_url(url: str) -> Tuple[str, int, int, Optional[str]]:
+    """(host, port, db, password) from redis://[:password@]host[:port][/db]"""
+    parsed = urlparse(url)
+    db = int(parsed.path.lstrip("/") or 0)
+    return parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8")
+    if kind == b"-":
+        raise RespError(payload.decode("utf-8"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RespError(f"Unexpected reply: {line!r}")
+
+
+class RespConnection:
+    """
+    Minimal RESP2 client over asyncio streams.
+
+    Enough for the session bus (lists, strings, pub/sub) against Redis or
+    any server speaking its protocol, without a client library dependency.
+    Commands on one connection are serialized.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+        # Set when a command was interrupted before its reply was read:
+        # the next command would read that reply instead of its own
+        self.broken = False
+
+    @classmethod
+    async def open(cls, url: str) -> "RespConnection":
+        host, port, db, password = parse_redis_url(url)
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        if password:
+            await connection.execute("AUTH", password)
+        if db:
+            await connection.execute("SELECT", db)
+        return connection
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._lock:
+            if self.broken:
+                raise ConnectionError("Connection lost track of its replies")
+            try:
+                self._writer.write(encode_command(*args))
+                await self._writer.drain()
+                return await read_reply(self._reader)
+            except RespError:
+                raise
+            except BaseException:
+                # Cancelled or failed mid-exchange: the connection cannot be reused
+                self.broken = True
+                self._writer.close()
+                raise
+
+    async def subscribe(self, channel: str):
+        """Switch to pub/sub mode on this connection"""
+        self._writer.write(encode_command("SUBSCRIBE", channel))
+        await self._writer.drain()
+        await read_reply(self._reader)  # subscription confirmation
+
+    async def next_message(self) -> List[Any]:
+        """Next pub/sub push: [b"message", channel, data]"""
+        return await read_reply(self._reader)
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from schemas.application_definition import ApplicationDefinitionObject
+from services.project_index import compute_content_hash
+
+# Field weights: a hit in a path or component name says far more about
+# relevance than a hit somewhere in the file body.
+FIELD_WEIGHTS = {
+    "path": 3.0,
+    "component": 3.0,
+    "prop": 2.0,
+    "route": 2.0,
+    "content": 1.0,
+}
+
+STOP_WORDS = {
+    "a", "an", "and", "the", "to", "of", "in", "on", "for", "with", "is", "it",
+    "make", "add", "change", "update", "please", "can", "you", "i", "want",
+    "my", "me", "be", "should", "so", "that", "this", "from", "all", "js",
+    "jsx", "tsx", "ts", "src", "const", "return", "import", "export", "default",
+}
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z][a-z]*|[A-Z]+(?![a-z])|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, breaking camelCase and path separators"""
+    return [
+        token.lower()
+        for token in TOKEN_PATTERN.findall(text)
+        if len(token) > 1 and token.lower() not in STOP_WORDS
+    ]
+
+
+def project_version(ado: ApplicationDefinitionObject) -> str:
+    """Version key for an ADO's searchable surface"""
+    parts = [f"{f.path}:{compute_content_hash(f.content)}:{f.component or ''}" for f in ado.files]
+    parts.extend(f"{c.name}:{c.file_path}:{','.join(p.name for p in c.props)}" for c in ado.components)
+    parts.extend(f"{r.path}:{r.component}" for r in ado.routes)
+    return compute_content_hash("|".join(parts))
+
+
+class ProjectSearchIndex:
+    """
+    BM25 index over a single project version.
+
+    Each file is a document whose terms come from its path, the components
+    it defines, their props, the routes that render them and its content.
+    """
+
+    def __init__(self, ado: ApplicationDefinitionObject, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Counter] = {}
+        self.names: Dict[str, set] = {}
+
+        components_by_file: Dict[str, list] = {}
+        for component in ado.components:
+            components_by_file.setdefault(component.file_path, []).append(component)
+        component_files = {c.name: c.file_path for c in ado.components}
+        routes_by_file: Dict[str, list] = {}
+        for route in ado.routes:
+            file_path = component_files.get(route.component)
+            if file_path:
+                routes_by_file.setdefault(file_path, []).append(route)
+
+        for file_def in ado.files:
+            terms: Counter = Counter()
+            self._add(terms, "path", file_def.path)
+            self._add(terms, "content", file_def.content)
+
+            names = {file_def.path.rsplit("/", 1)[-1].rsplit(".", 1)[0].lower()}
+            if file_def.component:
+                self._add(terms, "component", file_def.component)
+                names.add(file_def.component.lower())
+            for component in components_by_file.get(file_def.path, []):
+                self._add(terms, "component", component.name)
+                names.add(component.name.lower())
+                for prop in component.props:
+                    self._add(terms, "prop", prop.name)
+            for route in routes_by_file.get(file_def.path, []):
+                self._add(terms, "route", route.path)
+
+            self.documents[file_def.path] = terms
+            self.names[file_def.path] = names
+
+        self.doc_lengths = {path: sum(terms.values()) for path, terms in self.documents.items()}
+        self.avg_doc_length = (sum(self.doc_lengths.values()) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        document_frequency: Counter = Counter()
+        for terms in self.documents.values():
+            document_frequency.update(terms.keys())
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    @staticmethod
+    def _add(terms: Counter, field: str, text: str):
+        weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            terms[token] += weight
+
+    def rank(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Rank files by BM25 relevance to a query"""
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.documents:
+            return []
+
+        scores = []
+        for path, terms in self.documents.items():
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[path] / (self.avg_doc_length or 1.0))
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((path, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:limit]
+
+    def select_targets(self, query: str, max_files: int = 5, relative_cutoff: float = 0.5) -> List[str]:
+        """
+        Pick the files a modification prompt most likely touches: every file
+        named explicitly in the prompt, then the best BM25 matches scoring
+        within relative_cutoff of the top hit.
+        """
+        words = {w.lower() for w in re.findall(r"[A-Za-z_$][\w$-]*", query)}
+        targets = [path for path, names in self.names.items() if names & words]
+
+        ranked = self.rank(query, limit=max_files)
+        if ranked:
+            cutoff = ranked[0][1] * relative_cutoff
+            for path, score in ranked:
+                if score >= cutoff and path not in targets:
+                    targets.append(path)
+
+        return targets
+
+
+class SearchIndexCache:
+    """LRU of search indexes keyed by project version"""
+
+    def __init__(self, max_projects: int = 64):
+        self.max_projects = max_projects
+        self._indexes: "OrderedDict[str, ProjectSearchIndex]" = OrderedDict()
+
+    def get(self, ado: ApplicationDefinitionObject, version: Optional[str] = None) -> ProjectSearchIndex:
+        version = version or project_version(ado)
+        index = self._indexes.get(version)
+        if index is None:
+            index = ProjectSearchIndex(ado)
+            self._indexes[version] = index
+            if len(self._indexes) > self.max_projects:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(version)
+        return index
@@ -0,0 +1,106 @@
+import json
+import weakref
+from typing import Any, Dict
+from fastapi.responses import Response
+from pydantic import BaseModel
+from schemas.application_definition import ApplicationDefinitionObject
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, falls back to the json module
+    orjson = None
+
+
+class RawJSON:
+    """Already-serialized JSON bytes to be spliced into an event verbatim"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, RawJSON):
+        return json.loads(obj.data)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize plain data (dicts, lists, enums, models) straight to bytes"""
+    if isinstance(obj, BaseModel):
+        return type(obj).__pydantic_serializer__.to_json(obj, indent=2 if indent else None)
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, default=_default, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# id(ado) -> serialized bytes. Entries are dropped by a weakref finalizer
+# when the ADO is collected, so an id can never map to a stale object.
+_ado_cache: Dict[int, bytes] = {}
+
+
+def ado_json(ado: ApplicationDefinitionObject) -> bytes:
+    """
+    Serialized form of an ADO, computed once per ADO version.
+
+    ADOs are treated as immutable once serialized; code that mutates one in
+    place afterwards (e.g. ADOValidator.enrich_ado) must call invalidate().
+    """
+    key = id(ado)
+    cached = _ado_cache.get(key)
+    if cached is None:
+        cached = type(ado).__pydantic_serializer__.to_json(ado)
+        if key not in _ado_cache:
+            weakref.finalize(ado, _ado_cache.pop, key, None)
+        _ado_cache[key] = cached
+    return cached
+
+
+def invalidate(ado: ApplicationDefinitionObject):
+    """Forget the cached serialization of an ADO that was mutated in place"""
+    _ado_cache.pop(id(ado), None)
+
+
+def raw_ado(ado: ApplicationDefinitionObject) -> RawJSON:
+    """Embed an ADO in an event without converting it to a dict first"""
+    return RawJSON(ado_json(ado))
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """
+    Serialize an event to JSON bytes, splicing top-level RawJSON values in
+    as-is instead of re-encoding them.
+    """
+    if not any(isinstance(value, RawJSON) for value in event.values()):
+        return dumps(event)
+
+    parts = []
+    for key, value in event.items():
+        encoded = value.data if isinstance(value, RawJSON) else dumps(value)
+        parts.append(dumps(key) + b":" + encoded)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def materialize(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace RawJSON values with plain data (for non-JSON encodings)"""
+    if not any(isinstance(value, RawJSON) for value in event.values()):
+        return event
+    return {key: loads(value.data) if isinstance(value, RawJSON) else value for key, value in event.items()}
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by the serializer instead of jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
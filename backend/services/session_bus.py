@@ -0,0 +1,233 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from services import serialization
+from services.metrics import metrics
+from services.resp import RespConnection
+
+# "" or memory:// for a single process, redis://host:port/db to share across replicas
+SESSION_BUS_URL = os.getenv("SESSION_BUS_URL", "")
+# Seconds session events and shared state are kept
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+
+# Events after which a session produces nothing more
+TERMINAL_EVENTS = {"finish", "error", "cancelled", "rejected"}
+
+
+class InProcessBus:
+    """
+    Session events and state for a single process.
+
+    A session's log is kept for `ttl` seconds after its terminal event so
+    clients can still catch up. A session that cannot be resumed and has no
+    followers keeps only its terminal event. Logs are capped at `max_sessions`.
+    """
+    name = "memory"
+    shared = False
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._logs: "OrderedDict[str, list]" = OrderedDict()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._followers: Dict[str, int] = {}
+        # session id -> expiry time, in the order sessions finished
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+        self._state: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def publish(self, session_id: str, event: bytes) -> int:
+        """Append an event to a session's log; returns its index"""
+        self._expire()
+        log = self._logs.setdefault(session_id, [])
+        self._logs.move_to_end(session_id)
+        log.append(event)
+        changed = self._changed.pop(session_id, None)
+        if changed is not None:
+            changed.set()
+        while len(self._logs) > self.max_sessions:
+            dropped, _ = self._logs.popitem(last=False)
+            self._drop(dropped)
+        return len(log) - 1
+
+    async def finish(self, session_id: str, keep: bool = True):
+        """Called after a session's terminal event: schedule its log for expiry"""
+        log = self._logs.get(session_id)
+        if log and not keep and not self._followers.get(session_id):
+            # Nobody can resume it: keep only the terminal event for late followers
+            log[:-1] = [None] * (len(log) - 1)
+        self._expires[session_id] = time.monotonic() + self.ttl
+        self._expires.move_to_end(session_id)
+
+    async def events(self, session_id: str, start: int = 0) -> AsyncIterator[Tuple[int, bytes]]:
+        """(index, event) from start on: the backlog first, then live events"""
+        index = start
+        self._followers[session_id] = self._followers.get(session_id, 0) + 1
+        try:
+            while True:
+                log = self._logs.get(session_id, [])
+                while index < len(log):
+                    if log[index] is not None:
+                        yield index, log[index]
+                    index += 1
+                changed = self._changed.get(session_id)
+                if changed is None:
+                    changed = self._changed[session_id] = asyncio.Event()
+                await changed.wait()
+        finally:
+            followers = self._followers.pop(session_id, 1) - 1
+            if followers:
+                self._followers[session_id] = followers
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._expires:
+            session_id, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            self._logs.pop(session_id, None)
+            self._drop(session_id)
+
+    def _drop(self, session_id: str):
+        self._changed.pop(session_id, None)
+        self._expires.pop(session_id, None)
+
+    async def set_state(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._state[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._state.move_to_end(key)
+        while len(self._state) > self.max_sessions:
+            self._state.popitem(last=False)
+
+    async def get_state(self, key: str) -> Optional[bytes]:
+        entry = self._state.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._state[key]
+            return None
+        return entry[1]
+
+    async def close(self):
+        pass
+
+
+class RedisBus:
+    """
+    Session events and state in a Redis-compatible server.
+
+    A session's events are a list (so a late or reconnecting subscriber can
+    replay them) and each append is announced on a channel of the same name
+    so live subscribers on any replica wake up.
+    """
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "xverta", ttl: int = SESSION_TTL):
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self._connection: Optional[RespConnection] = None
+        self._connect_lock = asyncio.Lock()
+
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}:events:{session_id}"
+
+    def _state_key(self, key: str) -> str:
+        return f"{self.prefix}:state:{key}"
+
+    async def _execute(self, *args: Any) -> Any:
+        async with self._connect_lock:
+            if self._connection is None or self._connection.broken:
+                self._connection = await RespConnection.open(self.url)
+        try:
+            return await self._connection.execute(*args)
+        except (ConnectionError, OSError):
+            # Reconnect once on a dropped connection
+            self._connection = None
+            async with self._connect_lock:
+                if self._connection is None:
+                    self._connection = await RespConnection.open(self.url)
+            return await self._connection.execute(*args)
+
+    async def publish(self, session_id: str, event: bytes) -> int:
+        key = self._events_key(session_id)
+        length = await self._execute("RPUSH", key, event)
+        if length == 1:
+            await self._execute("EXPIRE", key, self.ttl)
+        await self._execute("PUBLISH", key, length)
+        return length - 1
+
+    async def events(self, session_id: str, start: int = 0) -> AsyncIterator[Tuple[int, bytes]]:
+        key = self._events_key(session_id)
+        subscription = await RespConnection.open(self.url)
+        try:
+            # Subscribe before reading the backlog so no append is missed
+            await subscription.subscribe(key)
+            index = start
+            while True:
+                for event in await self._execute("LRANGE", key, index, -1) or []:
+                    yield index, event
+                    index += 1
+                await subscription.next_message()
+        finally:
+            await subscription.close()
+
+    async def finish(self, session_id: str, keep: bool = True):
+        # Other replicas may follow the session, so the log always gets its TTL
+        await self._execute("EXPIRE", self._events_key(session_id), self.ttl)
+
+    async def set_state(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await self._execute("SET", self._state_key(key), value, "EX", ttl or self.ttl)
+
+    async def get_state(self, key: str) -> Optional[bytes]:
+        return await self._execute("GET", self._state_key(key))
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+def make_bus(url: str = SESSION_BUS_URL):
+    """Bus selected by SESSION_BUS_URL"""
+    if not url or url.startswith("memory://"):
+        return InProcessBus()
+    if url.startswith("redis://"):
+        return RedisBus(url)
+    raise ValueError(f"Unsupported session bus URL: {url}")
+
+
+class SessionPublisher:
+    """
+    Sender for a generation session: every event is numbered, appended to
+    the session's log on the bus and passed on to the local client.
+    Clients on other replicas follow the same log via the bus.
+    """
+
+    def __init__(self, bus, session_id: str, sender=None, resumable: bool = False):
+        self.bus = bus
+        self.session_id = session_id
+        self.sender = sender
+        # Resumable sessions outlive their client connection
+        self.resumable = resumable
+        self.seq = 0
+
+    def detach(self):
+        """Stop sending to the local client; events still go to the bus"""
+        self.sender = None
+
+    async def send_json(self, event: Dict[str, Any]):
+        event = dict(event, seq=self.seq)
+        self.seq += 1
+        await self.bus.publish(self.session_id, serialization.encode_event(event))
+        metrics.incr("session_events_published", bus=self.bus.name)
+        if event.get("event") in TERMINAL_EVENTS:
+            await self.bus.finish(self.session_id, keep=self.resumable)
+        if self.sender is not None:
+            try:
+                await self.sender.send_json(event)
+            except Exception:
+                if not self.resumable:
+                    raise
+                self.detach()
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from services.metrics import metrics
+
+T = TypeVar("T")
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for a call from its prompt and configuration"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls.
+
+    The first caller for a key starts the call as its own task; callers
+    arriving while it is in flight await the same task instead of issuing
+    a duplicate request. The task is only cancelled once every caller
+    waiting on it has gone away, so one client disconnecting does not fail
+    the others. Nothing is kept after completion; this is not a cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.calls += 1
+            metrics.incr("singleflight_calls", group=self.name)
+        else:
+            self.coalesced += 1
+            metrics.incr("singleflight_coalesced", group=self.name)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,94 @@
+import asyncio
+import math
+import os
+import time
+from typing import AsyncIterator, Optional, Tuple
+from services.metrics import metrics
+from services.serialization import loads
+from services.session_bus import TERMINAL_EVENTS
+
+# Seconds between keep-alive comments while a session is quiet, so proxies
+# do not time out an idle stream
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+# Milliseconds a disconnected EventSource waits before reconnecting
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "2000"))
+# Seconds an SSE session keeps generating once no client follows it on any
+# replica; 0 lets abandoned sessions run to the end
+SSE_ABANDON_AFTER = float(os.getenv("SSE_ABANDON_AFTER", "60"))
+
+
+def followed_key(session_id: str) -> str:
+    """Bus state key that exists while some SSE client follows a session"""
+    return f"followed:{session_id}"
+
+
+def event_id(session_id: str, seq: int) -> str:
+    """SSE id of an event: enough to resume the session from any replica"""
+    return f"{session_id}:{seq}"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(session_id, seq) from a Last-Event-ID header, or None"""
+    if not value or ":" not in value:
+        return None
+    session_id, _, seq = value.rpartition(":")
+    try:
+        return session_id, int(seq)
+    except ValueError:
+        return None
+
+
+def format_event(session_id: str, seq: int, name: str, data: bytes) -> bytes:
+    # Compact JSON has no raw newlines, so one data line carries the event
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id(session_id, seq).encode(), name.encode(), data)
+
+
+async def session_stream(
+    bus,
+    session_id: str,
+    start: int = 0,
+    heartbeat: float = SSE_HEARTBEAT,
+    abandon_after: float = SSE_ABANDON_AFTER
+) -> AsyncIterator[bytes]:
+    """
+    A generation session as a text/event-stream body, from event `start`
+    on, ending after the terminal event. Events are the bus log entries
+    unchanged, so the sequence matches what WebSocket clients receive.
+    While the stream is open it keeps followed_key() alive on the bus.
+    """
+    events = bus.events(session_id, start)
+    pending = None
+    marked = None
+    try:
+        yield b"retry: %d\n\n" % SSE_RETRY_MS
+        while True:
+            if abandon_after > 0 and (marked is None or time.monotonic() - marked >= heartbeat):
+                marked = time.monotonic()
+                await bus.set_state(followed_key(session_id), b"1", ttl=math.ceil(heartbeat + abandon_after))
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat)
+            if not done:
+                yield b": keep-alive\n\n"
+                continue
+            index, raw = pending.result()
+            pending = None
+            name = loads(raw).get("event", "message")
+            metrics.incr("sse_events_sent")
+            yield format_event(session_id, index, name, raw)
+            if name in TERMINAL_EVENTS:
+                return
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await events.aclose()
+
+
+async def cancel_when_abandoned(bus, session_id: str, generation: asyncio.Task, cancel, after: float = SSE_ABANDON_AFTER):
+    """Await cancel() once no SSE client has followed the session for `after` seconds"""
+    while not generation.done():
+        await asyncio.wait({generation}, timeout=after)
+        if not generation.done() and await bus.get_state(followed_key(session_id)) is None:
+            await cancel()
+            return
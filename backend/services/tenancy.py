@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Mapping, Optional
+from pydantic import BaseModel, Field
+from services.metrics import metrics
+
+# {"default": {...}, "tenants": {"acme": {"weight": 4, "max_concurrent": 8, "api_keys": ["..."]}}}
+# inline or a path to a JSON file
+TENANT_CONFIG = os.getenv("TENANT_CONFIG", "")
+# Model calls running at once across all tenants; 0 disables fair queuing
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "16"))
+
+ANONYMOUS_TENANT = "anonymous"
+
+# Tenant the current session runs for; read where model calls are made
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=ANONYMOUS_TENANT)
+
+
+class TenantSettings(BaseModel):
+    weight: float = 1.0  # share of model capacity under contention
+    max_concurrent: int = 4  # generations running at once
+    api_keys: List[str] = Field(default_factory=list)
+
+
+class TenantConfig(BaseModel):
+    default: TenantSettings = Field(default_factory=TenantSettings)
+    tenants: Dict[str, TenantSettings] = Field(default_factory=dict)
+
+
+def load_tenant_config(source: str = TENANT_CONFIG) -> TenantConfig:
+    if not source:
+        return TenantConfig()
+    if os.path.isfile(source):
+        with open(source, "r", encoding="utf-8") as f:
+            source = f.read()
+    return TenantConfig(**json.loads(source))
+
+
+def _headers(scope: Mapping[str, Any]) -> Dict[str, str]:
+    return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+
+
+class TenantRegistry:
+    """
+    Tenant identity, concurrency quotas and usage accounting.
+
+    A caller is identified by its API key (X-API-Key / Authorization:
+    Bearer, or ?api_key= on WebSockets, where browsers cannot set headers)
+    when the key is listed in the config. The X-Tenant-ID header (?tenant=
+    on WebSockets) is only trusted for configured tenants without keys.
+    Everyone else, including unknown keys and tenant names, shares the
+    anonymous tenant, so made-up identities cannot get fresh quotas or
+    grow the usage table.
+    """
+
+    def __init__(self, config: Optional[TenantConfig] = None):
+        self.config = config or load_tenant_config()
+        self._key_owners = {
+            key: tenant for tenant, settings in self.config.tenants.items() for key in settings.api_keys
+        }
+        self._active: Dict[str, int] = {}
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    def identify(self, scope: Mapping[str, Any], query_params: Optional[Mapping[str, str]] = None) -> str:
+        headers = _headers(scope)
+        query_params = query_params or {}
+        tenant = headers.get("x-tenant-id") or query_params.get("tenant")
+        api_key = headers.get("x-api-key") or query_params.get("api_key")
+        authorization = headers.get("authorization", "")
+        if not api_key and authorization.lower().startswith("bearer "):
+            api_key = authorization[7:].strip()
+
+        owner = self._key_owners.get(api_key) if api_key else None
+        if owner:
+            return owner
+        settings = self.config.tenants.get(tenant) if tenant else None
+        if settings is not None and not settings.api_keys:
+            return tenant
+        return ANONYMOUS_TENANT
+
+    def settings(self, tenant: str) -> TenantSettings:
+        return self.config.tenants.get(tenant, self.config.default)
+
+    def try_acquire(self, tenant: str) -> bool:
+        """Take a concurrency slot for a generation; pair with release()"""
+        active = self._active.get(tenant, 0)
+        if active >= self.settings(tenant).max_concurrent:
+            metrics.incr("tenant_rejected", tenant=tenant)
+            return False
+        self._active[tenant] = active + 1
+        self._usage_for(tenant)["sessions"] += 1
+        metrics.set_gauge("tenant_active", active + 1, tenant=tenant)
+        return True
+
+    def release(self, tenant: str):
+        active = max(0, self._active.get(tenant, 0) - 1)
+        self._active[tenant] = active
+        metrics.set_gauge("tenant_active", active, tenant=tenant)
+
+    def _usage_for(self, tenant: str) -> Dict[str, float]:
+        usage = self._usage.get(tenant)
+        if usage is None:
+            usage = self._usage[tenant] = {
+                "sessions": 0, "calls": 0, "errors": 0,
+                "prompt_tokens": 0, "output_tokens": 0, "latency_ms": 0.0,
+            }
+        return usage
+
+    def record_call(self, tenant: str, prompt_tokens: int, output_tokens: int, latency_ms: float, ok: bool):
+        usage = self._usage_for(tenant)
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["output_tokens"] += output_tokens
+        usage["latency_ms"] += latency_ms
+        if not ok:
+            usage["errors"] += 1
+        metrics.incr("tenant_model_calls", tenant=tenant)
+        metrics.incr("tenant_tokens", prompt_tokens + output_tokens, tenant=tenant)
+        metrics.observe("tenant_model_latency_ms", latency_ms, tenant=tenant)
+
+    def usage(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for tenant, usage in self._usage.items():
+            calls = usage["calls"]
+            report[tenant] = {
+                **usage,
+                "active": self._active.get(tenant, 0),
+                "max_concurrent": self.settings(tenant).max_concurrent,
+                "weight": self.settings(tenant).weight,
+                "mean_latency_ms": usage["latency_ms"] / calls if calls else 0.0,
+            }
+        return report
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of model calls across tenants.
+
+    At most `concurrency` calls run at once. When callers have to wait,
+    each request gets a virtual finish time of
+    max(virtual clock, tenant's last finish) + cost / weight and the
+    smallest is served first, so a tenant submitting a burst only delays
+    itself and every waiting tenant gets capacity in proportion to its weight.
+    """
+
+    def __init__(self, registry: TenantRegistry, concurrency: int = MODEL_MAX_CONCURRENCY):
+        self.registry = registry
+        self.concurrency = concurrency
+        self.running = 0
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._queue: list = []
+        self._order = itertools.count()
+
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, cost: float = 1.0):
+        if self.concurrency <= 0:
+            yield
+            return
+
+        start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + cost / max(self.registry.settings(tenant).weight, 1e-6)
+        self._last_finish[tenant] = finish
+
+        if self.running < self.concurrency and not self._queue:
+            self.running += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (finish, next(self._order), waiter))
+            metrics.set_gauge("model_calls_waiting", len(self._queue))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just as we were cancelled: pass the slot on
+                    self._release()
+                raise
+        self._virtual_time = max(self._virtual_time, start)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if not waiter.done():
+                waiter.set_result(None)
+                metrics.set_gauge("model_calls_waiting", len(self._queue))
+                return
+        self.running -= 1
+        metrics.set_gauge("model_calls_waiting", 0)
+
+
+tenants = TenantRegistry()
+fair_scheduler = FairScheduler(tenants)
@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+from services.metrics import metrics
+from services.model_backend import ModelResponse
+
+# JSONL file to record traffic to; unset disables capture
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+# How request payloads are stored: "hashed" keeps their shape and replaces
+# prompts, messages and file contents with hashes; "redacted" keeps text with
+# emails, keys and numbers masked; "raw" keeps everything (local debugging only)
+TRAFFIC_CAPTURE_PAYLOADS = os.getenv("TRAFFIC_CAPTURE_PAYLOADS", "hashed")
+# Capture a replay backend answers from (MODEL_BACKEND=replay)
+MODEL_REPLAY_PATH = os.getenv("MODEL_REPLAY_PATH", "")
+# Recorded model latencies are divided by this on replay
+MODEL_REPLAY_SPEED = float(os.getenv("MODEL_REPLAY_SPEED", "1"))
+
+# Replacements are bracketed words no pattern matches, so redacting twice
+# gives the same text; replayed prompts then hash like recorded ones
+_REDACTIONS = [
+    (re.compile(r"\b([a-z][\w+.-]*://)[^\s/:@]+:[^\s/@]+@"), r"\1[secret]@"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[email]"),
+    (re.compile(r"\b(?:AIza[\w-]{20,}|sk-[\w-]{16,}|gh[po]_\w{20,}|xox[bp]-[\w-]{10,})"), "[secret]"),
+    (re.compile(r"(?i)\b(bearer|api[_-]?key|token|password|secret)(\s*[:=]\s*|\s+)[^\s\"',]+"), r"\1\2[secret]"),
+    (re.compile(r"\+?\d[\d ()-]{8,}\d"), "[number]"),
+]
+# Request fields that are credentials however they look
+_SECRET_FIELDS = {"api_key", "apikey", "token", "password", "authorization", "secret"}
+# Fields kept (redacted) in hashed payloads: they steer the request but
+# hold no user text. Every other string is replaced by its hash.
+_STRUCTURAL_FIELDS = {
+    "type", "framework", "style_framework", "project_id", "turn_id", "resumable",
+    "path", "file_type", "preserve_structure", "files_to_modify",
+}
+
+
+def redact_text(text: str) -> str:
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redact(value: Any) -> Any:
+    """Redact strings anywhere in a JSON-like value"""
+    if isinstance(value, str):
+        return redact_text(value)
+    if isinstance(value, dict):
+        return {k: "[secret]" if k.lower() in _SECRET_FIELDS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def hash_text(text: str) -> str:
+    """Stand-in for user text: equal texts get equal stand-ins, so repeats stay visible"""
+    return "[sha256:%s:%d]" % (hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], len(text))
+
+
+def hash_payload(value: Any, structural: bool = False) -> Any:
+    """A JSON-like value with its shape kept and its user text hashed"""
+    if isinstance(value, str):
+        return redact_text(value) if structural else hash_text(value)
+    if isinstance(value, dict):
+        return {
+            k: "[secret]" if k.lower() in _SECRET_FIELDS else hash_payload(v, k in _STRUCTURAL_FIELDS)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [hash_payload(v, structural) for v in value]
+    return value
+
+
+def prompt_key(prompt: str) -> str:
+    """Recording key of a prompt; computed on the redacted text so replays match"""
+    return hashlib.sha256(redact_text(prompt).encode("utf-8")).hexdigest()[:24]
+
+
+class TrafficRecorder:
+    """
+    Opt-in JSONL recorder of inbound requests and model calls.
+
+    Each line has `t` (seconds since recording started) and a `kind`:
+    "request" lines hold the endpoint, payload, tenant and connection so a
+    replay can rebuild the sequence and inter-arrival timing; "model" lines
+    hold a prompt key, the response and its latency so a replay backend
+    can answer without the live API. Model prompts are never stored, and
+    request payloads only as configured by `payloads`. Lines are written
+    and flushed by a background thread, off the event loop.
+    """
+
+    def __init__(self, path: str = TRAFFIC_CAPTURE_PATH, payloads: str = TRAFFIC_CAPTURE_PAYLOADS):
+        if payloads not in ("hashed", "redacted", "raw"):
+            raise ValueError(f"Unsupported TRAFFIC_CAPTURE_PAYLOADS: {payloads}")
+        self.path = path
+        self.payloads = payloads
+        self.started = time.monotonic()
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _write(self, entry: Dict[str, Any]):
+        entry = {"t": round(time.monotonic() - self.started, 4), **entry}
+        self._queue.put(json.dumps(entry, ensure_ascii=False) + "\n")
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="traffic-capture", daemon=True)
+                self._writer.start()
+        metrics.incr("traffic_captured", kind=entry["kind"])
+
+    def _drain(self):
+        print(f"📼 Recording traffic to {self.path}")
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    return
+                f.write(line)
+                # Write whatever else is waiting before paying for a flush
+                while True:
+                    try:
+                        line = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if line is None:
+                        return
+                    f.write(line)
+                f.flush()
+
+    def _tenant(self, tenant: Optional[str]) -> Optional[str]:
+        if tenant is None or self.payloads == "raw":
+            return tenant
+        return "t-" + hashlib.sha256(tenant.encode("utf-8")).hexdigest()[:10]
+
+    def _payload(self, payload: Any) -> Any:
+        if self.payloads == "hashed":
+            return hash_payload(payload)
+        if self.payloads == "redacted":
+            return redact(payload)
+        return payload
+
+    def record_request(self, endpoint: str, payload: Any, tenant: Optional[str] = None, connection: Optional[str] = None):
+        if not self.enabled:
+            return
+        self._write({
+            "kind": "request",
+            "endpoint": endpoint,
+            "connection": connection,
+            "tenant": self._tenant(tenant),
+            "payload": self._payload(payload),
+        })
+
+    def record_model_call(self, prompt: str, model: str, response: Optional[ModelResponse], latency_ms: float, error: Optional[str] = None):
+        if not self.enabled:
+            return
+        text = response.text if response is not None else None
+        self._write({
+            "kind": "model",
+            "key": prompt_key(prompt),
+            "model": model,
+            "prompt_chars": len(prompt),
+            "latency_ms": round(latency_ms, 1),
+            "text": redact_text(text) if text is not None and self.payloads != "raw" else text,
+            "finish_reason": response.finish_reason if response is not None else None,
+            "prompt_tokens": response.prompt_tokens if response is not None else None,
+            "output_tokens": response.output_tokens if response is not None else None,
+            "error": error,
+        })
+
+    def close(self):
+        """Write out everything recorded so far and close the file"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+
+class RecordingBackend:
+    """Model backend wrapper that records each completed call"""
+
+    def __init__(self, inner, recorder: TrafficRecorder):
+        self.inner = inner
+        self.recorder = recorder
+        self.name = inner.name
+
+    def __getattr__(self, name: str):
+        # load(), loaded, calls... of the wrapped backend
+        return getattr(self.inner, name)
+
+    async def generate(self, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> ModelResponse:
+        start = time.perf_counter()
+        try:
+            response = await self.inner.generate(prompt, model_name, generation_config)
+        except asyncio.CancelledError:
+            # Hedged or abandoned calls never reached the client
+            raise
+        except Exception as e:
+            self.recorder.record_model_call(prompt, model_name, None, (time.perf_counter() - start) * 1000, error=str(e))
+            raise
+        self.recorder.record_model_call(prompt, model_name, response, (time.perf_counter() - start) * 1000)
+        return response
+
+
+class ReplayBackend:
+    """
+    Model backend that answers from a capture.
+
+    A prompt gets the recorded response for the same prompt key, in
+    recorded order when a prompt repeats; a prompt that was never recorded
+    gets the next unused response for its model. The recorded latency is
+    replayed divided by speed, and recorded failures are raised again.
+    """
+    name = "replay"
+
+    def __init__(self, path: str = MODEL_REPLAY_PATH, speed: float = MODEL_REPLAY_SPEED):
+        self.speed = max(speed, 1e-6)
+        self._by_key: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_model: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._used = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get("kind") == "model":
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_model[entry["model"]].append(entry)
+        self.hits = 0
+        self.misses = 0
+
+    def _next(self, prompt: str, model_name: str) -> Optional[Dict[str, Any]]:
+        recorded = self._by_key.get(prompt_key(prompt))
+        if recorded:
+            self.hits += 1
+            metrics.incr("replay_model_calls", match="prompt")
+            entry = recorded.popleft() if len(recorded) > 1 else recorded[0]
+            self._used.add(id(entry))
+            return entry
+
+        self.misses += 1
+        metrics.incr("replay_model_calls", match="model")
+        pool = self._by_model.get(model_name) or next((q for q in self._by_model.values() if q), None)
+        if not pool:
+            return None
+        # Prefer responses no prompt has used yet; reuse once all have been
+        for _ in range(len(pool)):
+            entry = pool[0]
+            pool.rotate(-1)
+            if id(entry) not in self._used:
+                self._used.add(id(entry))
+                return entry
+        return pool[-1]
+
+    async def generate(self, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> ModelResponse:
+        entry = self._next(prompt, model_name)
+        if entry is None:
+            raise Exception("Replay capture has no model responses")
+        await asyncio.sleep(entry["latency_ms"] / 1000 / self.speed)
+        if entry.get("error"):
+            raise Exception(entry["error"])
+        return ModelResponse(
+            entry["text"] or "",
+            finish_reason=entry.get("finish_reason") or "STOP",
+            model=model_name,
+            prompt_tokens=entry.get("prompt_tokens"),
+            output_tokens=entry.get("output_tokens")
+        )
+
+
+traffic_recorder = TrafficRecorder()
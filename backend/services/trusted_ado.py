@@ -0,0 +1,64 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from schemas.application_definition import ApplicationDefinitionObject
+from services import serialization
+from services.metrics import metrics
+
+
+def version_hash(data: bytes) -> str:
+    """Version hash of a serialized ADO"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class TrustedADOCache:
+    """
+    Split between untrusted and internally produced ADOs.
+
+    Every ADO the server hands to a client is remembered under the hash of
+    its serialized form. When a client sends ADO data back (current_ado in
+    a chat turn, a validate_ado request), hashing the data is enough to
+    recognise an ADO we already validated, and the cached instance is
+    returned instead of re-running full pydantic validation. Anything else
+    is untrusted and fully validated.
+
+    Cached instances are shared and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ApplicationDefinitionObject]" = OrderedDict()
+
+    def remember(self, ado: ApplicationDefinitionObject, sent: Optional[bytes] = None) -> str:
+        """
+        Register an internally produced ADO and return its version hash.
+        sent is the form the client actually received when it differs from
+        the ADO's own, e.g. with file contents it already held left out.
+        """
+        version = version_hash(sent if sent is not None else serialization.ado_json(ado))
+        self._store(version, ado)
+        return version
+
+    def validate(self, data: Dict[str, Any]) -> ApplicationDefinitionObject:
+        """ADO from client-supplied data, validated unless already known"""
+        version = version_hash(serialization.dumps(data))
+        cached = self._entries.get(version)
+        if cached is not None:
+            self._entries.move_to_end(version)
+            metrics.incr("trusted_ado_cache_hits")
+            return cached
+
+        metrics.incr("trusted_ado_cache_misses")
+        ado = ApplicationDefinitionObject.model_validate(data)
+        self._store(version, ado)
+        return ado
+
+    def _store(self, version: str, ado: ApplicationDefinitionObject):
+        self._entries[version] = ado
+        self._entries.move_to_end(version)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Process-wide cache shared by all connections
+trusted_ados = TrustedADOCache()
@@ -1,8 +1,20 @@
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from services.ado_generator import ADOGenerator, ADOValidator
+from services.project_index import ProjectIndexer
+from services.ws_sender import OutboundSender
+from services.ws_codec import negotiate_codec
+from services.serialization import RawJSON, dumps, raw_ado, encode_event, loads
+from services.trusted_ado import trusted_ados
+from services.blob_store import ProjectStore, new_project_id
+from services.admission import admission, degraded_mode
+from services.tenancy import current_tenant, tenants
+from services.session_bus import TERMINAL_EVENTS, SessionPublisher, make_bus
+from services.traffic_capture import traffic_recorder
+from services.profiler import profiler
+from services.metrics import metrics
 from schemas.application_definition import (
     GenerationRequest, 
     ModificationRequest, 
@@ -13,25 +25,168 @@ from schemas.application_definition import (
 class EnhancedWebSocketHandler:
     """Enhanced WebSocket handler with ADO support"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, bus=None):
         self.ado_generator = ADOGenerator(api_key)
         self.validator = ADOValidator()
+        self.project_indexer = ProjectIndexer()
+        self.project_store = ProjectStore()
+        # Generation events and shared project state; see SESSION_BUS_URL
+        self.bus = bus or make_bus()
+        # session id -> (publisher, task) of generations running in this process
+        self._generations: Dict[str, Tuple[SessionPublisher, asyncio.Task]] = {}
     
     async def handle_generate_stream(self, websocket: WebSocket):
         """Handle streaming generation with ADO"""
-        await websocket.accept()
+        codec, subprotocol = negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         
         try:
             # Receive initial request
             data = await websocket.receive_json()
+        except WebSocketDisconnect:
+            print("🔌 Client disconnected before sending a request")
+            return
+        except (ValueError, KeyError):
+            # Not JSON, or a binary frame
+            data = None
+        
+        sender = OutboundSender(websocket, codec=codec)
+        if not isinstance(data, dict):
+            await sender.send_json({
+                "event": "error",
+                "message": "Expected a JSON object with the generation request."
+            })
+            await sender.close()
+            await self._close(websocket)
+            return
+        
+        tenant = tenants.identify(websocket.scope, websocket.query_params)
+        traffic_recorder.record_request("/ws/generate-stream", data, tenant=tenant)
+        decision = admission.admit("generate", tenant=tenant)
+        if not decision.admitted:
+            # Overloaded: answer now rather than queue behind everyone else
+            await sender.send_json({
+                "event": "rejected",
+                "message": "Server is busy, please retry shortly.",
+                "reason": decision.reason,
+                "retry_after": decision.retry_after
+            })
+            await sender.close()
+            try:
+                await websocket.close(code=1013)  # Try Again Later
+            except RuntimeError:
+                pass
+            return
+        
+        resumable = bool(data.get("resumable"))
+        profile = None
+        if profiler.requested(websocket.scope, websocket.query_params):
+            profile = profiler.start("/ws/generate-stream", include_current=False)
+        started = False
+        try:
+            publisher, generation = await self.start_generation(data, tenant, decision.degraded, sender, resumable)
+            started = True
+        except Exception as e:
+            print(f"❌ Could not start generation session: {str(e)}")
+            await sender.send_json({
+                "event": "error",
+                "message": "Could not start the generation session."
+            })
+        finally:
+            if not started:
+                admission.release(tenant)
+                profiler.finish(profile)
+                await sender.close()
+                await self._close(websocket)
+        if not started:
+            return
+        session_id = publisher.session_id
+        if profile is not None:
+            profile.root = generation
+        
+        # Run generation next to a watcher so that a cancel message or a
+        # disconnect aborts the model calls still in flight
+        watcher = asyncio.create_task(self._watch_for_cancel(websocket))
+        disconnected = False
+        try:
+            done, _ = await asyncio.wait({generation, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if generation not in done:
+                reason = watcher.result()
+                disconnected = reason == "disconnected"
+                if disconnected and resumable:
+                    # Keep generating for clients that re-attach elsewhere
+                    print(f"🔌 Client left resumable session {session_id}, generation continues")
+                    publisher.detach()
+                    await asyncio.gather(generation, return_exceptions=True)
+                else:
+                    print(f"🛑 Generation {reason}, aborting pending model calls")
+                    generation.cancel()
+                    await asyncio.gather(generation, return_exceptions=True)
+                    if reason == "cancelled":
+                        await publisher.send_json({
+                            "event": "cancelled",
+                            "message": "Generation cancelled."
+                        })
+                    elif disconnected:
+                        publisher.detach()
+                        await publisher.send_json({
+                            "event": "cancelled",
+                            "message": "Client disconnected."
+                        })
+        finally:
+            generation.cancel()
+            watcher.cancel()
+            admission.release(tenant)
+            profiler.finish(profile)
+            await sender.close(flush=not disconnected)
+            await self._close(websocket)
+    
+    async def start_generation(self, data: Dict[str, Any], tenant: str, degraded: bool, sender=None, resumable: bool = False):
+        """
+        Start the generation pipeline for an admitted request; returns
+        (publisher, task). Events go through the session bus so the session
+        can be followed (or resumed after a reconnect) from any replica and
+        over any transport. The task inherits the tenant and the degraded
+        flag from admission.
+        """
+        session_id = new_project_id()
+        publisher = SessionPublisher(self.bus, session_id, sender, resumable=resumable)
+        await self.bus.set_state(f"session:{session_id}", encode_event({"resumable": resumable}))
+        await publisher.send_json({"event": "session", "session_id": session_id, "resumable": resumable})
+        
+        tenant_token = current_tenant.set(tenant)
+        token = degraded_mode.set(degraded)
+        generation = asyncio.create_task(self._run_generation(publisher, data))
+        degraded_mode.reset(token)
+        current_tenant.reset(tenant_token)
+        self._generations[session_id] = (publisher, generation)
+        generation.add_done_callback(lambda _: self._generations.pop(session_id, None))
+        return publisher, generation
+    
+    async def cancel_generation(self, session_id: str, message: str = "Generation cancelled.") -> bool:
+        """Abort a session generating in this process; False if there is none"""
+        running = self._generations.get(session_id)
+        if running is None or running[1].done():
+            return False
+        publisher, generation = running
+        print(f"🛑 Cancelling session {session_id}: {message}")
+        generation.cancel()
+        await asyncio.gather(generation, return_exceptions=True)
+        await publisher.send_json({"event": "cancelled", "message": message})
+        return True
+    
+    async def _run_generation(self, sender: SessionPublisher, data: Dict[str, Any]):
+        """Run the generation pipeline for a single request"""
+        try:
             prompt = data.get("prompt")
             framework = data.get("framework", "react")
             style_framework = data.get("style_framework", "tailwindcss")
+            project_id = data.get("project_id") or new_project_id()
             
             print(f"🚀 Starting generation for prompt: {prompt[:100]}...")
             
             if not prompt:
-                await websocket.send_json({
+                await sender.send_json({
                     "event": "error", 
                     "message": "Prompt is required."
                 })
@@ -45,9 +200,10 @@ class EnhancedWebSocketHandler:
             )
             
             # Step 1: Generate ADO
-            await websocket.send_json({
+            await sender.send_json({
                 "event": "status",
-                "message": "🧠 Analyzing requirements and creating application structure..."
+                "message": "🧠 Analyzing requirements and creating application structure...",
+                "degraded": degraded_mode.get()
             })
             
             print("📋 Generating ADO...")
@@ -56,7 +212,7 @@ class EnhancedWebSocketHandler:
                 print(f"✅ ADO generated successfully: {ado.name}")
             except Exception as e:
                 print(f"❌ ADO generation failed: {str(e)}")
-                await websocket.send_json({
+                await sender.send_json({
                     "event": "error",
                     "message": f"Failed to generate application structure: {str(e)}"
                 })
@@ -66,38 +222,42 @@ class EnhancedWebSocketHandler:
             issues = self.validator.validate_ado(ado)
             if issues:
                 print(f"⚠️  ADO validation issues: {issues}")
-                await websocket.send_json({
+                await sender.send_json({
                     "event": "warning",
                     "message": f"ADO validation issues: {', '.join(issues)}"
                 })
             
             ado = self.validator.enrich_ado(ado)
+            trusted_ados.remember(ado)
             
             # Send ADO to frontend
-            await websocket.send_json({
+            await sender.send_json({
                 "event": "ado_generated",
-                "ado": ado.model_dump(),
+                "project_id": project_id,
+                "ado": raw_ado(ado),
                 "message": f"📋 Created application definition with {len(ado.files)} files"
             })
             
             # Step 2: Generate file structure
             file_paths = [f.path for f in ado.files]
-            await websocket.send_json({
+            await sender.send_json({
                 "event": "structure_generated",
                 "files": file_paths
             })
             
             # Step 3: Generate file contents
-            await websocket.send_json({
+            await sender.send_json({
                 "event": "status",
                 "message": "⚡ Generating code files..."
             })
             
             total_files = len(ado.files)
+            generated_files = {}
+            batched_files = await self.ado_generator.generate_batched_files(ado)
             for i, file_def in enumerate(ado.files):
                 print(f"📝 Generating file {i+1}/{total_files}: {file_def.path}")
                 
-                await websocket.send_json({
+                await sender.send_json({
                     "event": "file_start",
                     "path": file_def.path,
                     "description": file_def.description
@@ -108,22 +268,25 @@ class EnhancedWebSocketHandler:
                     if file_def.content:
                         content = file_def.content
                         print(f"📄 Using existing content for {file_def.path}")
+                    elif file_def.path in batched_files:
+                        content = batched_files[file_def.path]
                     else:
                         print(f"🤖 Generating new content for {file_def.path}")
                         content = await self.ado_generator._generate_file_content(file_def, ado)
+                    generated_files[file_def.path] = content
                     
                     # Stream content in chunks
                     chunk_size = 100
                     for j in range(0, len(content), chunk_size):
                         chunk = content[j:j + chunk_size]
-                        await websocket.send_json({
+                        await sender.send_json({
                             "event": "code_chunk",
                             "path": file_def.path,
                             "chunk": chunk
                         })
                         await asyncio.sleep(0.05)  # Small delay for streaming effect
                     
-                    await websocket.send_json({
+                    await sender.send_json({
                         "event": "file_end",
                         "path": file_def.path,
                         "progress": ((i + 1) / total_files) * 100
@@ -132,7 +295,7 @@ class EnhancedWebSocketHandler:
                 except Exception as e:
                     print(f"❌ Failed to generate {file_def.path}: {str(e)}")
                     # Continue with other files
-                    await websocket.send_json({
+                    await sender.send_json({
                         "event": "file_end",
                         "path": file_def.path,
                         "progress": ((i + 1) / total_files) * 100,
@@ -140,11 +303,15 @@ class EnhancedWebSocketHandler:
                     })
             
             # Step 4: Complete generation
+            version = self.project_store.commit(project_id, ado, generated_files, message=prompt)
+            await self._share_project(project_id, version)
             print("✅ Generation completed successfully!")
-            await websocket.send_json({
+            await sender.send_json({
                 "event": "finish",
                 "message": "✅ Application generated successfully!",
-                "ado": ado.model_dump()
+                "project_id": project_id,
+                "version": version.version,
+                "ado": raw_ado(ado)
             })
             
         except WebSocketDisconnect:
@@ -153,87 +320,176 @@ class EnhancedWebSocketHandler:
             error_msg = f"Generation error: {str(e)}"
             print(f"❌ {error_msg}")
             try:
-                await websocket.send_json({
+                await sender.send_json({
                     "event": "error",
                     "message": error_msg
                 })
             except:
                 pass
+    
+    async def handle_attach(self, websocket: WebSocket, session_id: str):
+        """Follow a generation session started on any replica, from ?from=<seq> on"""
+        codec, subprotocol = negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        sender = OutboundSender(websocket, codec=codec)
+        
+        try:
+            start = max(0, int(websocket.query_params.get("from", 0)))
+        except ValueError:
+            start = 0
+        
+        if await self.bus.get_state(f"session:{session_id}") is None:
+            await sender.send_json({
+                "event": "error",
+                "message": "Unknown or expired session."
+            })
+            await sender.close()
+            await self._close(websocket)
+            return
+        
+        follower = asyncio.create_task(self._follow_session(sender, session_id, start))
+        watcher = asyncio.create_task(self._watch_for_cancel(websocket))
+        disconnected = False
+        try:
+            done, _ = await asyncio.wait({follower, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            disconnected = watcher in done and watcher.result() == "disconnected"
+        finally:
+            follower.cancel()
+            watcher.cancel()
+            await asyncio.gather(follower, watcher, return_exceptions=True)
+            await sender.close(flush=not disconnected)
+            await self._close(websocket)
+    
+    async def _follow_session(self, sender: OutboundSender, session_id: str, start: int):
+        """Forward a session's events until it finishes"""
+        events = self.bus.events(session_id, start)
+        try:
+            async for _, raw in events:
+                event = loads(raw)
+                await sender.send_json(event)
+                if event.get("event") in TERMINAL_EVENTS:
+                    return
         finally:
+            await events.aclose()
+    
+    async def _share_project(self, project_id: str, version):
+        """Publish a project's newest version for other replicas"""
+        if not self.bus.shared:
+            return
+        await self.bus.set_state(f"project:{project_id}", encode_event({
+            "version": version.version,
+            "message": version.message,
+            "ado": raw_ado(version.ado),
+            "files": self.project_store.files(version)
+        }))
+    
+    async def _sync_project(self, project_id: str):
+        """Catch up with a project version made on another replica"""
+        if not self.bus.shared or not project_id:
+            return
+        raw = await self.bus.get_state(f"project:{project_id}")
+        if raw is None:
+            return
+        state = loads(raw)
+        local = self.project_store.latest(project_id)
+        if local is not None and local.version == state["version"]:
+            return
+        if local is not None and local.version > state["version"] and self.project_store.get(project_id, state["version"]):
+            # Undone elsewhere
+            while self.project_store.latest(project_id).version > state["version"]:
+                if self.project_store.undo(project_id) is None:
+                    break
+            return
+        ado = trusted_ados.validate(state["ado"])
+        self.project_store.commit(project_id, ado, state["files"], message=state.get("message"), version=state["version"])
+    
+    async def _watch_for_cancel(self, websocket: WebSocket) -> str:
+        """Wait until the client cancels or disconnects and report which"""
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return "disconnected"
+                try:
+                    data = json.loads(message.get("text") or "{}")
+                except ValueError:
+                    continue
+                if isinstance(data, dict) and data.get("type") == "cancel":
+                    return "cancelled"
+        except (WebSocketDisconnect, RuntimeError):
+            return "disconnected"
+    
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        """Close a socket that may already have been closed by the client"""
+        try:
             await websocket.close()
+        except RuntimeError:
+            pass
     
     async def handle_chat(self, websocket: WebSocket):
         """Handle conversational modifications with ADO"""
-        await websocket.accept()
+        codec, subprotocol = negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        sender = OutboundSender(websocket, codec=codec)
+        tenant = tenants.identify(websocket.scope, websocket.query_params)
+        connection_id = new_project_id()
+        # Profile every turn of this connection when asked to
+        profiled = profiler.requested(websocket.scope, websocket.query_params)
+        
+        # The turn in flight, if any: (turn_id, task)
+        current_turn = None
+        turn_counter = 0
+        # project_id -> manifest (path -> content hash) of the files the
+        # client holds, for clients that sent one
+        manifests: Dict[str, Dict[str, str]] = {}
         
         try:
             while True:
                 data = await websocket.receive_json()
+                traffic_recorder.record_request("/ws/chat", data, tenant=tenant, connection=connection_id)
                 
                 if data.get("type") == "chat_message":
-                    user_message = data.get("message")
-                    current_ado_data = data.get("current_ado")
-                    current_files = data.get("current_files", {})
-                    
-                    if not user_message:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": "Message is required"
-                        })
-                        continue
-                    
-                    # Create modification request
-                    if current_ado_data:
-                        current_ado = ApplicationDefinitionObject(**current_ado_data)
-                    else:
-                        # Create ADO from current files if not available
-                        current_ado = await self._create_ado_from_files(current_files)
-                    
-                    modification_request = ModificationRequest(
-                        modification_prompt=user_message,
-                        current_ado=current_ado
-                    )
-                    
-                    await websocket.send_json({
-                        "type": "status",
-                        "message": "🤖 Understanding your request..."
+                    # A newer message supersedes whatever is still running
+                    await self._cancel_turn(sender, current_turn, "superseded")
+                    turn_counter += 1
+                    turn_id = data.get("turn_id", turn_counter)
+                    current_turn = await self._start_chat_turn(sender, data, turn_id, tenant, manifests, profiled)
+                
+                elif data.get("type") == "cancel":
+                    await self._cancel_turn(sender, current_turn, "cancelled")
+                    current_turn = None
+                
+                elif data.get("type") == "undo":
+                    await self._cancel_turn(sender, current_turn, "superseded")
+                    current_turn = None
+                    await self._undo(sender, data.get("project_id"), manifests)
+                
+                elif data.get("type") == "sync":
+                    await self._send_project_state(sender, data.get("project_id"), data.get("manifest"), manifests)
+                
+                elif data.get("type") == "history":
+                    project_id = data.get("project_id")
+                    await sender.send_json({
+                        "type": "history",
+                        "project_id": project_id,
+                        "versions": self.project_store.history(project_id) if project_id else []
                     })
-                    
-                    # Generate modifications
-                    try:
-                        modified_ado = await self.ado_generator.modify_ado(modification_request)
-                        
-                        # Generate updated files
-                        updated_files = await self.ado_generator.generate_files_from_ado(modified_ado)
-                        
-                        # Send response
-                        await websocket.send_json({
-                            "type": "chat_response",
-                            "response": f"I've updated your application based on your request: '{user_message}'",
-                            "changes": updated_files,
-                            "updated_ado": modified_ado.model_dump()
-                        })
-                        
-                    except Exception as e:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"Failed to process modification: {str(e)}"
-                        })
                 
                 elif data.get("type") == "validate_ado":
                     ado_data = data.get("ado")
                     if ado_data:
                         try:
-                            ado = ApplicationDefinitionObject(**ado_data)
+                            ado = trusted_ados.validate(ado_data)
                             issues = self.validator.validate_ado(ado)
                             
-                            await websocket.send_json({
+                            await sender.send_json({
                                 "type": "validation_result",
                                 "valid": len(issues) == 0,
                                 "issues": issues
                             })
                         except Exception as e:
-                            await websocket.send_json({
+                            await sender.send_json({
                                 "type": "validation_result",
                                 "valid": False,
                                 "issues": [f"Invalid ADO structure: {str(e)}"]
@@ -243,80 +499,208 @@ class EnhancedWebSocketHandler:
             print("Chat client disconnected")
         except Exception as e:
             print(f"Chat error: {str(e)}")
+        finally:
+            # Nobody is listening any more, so stop paying for the model calls
+            if current_turn and not current_turn[1].done():
+                current_turn[1].cancel()
+            await sender.close(flush=False)
     
-    async def _create_ado_from_files(self, files: Dict[str, str]) -> ApplicationDefinitionObject:
-        """Create a basic ADO from existing files"""
+    async def _start_chat_turn(
+        self,
+        sender: OutboundSender,
+        data: Dict[str, Any],
+        turn_id,
+        tenant: str,
+        manifests: Optional[Dict[str, Dict[str, str]]] = None,
+        profiled: bool = False
+    ):
+        """Admit and start a chat turn; returns (turn_id, task) or None if rejected"""
+        decision = admission.admit("chat", tenant=tenant)
+        if not decision.admitted:
+            await sender.send_json({
+                "type": "rejected",
+                "turn_id": turn_id,
+                "message": "Server is busy, please retry shortly.",
+                "reason": decision.reason,
+                "retry_after": decision.retry_after
+            })
+            return None
+        
+        profile = profiler.start(f"/ws/chat turn {turn_id}", include_current=False) if profiled else None
+        tenant_token = current_tenant.set(tenant)
+        token = degraded_mode.set(decision.degraded)
+        task = asyncio.create_task(self._run_chat_turn(sender, data, turn_id, manifests))
+        degraded_mode.reset(token)
+        current_tenant.reset(tenant_token)
+        task.add_done_callback(lambda _: admission.release(tenant))
+        if profile is not None:
+            profile.root = task
+            task.add_done_callback(lambda _: profiler.finish(profile))
+        return (turn_id, task)
+    
+    async def _cancel_turn(self, sender: OutboundSender, turn, reason: str):
+        """Cancel an in-flight chat turn and tell the client it was dropped"""
+        if not turn or turn[1].done():
+            return
+        
+        turn_id, task = turn
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        print(f"🛑 Chat turn {turn_id} {reason}")
+        await sender.send_json({
+            "type": "turn_cancelled",
+            "turn_id": turn_id,
+            "cancelled": True,
+            "reason": reason
+        })
+    
+    def _project_payload(self, project_id: str, version, held: Optional[Dict[str, str]], manifests) -> Dict[str, Any]:
+        """
+        A version's files and ADO for a client. A client that told us what
+        it holds (path -> content hash) gets only the files that differ,
+        the paths to delete and an ADO without the contents it already
+        has; other clients get everything.
+        """
+        if held is None:
+            trusted_ados.remember(version.ado)
+            return {
+                "changes": self.project_store.files(version),
+                "manifest": version.manifest,
+                "updated_ado": raw_ado(version.ado)
+            }
+        
+        changes, removed = self.project_store.delta(version, held)
+        sent = dumps(self.project_store.elide(version, held))
+        # The client sends the elided ADO back; map it to the full one
+        trusted_ados.remember(version.ado, sent=sent)
+        if manifests is not None:
+            manifests[project_id] = version.manifest
+        metrics.incr("manifest_files_skipped", len(version.manifest) - len(changes))
+        return {
+            "changes": changes,
+            "removed": removed,
+            "manifest": version.manifest,
+            "updated_ado": RawJSON(sent)
+        }
+    
+    async def _send_project_state(self, sender: OutboundSender, project_id, held, manifests):
+        """Bring a (re)connecting client up to date with a project's newest version"""
+        await self._sync_project(project_id)
+        version = self.project_store.latest(project_id) if project_id else None
+        if version is None:
+            await sender.send_json({
+                "type": "error",
+                "message": "Unknown project"
+            })
+            return
         
-        file_definitions = []
-        dependencies = []
-        components = []
+        await sender.send_json({
+            "type": "project_state",
+            "project_id": project_id,
+            "version": version.version,
+            **self._project_payload(project_id, version, held if isinstance(held, dict) else {}, manifests)
+        })
+    
+    async def _undo(self, sender: OutboundSender, project_id, manifests=None):
+        """Restore the version before the newest one"""
+        await self._sync_project(project_id)
+        version = self.project_store.undo(project_id) if project_id else None
+        if version is None:
+            await sender.send_json({
+                "type": "error",
+                "message": "Nothing to undo"
+            })
+            return
+        
+        await self._share_project(project_id, version)
+        held = manifests.get(project_id) if manifests is not None else None
+        await sender.send_json({
+            "type": "version_restored",
+            "project_id": project_id,
+            "version": version.version,
+            **self._project_payload(project_id, version, held, manifests)
+        })
+    
+    async def _run_chat_turn(self, sender: OutboundSender, data: Dict[str, Any], turn_id, manifests=None):
+        """Process a single chat_message"""
+        user_message = data.get("message")
+        current_ado_data = data.get("current_ado")
+        current_files = data.get("current_files", {})
+        
+        if not user_message:
+            await sender.send_json({
+                "type": "error",
+                "turn_id": turn_id,
+                "message": "Message is required"
+            })
+            return
         
-        for path, content in files.items():
-            # Determine file type
-            file_type = "js"
-            if path.endswith('.jsx'):
-                file_type = "jsx"
-            elif path.endswith('.tsx'):
-                file_type = "tsx"
-            elif path.endswith('.ts'):
-                file_type = "ts"
-            elif path.endswith('.css'):
-                file_type = "css"
-            elif path.endswith('.json'):
-                file_type = "json"
-            elif path.endswith('.html'):
-                file_type = "html"
+        try:
+            # Create modification request
+            if current_ado_data:
+                current_ado = trusted_ados.validate(current_ado_data)
+            else:
+                # Create ADO from current files if not available
+                current_ado = await self._create_ado_from_files(current_files)
+            
+            # Start a history for projects we have not seen yet
+            project_id = data.get("project_id")
+            await self._sync_project(project_id)
+            if not project_id or self.project_store.latest(project_id) is None:
+                project_id = project_id or new_project_id()
+                self.project_store.commit(project_id, current_ado, current_files, message="Initial version")
+            # Contents the client left out because it knows we hold them
+            current_ado = self.project_store.hydrate(current_ado, self.project_store.latest(project_id))
+            
+            # A manifest in the message says what the client holds; otherwise
+            # it holds what we last sent it on this connection
+            held = data.get("manifest") if isinstance(data.get("manifest"), dict) else None
+            if held is None and manifests is not None:
+                held = manifests.get(project_id)
             
-            file_definitions.append({
-                "path": path,
-                "type": file_type,
-                "content": content,
-                "description": f"Generated from existing file"
+            # files_to_modify is left to the generator's project search index
+            modification_request = ModificationRequest(
+                modification_prompt=user_message,
+                current_ado=current_ado
+            )
+            
+            await sender.send_json({
+                "type": "status",
+                "turn_id": turn_id,
+                "message": "🤖 Understanding your request..."
             })
             
-            # Extract component info from JSX/TSX files
-            if file_type in ["jsx", "tsx"] and "export default" in content:
-                # Simple component extraction
-                component_name = path.split('/')[-1].replace('.jsx', '').replace('.tsx', '')
-                components.append({
-                    "name": component_name,
-                    "type": "functional",
-                    "file_path": path,
-                    "props": [],
-                    "imports": [],
-                    "exports": ["default"],
-                    "description": f"Component from {path}"
-                })
-        
-        # Extract dependencies from package.json if present
-        package_json_content = files.get("package.json") or files.get("frontend/package.json")
-        if package_json_content:
+            # Generate modifications
+            modified_ado = await self.ado_generator.modify_ado(modification_request)
+            
+            # Generate updated files
+            updated_files = await self.ado_generator.generate_files_from_ado(modified_ado)
+            version = self.project_store.commit(project_id, modified_ado, updated_files, message=user_message)
+            await self._share_project(project_id, version)
+            
+            # Send response
+            await sender.send_json({
+                "type": "chat_response",
+                "turn_id": turn_id,
+                "cancelled": False,
+                "project_id": project_id,
+                "version": version.version,
+                "response": f"I've updated your application based on your request: '{user_message}'",
+                **self._project_payload(project_id, version, held, manifests)
+            })
+            
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
             try:
-                package_data = json.loads(package_json_content)
-                deps = package_data.get("dependencies", {})
-                dev_deps = package_data.get("devDependencies", {})
-                
-                for name, version in deps.items():
-                    dependencies.append({
-                        "name": name,
-                        "version": version,
-                        "dev": False
-                    })
-                
-                for name, version in dev_deps.items():
-                    dependencies.append({
-                        "name": name,
-                        "version": version,
-                        "dev": True
-                    })
-            except:
+                await sender.send_json({
+                    "type": "error",
+                    "turn_id": turn_id,
+                    "message": f"Failed to process modification: {str(e)}"
+                })
+            except Exception:
                 pass
-        
-        return ApplicationDefinitionObject(
-            name="existing-app",
-            description="Application created from existing files",
-            framework="react",
-            files=file_definitions,
-            components=components,
-            dependencies=dependencies
-        )
+    
+    async def _create_ado_from_files(self, files: Dict[str, str]) -> ApplicationDefinitionObject:
+        """Create a basic ADO from existing files"""
+        return self.project_indexer.build_ado(files)
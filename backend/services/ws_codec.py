@@ -0,0 +1,157 @@
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import WebSocket
+from services.serialization import encode_event, materialize
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+# permessage-deflate tuning (applied by TunedDeflateProtocol)
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+WS_DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", "6"))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", "8"))
+WS_DEFLATE_MAX_WINDOW_BITS = int(os.getenv("WS_DEFLATE_MAX_WINDOW_BITS", "15"))
+
+# Compression level for the application-level "framed" encoding
+WS_FRAMED_COMPRESS_LEVEL = int(os.getenv("WS_FRAMED_COMPRESS_LEVEL", "6"))
+# Frames smaller than this are not worth compressing
+WS_FRAMED_MIN_COMPRESS = 256
+
+SUBPROTOCOL_PREFIX = "xverta."
+
+FLAG_COMPRESSED = 0x01
+
+
+class JsonCodec:
+    """Default encoding: one JSON text frame per event"""
+    name = "json"
+    binary = False
+    batching = False
+
+    def encode(self, event: Dict[str, Any]) -> str:
+        return encode_event(event).decode("utf-8")
+
+
+class MsgpackCodec:
+    """One MessagePack binary frame per event"""
+    name = "msgpack"
+    binary = True
+    batching = False
+
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        return msgpack.packb(materialize(event), use_bin_type=True)
+
+
+class FramedCodec:
+    """
+    Length-prefixed binary encoding that batches events.
+
+    A frame is one flags byte followed by a body of records, each a 4-byte
+    big-endian length and a compact JSON payload. With FLAG_COMPRESSED the
+    body is zlib-compressed as a whole, so the repetitive keys of adjacent
+    events compress against each other.
+    """
+    name = "framed"
+    binary = True
+    batching = True
+
+    def __init__(self, compress_level: int = WS_FRAMED_COMPRESS_LEVEL):
+        self.compress_level = compress_level
+
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        return self.encode_batch([event])
+
+    def encode_batch(self, events: List[Dict[str, Any]]) -> bytes:
+        parts = []
+        for event in events:
+            payload = encode_event(event)
+            parts.append(struct.pack(">I", len(payload)))
+            parts.append(payload)
+        body = b"".join(parts)
+
+        if self.compress_level > 0 and len(body) >= WS_FRAMED_MIN_COMPRESS:
+            return bytes([FLAG_COMPRESSED]) + zlib.compress(body, self.compress_level)
+        return b"\x00" + body
+
+    @staticmethod
+    def decode(frame: bytes) -> List[Dict[str, Any]]:
+        """Inverse of encode_batch (used by tests and benchmark clients)"""
+        body = frame[1:]
+        if frame[0] & FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+        events, offset = [], 0
+        while offset < len(body):
+            (length,) = struct.unpack_from(">I", body, offset)
+            offset += 4
+            events.append(json.loads(body[offset:offset + length]))
+            offset += length
+        return events
+
+
+def available_encodings() -> List[str]:
+    encodings = ["json", "framed"]
+    if msgpack is not None:
+        encodings.append("msgpack")
+    return encodings
+
+
+def make_codec(encoding: Optional[str]):
+    """Codec for an encoding name, falling back to JSON if unavailable"""
+    if encoding == "framed":
+        return FramedCodec()
+    if encoding == "msgpack" and msgpack is not None:
+        return MsgpackCodec()
+    return JsonCodec()
+
+
+def negotiate_codec(websocket: WebSocket) -> Tuple[Any, Optional[str]]:
+    """
+    Pick the event encoding for a connection.
+
+    Clients offer encodings as WebSocket subprotocols ("xverta.msgpack",
+    "xverta.framed", "xverta.json") or, when subprotocols are awkward, with
+    an ?encoding= query parameter. Returns the codec and the subprotocol to
+    accept (None when negotiated by query parameter or not at all).
+    """
+    encodings = available_encodings()
+
+    for offered in websocket.scope.get("subprotocols") or []:
+        if offered.startswith(SUBPROTOCOL_PREFIX) and offered[len(SUBPROTOCOL_PREFIX):] in encodings:
+            return make_codec(offered[len(SUBPROTOCOL_PREFIX):]), offered
+
+    requested = websocket.query_params.get("encoding")
+    if requested in encodings:
+        return make_codec(requested), None
+
+    return JsonCodec(), None
+
+
+def tuned_deflate_protocol():
+    """
+    uvicorn WebSocket protocol class with tuned permessage-deflate.
+
+    uvicorn only exposes an on/off switch; this swaps in a deflate factory
+    configured from the WS_DEFLATE_* environment variables.
+    """
+    from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+    from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+    class TunedDeflateProtocol(WebSocketProtocol):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if WS_PER_MESSAGE_DEFLATE:
+                self.available_extensions = [
+                    ServerPerMessageDeflateFactory(
+                        server_max_window_bits=WS_DEFLATE_MAX_WINDOW_BITS,
+                        compress_settings={"level": WS_DEFLATE_LEVEL, "memLevel": WS_DEFLATE_MEM_LEVEL}
+                    )
+                ]
+            else:
+                self.available_extensions = []
+
+    return TunedDeflateProtocol
@@ -0,0 +1,171 @@
+import asyncio
+import os
+from collections import deque
+from typing import Any, Dict, Optional
+from fastapi import WebSocket
+from services.metrics import metrics
+from services.ws_codec import JsonCodec
+
+# Queue depth at which producers are paused until the writer catches up
+WS_HIGH_WATER = int(os.getenv("WS_OUTBOUND_HIGH_WATER", "64"))
+# Largest code_chunk a coalesced frame may grow to
+WS_MAX_COALESCED_CHUNK = int(os.getenv("WS_OUTBOUND_MAX_COALESCED_CHUNK", "16384"))
+# Most events a batching codec packs into one frame
+WS_MAX_BATCH = int(os.getenv("WS_OUTBOUND_MAX_BATCH", "256"))
+
+
+class OutboundSender:
+    """
+    Per-connection outbound writer with a bounded queue.
+
+    Producers call send_json() which only enqueues; a single writer task
+    drains the queue onto the socket. When the client falls behind,
+    adjacent code_chunk frames for the same path are merged, and once the
+    queue reaches the high-water mark producers wait until it drains to
+    the low-water mark.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        high_water: int = WS_HIGH_WATER,
+        low_water: Optional[int] = None,
+        max_coalesced_chunk: int = WS_MAX_COALESCED_CHUNK,
+        codec=None
+    ):
+        self.websocket = websocket
+        self.codec = codec or JsonCodec()
+        self.high_water = max(1, high_water)
+        self.low_water = self.high_water // 2 if low_water is None else min(low_water, self.high_water - 1)
+        self.max_coalesced_chunk = max_coalesced_chunk
+
+        self._queue: deque = deque()
+        self._has_items = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._writer: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.pauses = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    async def send_json(self, data: Dict[str, Any]):
+        """Queue an event for the client, pausing while the queue is full"""
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise RuntimeError("Outbound sender is closed")
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+        self.enqueued += 1
+        metrics.incr("ws_outbound_frames_enqueued")
+
+        if not self._coalesce(data):
+            self._queue.append(data)
+            metrics.add_gauge("ws_outbound_queue_depth", 1)
+            self._has_items.set()
+            self._drained.clear()
+
+        metrics.observe("ws_outbound_queue_depth_at_enqueue", len(self._queue))
+        metrics.set_gauge(
+            "ws_outbound_coalesce_rate",
+            metrics.counter("ws_outbound_frames_coalesced") / metrics.counter("ws_outbound_frames_enqueued")
+        )
+
+        if len(self._queue) >= self.high_water:
+            self.pauses += 1
+            metrics.incr("ws_outbound_producer_pauses")
+            while len(self._queue) > self.low_water and self._error is None:
+                self._drained.clear()
+                await self._drained.wait()
+            if self._error is not None:
+                raise self._error
+
+    def _coalesce(self, data: Dict[str, Any]) -> bool:
+        """Merge a code_chunk into the newest queued frame when possible"""
+        if data.get("event") != "code_chunk" or not self._queue:
+            return False
+
+        tail = self._queue[-1]
+        if tail.get("event") != "code_chunk" or tail.get("path") != data.get("path"):
+            return False
+        if len(tail["chunk"]) + len(data["chunk"]) > self.max_coalesced_chunk:
+            return False
+
+        merged = dict(tail, chunk=tail["chunk"] + data["chunk"])
+        if "seq" in data:
+            # A merged frame stands for the newest event it contains
+            merged["seq"] = data["seq"]
+        self._queue[-1] = merged
+        self.coalesced += 1
+        metrics.incr("ws_outbound_frames_coalesced")
+        return True
+
+    async def _run(self):
+        """Writer loop: drain queued frames onto the socket"""
+        try:
+            while True:
+                while not self._queue:
+                    self._drained.set()
+                    if self._closed:
+                        return
+                    self._has_items.clear()
+                    await self._has_items.wait()
+
+                # Pop before sending so a frame being written is never merged into
+                if self.codec.batching:
+                    batch = [self._queue.popleft() for _ in range(min(len(self._queue), WS_MAX_BATCH))]
+                else:
+                    batch = [self._queue.popleft()]
+                metrics.add_gauge("ws_outbound_queue_depth", -len(batch))
+                await self._write(batch)
+                self.sent += len(batch)
+                metrics.incr("ws_outbound_frames_sent", len(batch))
+
+                if len(self._queue) <= self.low_water:
+                    self._drained.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        finally:
+            metrics.add_gauge("ws_outbound_queue_depth", -len(self._queue))
+            self._queue.clear()
+            self._drained.set()
+
+    async def _write(self, batch):
+        """Encode and send one socket frame"""
+        if self.codec.batching:
+            frame = self.codec.encode_batch(batch)
+        else:
+            frame = self.codec.encode(batch[0])
+        metrics.incr("ws_outbound_bytes", len(frame), encoding=self.codec.name)
+
+        if self.codec.binary:
+            await self.websocket.send_bytes(frame)
+        else:
+            await self.websocket.send_text(frame)
+
+    async def close(self, flush: bool = True):
+        """Stop the writer, optionally after delivering everything queued"""
+        self._closed = True
+        if self._writer is None:
+            return
+        if flush and self._error is None:
+            self._has_items.set()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        else:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+    @property
+    def coalesce_rate(self) -> float:
+        return self.coalesced / self.enqueued if self.enqueued else 0.0
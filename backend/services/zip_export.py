@@ -0,0 +1,93 @@
+import io
+import os
+import re
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+# Compression level for exported archives (0-9)
+EXPORT_COMPRESS_LEVEL = int(os.getenv("EXPORT_COMPRESS_LEVEL", "6"))
+# Content is fed to the compressor in slices of this size
+EXPORT_WRITE_SIZE = 64 * 1024
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    Unseekable file object that collects whatever zipfile writes.
+
+    Because it cannot seek, zipfile writes each entry's sizes and CRC in a
+    data descriptor after the data instead of patching the local header,
+    which is what lets the archive be emitted front to back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_name(name: str) -> str:
+    """Safe top-level folder / file name for an export"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-.") or "project"
+
+
+def _entry_path(root: str, path: str) -> str:
+    parts = [p for p in path.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    return "/".join([root] + parts)
+
+
+def stream_zip(
+    files: Iterable[Tuple[str, str]],
+    root: str = "project",
+    compress_level: int = EXPORT_COMPRESS_LEVEL
+) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of (path, content) pairs piece by piece.
+
+    Only the file being compressed and the compressor state are held at
+    any time; the archive as a whole is never buffered.
+    """
+    sink = _StreamSink()
+    compression = zipfile.ZIP_DEFLATED if compress_level > 0 else zipfile.ZIP_STORED
+    timestamp = time.localtime()[:6]
+
+    with zipfile.ZipFile(sink, mode="w", compression=compression, compresslevel=compress_level or None) as archive:
+        for path, content in files:
+            info = zipfile.ZipInfo(_entry_path(root, path), date_time=timestamp)
+            info.compress_type = compression
+            info.external_attr = 0o644 << 16
+            data = content.encode("utf-8")
+            with archive.open(info, mode="w") as entry:
+                for offset in range(0, len(data), EXPORT_WRITE_SIZE):
+                    entry.write(data[offset:offset + EXPORT_WRITE_SIZE])
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    # Central directory
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
@@ -0,0 +1,164 @@
+"""
+Tests for admission control and degraded generation under load (no API key required)
+"""
+import asyncio
+import json
+import re
+import main
+from schemas.application_definition import GenerationRequest
+from services.admission import AdmissionController, AdmissionLevel, admission, degraded_mode
+from services.circuit_breaker import BreakerRegistry
+from services.model_backend import FakeBackend
+from services.model_router import ModelRouter, load_policy
+from services.ado_generator import ADOGenerator
+from services.session_bus import InProcessBus
+from services.tenancy import tenants
+from services.websocket_handler import EnhancedWebSocketHandler
+from test_cancellation import FakeWebSocket, chat_message
+from test_sse import call_app
+
+
+def test_levels_follow_soft_and_hard_limits():
+    controller = AdmissionController(soft_sessions=1, hard_sessions=2, soft_model_queue=10, hard_model_queue=20)
+    assert controller.admit("test").level == AdmissionLevel.NORMAL
+    assert controller.admit("test").level == AdmissionLevel.DEGRADED
+    rejected = controller.admit("test")
+    assert not rejected.admitted
+    assert rejected.retry_after > 0
+    assert controller.sessions == 2
+    controller.release()
+    assert controller.evaluate().degraded
+
+
+def test_model_queue_depth_drives_decisions():
+    controller = AdmissionController(soft_sessions=10, hard_sessions=10, soft_model_queue=1, hard_model_queue=2)
+    with controller.model_call():
+        assert controller.evaluate().level == AdmissionLevel.DEGRADED
+        with controller.model_call():
+            assert controller.evaluate().level == AdmissionLevel.REJECTED
+    assert controller.model_queue == 0
+    assert controller.evaluate().level == AdmissionLevel.NORMAL
+
+
+def batch_responder(prompt, model_name):
+    paths = re.findall(r"- (\S+) \(\w+\):", prompt)
+    if "=== FILE:" in prompt:
+        return "".join(f"=== FILE: {path} ===\n```jsx\n// {path}\n```\n=== END FILE ===\n" for path in paths)
+    return "export default function App() { return null; }"
+
+
+def test_degraded_generation_uses_template_batches_and_cheap_tier():
+    seen = []
+
+    def responder(prompt, model_name):
+        seen.append(model_name)
+        return batch_responder(prompt, model_name)
+
+    router = ModelRouter(load_policy(""), log=False, breakers=BreakerRegistry())
+    generator = ADOGenerator("unused", backend=FakeBackend(responder=responder), router=router)
+
+    async def scenario():
+        degraded_mode.set(True)
+        ado = await generator.generate_ado_from_prompt(GenerationRequest(prompt="a todo app"))
+        files = await generator.generate_files_from_ado(ado)
+        return ado, files
+
+    ado, files = asyncio.run(scenario())
+    assert ado.name == "todo-app"
+    assert files["src/components/TodoList.jsx"] == "// src/components/TodoList.jsx"
+    # No ADO call; one batch for the four small files, one call for the App page
+    assert len(seen) == 2
+    assert set(seen) == {"gemini-2.5-flash-lite"}
+
+
+class LimitedAdmission:
+    """Temporarily tighten the process-wide admission limits"""
+
+    def __init__(self, **limits):
+        self.limits = limits
+
+    def __enter__(self):
+        self.saved = {k: getattr(admission, k) for k in self.limits}
+        for k, v in self.limits.items():
+            setattr(admission, k, v)
+
+    def __exit__(self, *exc):
+        for k, v in self.saved.items():
+            setattr(admission, k, v)
+
+
+def test_overloaded_stream_is_rejected_with_retry_after():
+    async def scenario():
+        handler = EnhancedWebSocketHandler("test-key")
+        ws = FakeWebSocket()
+        ws.push({"prompt": "a todo app"})
+        with LimitedAdmission(hard_sessions=0):
+            await handler.handle_generate_stream(ws)
+        return ws
+
+    ws = asyncio.run(scenario())
+    assert ws.sent[0]["event"] == "rejected"
+    assert ws.sent[0]["retry_after"] > 0
+    assert ws.close_code == 1013
+    assert admission.sessions == 0
+
+
+def test_overloaded_chat_turn_is_rejected_but_session_stays_open():
+    async def scenario():
+        handler = EnhancedWebSocketHandler("test-key")
+        ws = FakeWebSocket()
+        session = asyncio.create_task(handler.handle_chat(ws))
+        with LimitedAdmission(hard_sessions=0):
+            ws.push(chat_message("make it blue"))
+            await asyncio.sleep(0.05)
+        ws.push({"type": "history", "project_id": "p"})
+        await asyncio.sleep(0.05)
+        ws.disconnect()
+        await session
+        return ws
+
+    ws = asyncio.run(scenario())
+    assert ws.sent[0]["type"] == "rejected"
+    assert ws.sent[1]["type"] == "history"
+
+
+class FailingBus(InProcessBus):
+    async def set_state(self, key, value, ttl=None):
+        raise ConnectionError("bus unavailable")
+
+
+def test_bus_failure_at_session_start_releases_admission():
+    async def scenario():
+        handler = EnhancedWebSocketHandler("test-key", bus=FailingBus())
+        ws = FakeWebSocket()
+        ws.push({"prompt": "a todo app"})
+        await handler.handle_generate_stream(ws)
+
+        saved = main.api_key, main.MODEL_PRELOAD
+        main.api_key, main.MODEL_PRELOAD = "placeholder", False
+        try:
+            async with main.lifespan(main.app):
+                main.websocket_handler.bus = FailingBus()
+                try:
+                    await call_app("POST", "/api/generate/stream", json.dumps({"prompt": "todo app"}).encode(),
+                                   {"content-type": "application/json"})
+                except ConnectionError:
+                    pass
+        finally:
+            main.api_key, main.MODEL_PRELOAD = saved
+        return ws
+
+    ws = asyncio.run(scenario())
+    assert [e["event"] for e in ws.sent] == ["error"]
+    assert admission.sessions == 0
+    assert tenants.usage()["anonymous"]["active"] == 0
+
+
+if __name__ == "__main__":
+    test_levels_follow_soft_and_hard_limits()
+    test_model_queue_depth_drives_decisions()
+    test_degraded_generation_uses_template_batches_and_cheap_tier()
+    test_overloaded_stream_is_rejected_with_retry_after()
+    test_overloaded_chat_turn_is_rejected_but_session_stays_open()
+    test_bus_failure_at_session_start_releases_admission()
+    print("✅ Admission tests passed")
@@ -0,0 +1,92 @@
+"""
+Tests for the content-addressed blob store and project version history (no API key required)
+"""
+from schemas.application_definition import ApplicationDefinitionObject, FileDefinition, FileType
+from services.blob_store import BlobStore, ProjectStore
+from benchmarks.fixtures import make_sample_ado
+
+
+def test_blobs_are_deduplicated_and_refcounted():
+    store = BlobStore()
+    h1, a = store.put("x" * 10)
+    h2, b = store.put("".join(["x"] * 10))
+    assert h1 == h2 and a is b
+    assert len(store) == 1 and store.total_bytes == 10
+
+    store.release(h1)
+    assert len(store) == 1
+    store.release(h1)
+    assert len(store) == 0 and store.total_bytes == 0
+
+
+def test_versions_share_unchanged_files():
+    projects = ProjectStore()
+    ado = make_sample_ado(20)
+    v1 = projects.commit("p", ado, message="generate")
+    size_after_first = projects.blobs.total_bytes
+
+    edited = {f.path: f.content for f in ado.files}
+    edited["src/components/Feature3Panel.jsx"] += "\n// tweak"
+    v2 = projects.commit("p", ado, edited, message="tweak")
+
+    assert v2.version == 2
+    assert v2.changed_files(v1) == ["src/components/Feature3Panel.jsx"]
+    # Only the edited file adds memory
+    assert projects.blobs.total_bytes - size_after_first == len(edited["src/components/Feature3Panel.jsx"])
+    assert v1.ado.files[0].content is v2.ado.files[0].content
+
+
+def test_undo_restores_previous_version_and_frees_blobs():
+    projects = ProjectStore()
+    ado = make_sample_ado(3)
+    projects.commit("p", ado)
+    before = projects.blobs.total_bytes
+    projects.commit("p", ado, {"package.json": "{}"})
+
+    restored = projects.undo("p")
+    assert restored.version == 1
+    assert projects.files(restored)["package.json"] == ado.files[0].content
+    assert projects.blobs.total_bytes == before
+    assert projects.undo("p") is None
+
+
+def test_history_is_capped():
+    projects = ProjectStore(max_versions=3)
+    ado = make_sample_ado(2)
+    for i in range(5):
+        projects.commit("p", ado, {"package.json": str(i)})
+    assert [v["version"] for v in projects.history("p")] == [3, 4, 5]
+    assert len(projects.blobs) == 4  # 3 package.json variants + the shared component
+
+
+def test_delta_elide_and_hydrate_against_client_manifest():
+    projects = ProjectStore()
+    ado = make_sample_ado(5)
+    v1 = projects.commit("p", ado)
+    edited = {f.path: f.content for f in ado.files}
+    edited["src/components/Feature3Panel.jsx"] += "\n// tweak"
+    v2 = projects.commit("p", ado, edited)
+    held = dict(v1.manifest, **{"src/old.js": "0" * 64})
+
+    changes, removed = projects.delta(v2, held)
+    assert changes == {"src/components/Feature3Panel.jsx": edited["src/components/Feature3Panel.jsx"]}
+    assert removed == ["src/old.js"]
+
+    elided = projects.elide(v2, held)
+    assert [f.path for f in elided.files if f.content] == ["src/components/Feature3Panel.jsx"]
+    assert all(f.content_hash == v2.manifest[f.path] for f in elided.files)
+    assert projects.hydrate(elided, v2) == v2.ado
+    # Hashes outside the version are not resolved
+    secret = FileDefinition(path="src/secret.js", type=FileType.JAVASCRIPT, content="const key = 1")
+    other = projects.commit("q", ApplicationDefinitionObject(name="other", files=[secret]))
+    stranger = elided.model_copy(update={"files": [other.ado.files[0].model_copy(update={"content": ""})]})
+    assert projects.hydrate(stranger, v2).files[0].content == ""
+
+
+if __name__ == "__main__":
+    test_blobs_are_deduplicated_and_refcounted()
+    test_versions_share_unchanged_files()
+    test_undo_restores_previous_version_and_frees_blobs()
+    test_history_is_capped()
+    test_delta_elide_and_hydrate_against_client_manifest()
+    print("✅ Blob store tests passed")
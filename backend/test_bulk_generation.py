@@ -0,0 +1,92 @@
+"""
+Tests for bulk generation, its rate limiting and resuming (no API key required)
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+from services.ado_generator import ADOGenerator
+from services.bulk_generation import BulkRunner, RateLimiter
+from services.circuit_breaker import BreakerRegistry
+from services.model_backend import FakeBackend
+from services.model_router import ModelRouter, load_policy
+
+
+def make_runner(backend, **options):
+    router = ModelRouter(load_policy(""), log=False, breakers=BreakerRegistry())
+    return BulkRunner(ADOGenerator("unused", backend=backend, router=router), rate_per_minute=0, **options)
+
+
+def write_requests(path, prompts):
+    with open(path, "w") as f:
+        for i, prompt in enumerate(prompts):
+            f.write(json.dumps({"id": f"app-{i}", "prompt": prompt}) + "\n")
+        f.write("{broken\n")
+
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rate_limiter_spaces_calls():
+    async def scenario():
+        limiter = RateLimiter(rate=50, burst=1)
+        start = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_bulk_run_writes_results_and_resumes():
+    with tempfile.TemporaryDirectory() as tmp:
+        requests, results = os.path.join(tmp, "in.jsonl"), os.path.join(tmp, "out.jsonl")
+        write_requests(requests, [f"gallery app {i}" for i in range(5)])
+
+        # An interrupted run left one finished item and half a line
+        with open(results, "w") as f:
+            f.write(json.dumps({"id": "app-0", "success": True}) + "\n{\"id\": \"app-1\", \"succ")
+
+        backend = FakeBackend()
+        summary = asyncio.run(make_runner(backend, workers=3).run(requests, results))
+        written = read_results(results)
+        # A rerun has nothing left but the invalid line, and adds no duplicates
+        asyncio.run(make_runner(backend).run(requests, results))
+        rerun = read_results(results)
+
+    assert summary["skipped"] == 1
+    assert summary["succeeded"] == 4 and summary["failed"] == 1
+    finished = {r["id"]: r for r in written}
+    assert [r["id"] for r in written][0] == "app-0" and len(written) == len(finished)
+    assert set(finished) == {"app-0", "app-1", "app-2", "app-3", "app-4", "line-6"}
+    assert sorted(r["id"] for r in rerun) == sorted(finished)
+    assert finished["app-2"]["files"] and finished["app-2"]["ado"]["files"]
+    assert not finished["line-6"]["success"]
+
+
+def test_fallback_results_count_as_failed_and_are_retried():
+    with tempfile.TemporaryDirectory() as tmp:
+        requests, results = os.path.join(tmp, "in.jsonl"), os.path.join(tmp, "out.jsonl")
+        write_requests(requests, ["an app nobody has templated"])
+
+        # An unusable ADO answer makes the generator fall back to a minimal ADO
+        unusable = FakeBackend(responder=lambda prompt, model: "no json here")
+        first = asyncio.run(make_runner(unusable).run(requests, results))
+        failed = [r for r in read_results(results) if r["id"] == "app-0"]
+        second = asyncio.run(make_runner(FakeBackend()).run(requests, results))
+        attempts = [r for r in read_results(results) if r["id"] == "app-0"]
+
+    assert first["succeeded"] == 0
+    assert failed[0]["fallbacks"] == ["minimal"] and not failed[0]["success"]
+    # The retry replaces the failed record
+    assert len(attempts) == 1 and attempts[0]["success"]
+    assert second["skipped"] == 0 and second["succeeded"] == 1
+
+
+if __name__ == "__main__":
+    test_rate_limiter_spaces_calls()
+    test_bulk_run_writes_results_and_resumes()
+    test_fallback_results_count_as_failed_and_are_retried()
+    print("✅ Bulk generation tests passed")
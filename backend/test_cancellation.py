@@ -0,0 +1,160 @@
+"""
+Tests for cancelling and superseding in-flight chat turns and generations (no API key required)
+"""
+import asyncio
+import json
+from fastapi import WebSocketDisconnect
+from services.websocket_handler import EnhancedWebSocketHandler
+from schemas.application_definition import ApplicationDefinitionObject
+
+
+class FakeWebSocket:
+    """In-memory stand-in for a Starlette WebSocket"""
+
+    def __init__(self):
+        self.scope = {}
+        self.query_params = {}
+        self.incoming = asyncio.Queue()
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def receive_json(self):
+        message = await self.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect()
+        return json.loads(message["text"])
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    def push(self, data):
+        self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+
+def make_handler(started, cancelled):
+    handler = EnhancedWebSocketHandler("test-key")
+
+    async def slow_modify(request):
+        started.append(request.modification_prompt)
+        try:
+            await asyncio.sleep(0.2 if request.modification_prompt == "first" else 0)
+        except asyncio.CancelledError:
+            cancelled.append(request.modification_prompt)
+            raise
+        return request.current_ado
+
+    async def no_files(ado):
+        return {}
+
+    handler.ado_generator.modify_ado = slow_modify
+    handler.ado_generator.generate_files_from_ado = no_files
+    return handler
+
+
+def chat_message(text):
+    ado = ApplicationDefinitionObject(name="app")
+    return {"type": "chat_message", "message": text, "current_ado": ado.model_dump()}
+
+
+def test_new_message_supersedes_running_turn():
+    async def scenario():
+        started, cancelled = [], []
+        handler = make_handler(started, cancelled)
+        ws = FakeWebSocket()
+        session = asyncio.create_task(handler.handle_chat(ws))
+
+        ws.push(chat_message("first"))
+        await asyncio.sleep(0.05)
+        ws.push(chat_message("second"))
+        await asyncio.sleep(0.05)
+        ws.disconnect()
+        await session
+        return ws.sent, cancelled
+
+    sent, cancelled = asyncio.run(scenario())
+    assert cancelled == ["first"]
+    superseded = [m for m in sent if m["type"] == "turn_cancelled"]
+    assert superseded == [{"type": "turn_cancelled", "turn_id": 1, "cancelled": True, "reason": "superseded"}]
+    responses = [m for m in sent if m["type"] == "chat_response"]
+    assert [(r["turn_id"], r["cancelled"]) for r in responses] == [(2, False)]
+
+
+def test_explicit_cancel_message():
+    async def scenario():
+        started, cancelled = [], []
+        handler = make_handler(started, cancelled)
+        ws = FakeWebSocket()
+        session = asyncio.create_task(handler.handle_chat(ws))
+
+        ws.push(chat_message("first"))
+        await asyncio.sleep(0.05)
+        ws.push({"type": "cancel"})
+        await asyncio.sleep(0.05)
+        ws.disconnect()
+        await session
+        return ws.sent, cancelled
+
+    sent, cancelled = asyncio.run(scenario())
+    assert cancelled == ["first"]
+    assert sent[-1]["reason"] == "cancelled"
+
+
+def test_disconnect_aborts_generation():
+    async def scenario():
+        cancelled = []
+        handler = EnhancedWebSocketHandler("test-key")
+
+        async def hanging_generate(request):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(request.prompt)
+                raise
+
+        handler.ado_generator.generate_ado_from_prompt = hanging_generate
+        ws = FakeWebSocket()
+        ws.push({"prompt": "todo app"})
+        session = asyncio.create_task(handler.handle_generate_stream(ws))
+        await asyncio.sleep(0.05)
+        ws.disconnect()
+        await asyncio.wait_for(session, timeout=1)
+        return cancelled
+
+    assert asyncio.run(scenario()) == ["todo app"]
+
+
+def test_malformed_generation_request_is_answered_and_closed():
+    async def scenario(frame):
+        handler = EnhancedWebSocketHandler("test-key")
+        ws = FakeWebSocket()
+        ws.incoming.put_nowait(frame)
+        await asyncio.wait_for(handler.handle_generate_stream(ws), timeout=1)
+        return ws
+
+    for frame in (
+        {"type": "websocket.receive", "text": "not json"},
+        {"type": "websocket.receive", "text": "[1, 2]"},
+        {"type": "websocket.receive", "bytes": b"{}"},
+    ):
+        ws = asyncio.run(scenario(frame))
+        assert [e["event"] for e in ws.sent] == ["error"]
+        assert ws.close_code == 1000
+
+
+if __name__ == "__main__":
+    test_new_message_supersedes_running_turn()
+    test_explicit_cancel_message()
+    test_disconnect_aborts_generation()
+    test_malformed_generation_request_is_answered_and_closed()
+    print("✅ Cancellation tests passed")
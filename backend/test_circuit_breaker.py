@@ -0,0 +1,130 @@
+"""
+Tests for the model circuit breaker and fallback chain (no API key required)
+"""
+import asyncio
+import time
+from schemas.application_definition import GenerationRequest
+from services.circuit_breaker import BreakerRegistry, CircuitBreaker, CircuitState
+from services.model_backend import FakeBackend
+from services.model_router import ModelRouter, load_policy
+from services.fallbacks import ADOResultCache, match_template, stub_file_content
+from services.prompt_reuse import prompt_index
+from services.tenancy import current_tenant
+from services.ado_generator import ADOGenerator
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_cancelled_probe_frees_its_slot():
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_match_template():
+    assert match_template("Build me a todo list with reminders")["id"] == "todo-app"
+    assert match_template("an online store with a cart")["id"] == "ecommerce-catalog"
+    assert match_template("a compiler for a toy language") is None
+
+
+def make_generator(backend: FakeBackend) -> ADOGenerator:
+    router = ModelRouter(load_policy(""), log=False, breakers=BreakerRegistry(failure_threshold=1, reset_timeout=60))
+    return ADOGenerator("unused", backend=backend, router=router)
+
+
+def test_failing_backend_falls_back_fast_to_template():
+    backend = FakeBackend(failure_rate=1.0)
+    generator = make_generator(backend)
+    request = GenerationRequest(prompt="A todo app with due dates")
+
+    start = time.perf_counter()
+    ado = asyncio.run(generator.generate_ado_from_prompt(request))
+    assert time.perf_counter() - start < 0.5
+    assert ado.name == "todo-app"
+    assert generator.router.breakers.get("gemini-2.5-flash").state == CircuitState.OPEN
+    assert generator.router.breakers.get("gemini-2.5-pro").state == CircuitState.OPEN
+    # Once both circuits are open, nothing reaches the backend
+    assert backend.calls == 2
+
+    files = asyncio.run(generator.generate_files_from_ado(ado))
+    assert "export default function TodoList()" in files["src/components/TodoList.jsx"]
+    assert '"react"' in files["package.json"]
+    # The lite tier used for plain files fails once, then its circuit is open too
+    assert backend.calls == 3
+
+
+def test_cached_result_is_served_when_backend_is_down():
+    request = GenerationRequest(prompt="A   Weather dashboard for Lisbon")
+    healthy = asyncio.run(make_generator(FakeBackend()).generate_ado_from_prompt(request))
+    assert healthy.name == "fake-app"
+
+    again = GenerationRequest(prompt="a weather dashboard for lisbon")
+    ado = asyncio.run(make_generator(FakeBackend(failure_rate=1.0)).generate_ado_from_prompt(again))
+    assert ado.name == "fake-app"
+
+
+def test_cached_results_stay_within_their_tenant():
+    cache = ADOResultCache()
+    request = GenerationRequest(prompt="Recipe catalog for acme")
+    healthy = asyncio.run(make_generator(FakeBackend()).generate_ado_from_prompt(request))
+    cache.put(request, healthy)
+    assert cache.get(request) is healthy
+
+    async def as_other_tenant():
+        current_tenant.set("other")
+        assert cache.get(request) is None
+        # Neither the result cache nor prompt reuse hands over the ADO
+        prompt_index.clear()
+        return await make_generator(FakeBackend(failure_rate=1.0)).generate_ado_from_prompt(request)
+
+    assert asyncio.run(as_other_tenant()).name != healthy.name
+
+
+def test_alternate_model_serves_when_preferred_tier_fails():
+    def responder(prompt, model_name):
+        if model_name == "gemini-2.5-flash":
+            raise RuntimeError("flash down")
+        return "ok from " + model_name
+
+    generator = make_generator(FakeBackend(responder=responder))
+    response = asyncio.run(generator._generate_with_retry("p", call_type="modify"))
+    assert response.text == "ok from gemini-2.5-pro"
+
+
+def test_stub_file_content_for_plain_files():
+    ado = asyncio.run(make_generator(FakeBackend()).generate_ado_from_prompt(GenerationRequest(prompt="x")))
+    assert stub_file_content(ado.files[0], ado).startswith("{")
+
+
+if __name__ == "__main__":
+    test_breaker_opens_fails_fast_and_recovers()
+    test_cancelled_probe_frees_its_slot()
+    test_match_template()
+    test_failing_backend_falls_back_fast_to_template()
+    test_cached_result_is_served_when_backend_is_down()
+    test_cached_results_stay_within_their_tenant()
+    test_alternate_model_serves_when_preferred_tier_fails()
+    test_stub_file_content_for_plain_files()
+    print("✅ Circuit breaker tests passed")
@@ -0,0 +1,60 @@
+"""
+Tests for continuing model output cut off at the token limit (no API key required)
+"""
+import asyncio
+import json
+import re
+from services.continuation import continuation_prompt, is_truncated, stitch
+from services.model_backend import FakeBackend, ModelResponse
+from services.model_router import ModelRouter, load_policy
+from services.ado_generator import ADOGenerator
+
+FULL_OUTPUT = "".join(f"const line{i} = {i};\n" for i in range(800))
+
+
+def resume_responder(prompt: str, model_name: str) -> str:
+    """Answers a continuation prompt with the rest of FULL_OUTPUT, repeating a little"""
+    match = re.search(r"<<<PARTIAL_END\n(.*)\nPARTIAL_END", prompt, re.S)
+    if not match:
+        return FULL_OUTPUT
+    end = FULL_OUTPUT.index(match.group(1)) + len(match.group(1))
+    return "```js\n" + FULL_OUTPUT[max(0, end - 20):]
+
+
+def test_is_truncated():
+    assert is_truncated(ModelResponse("x", finish_reason="MAX_TOKENS"))
+    assert not is_truncated(ModelResponse("x"))
+
+
+def test_stitch_drops_repeated_overlap_and_fence():
+    assert stitch("function a() {\n  return 1;", "  return 1;\n}\n") == "function a() {\n  return 1;\n}\n"
+    assert stitch("{\"a\": [1, 2", "```json\n, 3]}") == "{\"a\": [1, 2, 3]}"
+    # A short accidental match is not treated as a repeat
+    assert stitch("abc", "cde") == "abccde"
+
+
+def test_continuation_prompt_quotes_only_the_tail():
+    prompt = continuation_prompt("Generate a file", "x" * 5000 + "END", anchor_chars=100)
+    assert prompt.startswith("Generate a file")
+    assert "x" * 97 + "END" in prompt
+    assert "x" * 200 not in prompt
+
+
+def test_truncated_output_is_continued_not_regenerated():
+    backend = FakeBackend(responder=resume_responder)
+    policy = load_policy(json.dumps({"routes": {"file": {"tiers": ["lite"], "min_output_tokens": 2000, "max_output_tokens": 2000}}}))
+    generator = ADOGenerator("unused", backend=backend, router=ModelRouter(policy, log=False))
+
+    response = asyncio.run(generator._generate_with_retry("Generate src/big.js", call_type="file"))
+    assert response.text == FULL_OUTPUT
+    assert response.finish_reason == "STOP"
+    # 17,000 characters at 8,000 per call: the first call plus two continuations
+    assert backend.calls == 3
+
+
+if __name__ == "__main__":
+    test_is_truncated()
+    test_stitch_drops_repeated_overlap_and_fence()
+    test_continuation_prompt_quotes_only_the_tail()
+    test_truncated_output_is_continued_not_regenerated()
+    print("✅ Continuation tests passed")
@@ -0,0 +1,126 @@
+"""
+Tests for content-hash manifests on the chat WebSocket (no API key required)
+"""
+import asyncio
+from schemas.application_definition import GenerationRequest, ModificationRequest
+from services.ado_generator import ADOGenerator
+from services.model_backend import FakeBackend, default_fake_responder
+from services.project_index import compute_content_hash
+from services.websocket_handler import EnhancedWebSocketHandler
+from benchmarks.fixtures import make_sample_ado
+from test_cancellation import FakeWebSocket
+
+
+def make_handler():
+    handler = EnhancedWebSocketHandler("test-key")
+
+    async def edit_one_file(request):
+        # Appends the prompt to the file it names, leaving the rest unchanged
+        path = request.modification_prompt
+        files = [
+            f.model_copy(update={"content": f.content + "\n// edited"}) if f.path == path else f
+            for f in request.current_ado.files
+        ]
+        return request.current_ado.model_copy(update={"files": files})
+
+    async def no_files(ado):
+        return {}
+
+    handler.ado_generator.modify_ado = edit_one_file
+    handler.ado_generator.generate_files_from_ado = no_files
+    return handler
+
+
+async def exchange(handler, messages):
+    """Send messages one at a time on a fresh connection; returns the replies"""
+    ws = FakeWebSocket()
+    session = asyncio.create_task(handler.handle_chat(ws))
+    for count, message in enumerate(messages, start=1):
+        ws.push(message(ws.sent) if callable(message) else message)
+        while len([m for m in ws.sent if m["type"] != "status"]) < count:
+            await asyncio.sleep(0.01)
+    ws.disconnect()
+    await session
+    return [m for m in ws.sent if m["type"] != "status"]
+
+
+def test_chat_sends_only_files_the_client_lacks():
+    ado = make_sample_ado(4)
+    held = {f.path: compute_content_hash(f.content) for f in ado.files}
+    first_path, second_path = ado.files[1].path, ado.files[2].path
+
+    async def scenario(handler):
+        replies = await exchange(handler, [
+            {"type": "chat_message", "project_id": "p", "message": first_path,
+             "current_ado": ado.model_dump(), "manifest": held},
+            # Send back the ADO as received, contents left out and all
+            lambda sent: {"type": "chat_message", "project_id": "p", "message": second_path,
+                          "current_ado": sent[-1]["updated_ado"]},
+        ])
+        # Reconnecting with an older copy of one file
+        stale = dict(replies[1]["manifest"], **{first_path: held[first_path]})
+        reopened = await exchange(handler, [{"type": "sync", "project_id": "p", "manifest": stale}])
+        legacy = await exchange(handler, [{"type": "sync", "project_id": "p"}, {"type": "sync", "project_id": "nope"}])
+        return replies, reopened, legacy
+
+    replies, reopened, legacy = asyncio.run(scenario(make_handler()))
+    first, second = replies
+
+    assert list(first["changes"]) == [first_path] and first["removed"] == []
+    assert [f["path"] for f in first["updated_ado"]["files"] if f["content"]] == [first_path]
+    # The second turn worked on the full ADO and only sends its own edit
+    assert list(second["changes"]) == [second_path]
+    assert second["changes"][second_path].endswith("// edited")
+    assert second["manifest"][first_path] == first["manifest"][first_path]
+
+    assert reopened[0]["type"] == "project_state" and reopened[0]["version"] == 3
+    assert list(reopened[0]["changes"]) == [first_path]
+    assert reopened[0]["changes"][first_path].count("// edited") == 1
+    assert len(legacy[0]["changes"]) == 4
+    assert legacy[1] == {"type": "error", "message": "Unknown project"}
+
+
+def test_clients_without_manifest_get_every_file():
+    ado = make_sample_ado(3)
+
+    async def scenario(handler):
+        return await exchange(handler, [
+            {"type": "chat_message", "project_id": "p", "message": ado.files[0].path, "current_ado": ado.model_dump()},
+        ])
+
+    reply = asyncio.run(scenario(make_handler()))[0]
+    assert reply["type"] == "chat_response"
+    assert set(reply["changes"]) == {f.path for f in ado.files} and "removed" not in reply
+    assert all(f["content"] for f in reply["updated_ado"]["files"])
+    assert reply["manifest"] == {f["path"]: f["content_hash"] for f in reply["updated_ado"]["files"]}
+
+
+def test_content_hashes_are_not_sent_to_the_model():
+    ado = make_sample_ado(3)
+    ado = ado.model_copy(update={"files": [
+        f.model_copy(update={"content_hash": compute_content_hash(f.content)}) for f in ado.files
+    ]})
+    prompts = []
+
+    def responder(prompt, model):
+        prompts.append(prompt)
+        return default_fake_responder(prompt, model)
+
+    generator = ADOGenerator("unused", backend=FakeBackend(responder=responder))
+
+    async def scenario():
+        await generator.modify_ado(ModificationRequest(
+            modification_prompt="rename the app", current_ado=ado, files_to_modify=[ado.files[0].path]
+        ))
+        await generator._adapt_ado(ado, "todo app", GenerationRequest(prompt="todo app with tags"))
+
+    asyncio.run(scenario())
+    assert len(prompts) == 2
+    assert all("content_hash" not in p for p in prompts)
+
+
+if __name__ == "__main__":
+    test_chat_sends_only_files_the_client_lacks()
+    test_clients_without_manifest_get_every_file()
+    test_content_hashes_are_not_sent_to_the_model()
+    print("✅ File manifest tests passed")
@@ -0,0 +1,101 @@
+"""
+Tests for hedged model calls and the backend abstraction (no API key required)
+"""
+import asyncio
+from services.hedging import Hedger, LatencyTracker
+from services.model_backend import FakeBackend
+from services.ado_generator import ADOGenerator
+
+
+def warmed_hedger(latency: float = 0.01, **kwargs) -> Hedger:
+    hedger = Hedger(enabled=True, percentile=0.9, tracker=LatencyTracker(min_samples=5), **kwargs)
+    for _ in range(100):
+        hedger.tracker.record("file", latency)
+    return hedger
+
+
+def test_no_threshold_until_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record("file", 0.1)
+    assert tracker.percentile("file", 0.9) is None
+    tracker.record("file", 0.2)
+    tracker.record("file", 0.3)
+    assert tracker.percentile("file", 0.9) == 0.3
+    assert tracker.percentile("ado", 0.9) is None
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    latencies = iter([1.0, 0.01])
+    backend = FakeBackend(latency=lambda: next(latencies))
+
+    async def scenario():
+        hedger = warmed_hedger(max_extra_fraction=1.0)
+        response = await hedger.call("file", lambda: backend.generate("p", "m", {}))
+        await asyncio.sleep(0)
+        return hedger, response
+
+    hedger, response = asyncio.run(scenario())
+    assert response.text
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 1)
+    assert (backend.calls, backend.cancelled) == (2, 1)
+
+
+def test_hedge_budget_caps_extra_calls():
+    backend = FakeBackend(latency=lambda: 0.05)
+
+    async def scenario():
+        hedger = warmed_hedger(max_extra_fraction=0.25)
+        for _ in range(8):
+            await hedger.call("file", lambda: backend.generate("p", "m", {}))
+        return hedger
+
+    hedger = asyncio.run(scenario())
+    assert hedger.hedges == 2
+    assert hedger.primary_calls == 8
+
+
+def test_failed_first_finisher_waits_for_the_other():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("primary failed")
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    async def scenario():
+        hedger = warmed_hedger(max_extra_fraction=1.0)
+        return await hedger.call("file", flaky)
+
+    assert asyncio.run(scenario()) == "hedge"
+
+
+def test_disabled_hedger_never_duplicates():
+    backend = FakeBackend(latency=lambda: 0.05)
+
+    async def scenario():
+        hedger = warmed_hedger(max_extra_fraction=1.0)
+        hedger.enabled = False
+        await hedger.call("file", lambda: backend.generate("p", "m", {}))
+        return hedger
+
+    assert asyncio.run(scenario()).hedges == 0
+    assert backend.calls == 1
+
+
+def test_generator_runs_on_fake_backend():
+    generator = ADOGenerator("unused", backend=FakeBackend())
+    content = asyncio.run(generator._generate_with_retry("Generate the content for src/App.jsx"))
+    assert "export default" in content.text
+
+
+if __name__ == "__main__":
+    test_no_threshold_until_enough_samples()
+    test_slow_primary_is_hedged_and_cancelled()
+    test_hedge_budget_caps_extra_calls()
+    test_failed_first_finisher_waits_for_the_other()
+    test_disabled_hedger_never_duplicates()
+    test_generator_runs_on_fake_backend()
+    print("✅ Hedging tests passed")
@@ -0,0 +1,80 @@
+"""
+Tests for the event loop lag and stall monitor (no API key required)
+"""
+import asyncio
+import json
+import time
+import main
+from services.loop_monitor import LoopMonitor
+from services.metrics import metrics
+from test_sse import call_app
+
+
+def block_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_stall_is_reported_with_blocking_stack():
+    async def scenario(monitor):
+        monitor.start()
+        await asyncio.sleep(0.05)
+
+        async def handler():
+            await asyncio.sleep(0)
+            block_loop(0.15)
+
+        await asyncio.create_task(handler(), name="slow-handler")
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    stalls_before = metrics.counter("event_loop_stalls")
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=40)
+    asyncio.run(scenario(monitor))
+    report = monitor.report()
+
+    assert not report["running"]
+    assert len(report["stalls"]) == 1
+    stall = report["stalls"][0]
+    assert stall["duration_ms"] >= 100
+    assert stall["stack"] == ["handler (test_loop_monitor.py)", "block_loop (test_loop_monitor.py)"]
+    assert stall["task"].startswith("slow-handler")
+    assert metrics.counter("event_loop_stalls") == stalls_before + 1
+    assert report["max_lag_ms"] >= 100
+
+
+def test_idle_loop_records_lag_without_stalls():
+    async def scenario(monitor):
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    count_before = metrics.snapshot()["summaries"].get("event_loop_lag_ms", {}).get("count", 0)
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=40)
+    asyncio.run(scenario(monitor))
+    lag = metrics.snapshot()["summaries"]["event_loop_lag_ms"]
+
+    assert lag["count"] - count_before >= 5
+    assert monitor.report()["stalls"] == []
+
+
+def test_lifespan_runs_monitor_and_admin_reports_it():
+    async def scenario():
+        saved = main.api_key, main.MODEL_PRELOAD, main.ADMIN_TOKEN
+        main.api_key, main.MODEL_PRELOAD, main.ADMIN_TOKEN = "placeholder", False, "secret"
+        try:
+            async with main.lifespan(main.app):
+                status, _, body = await call_app("GET", "/admin/loop", headers={"x-admin-token": "secret"})
+            return status, json.loads(body), main.loop_monitor.running
+        finally:
+            main.api_key, main.MODEL_PRELOAD, main.ADMIN_TOKEN = saved
+
+    status, report, running_after = asyncio.run(scenario())
+    assert status == 200 and report["running"] and "stalls" in report
+    assert not running_after
+
+
+if __name__ == "__main__":
+    test_stall_is_reported_with_blocking_stack()
+    test_idle_loop_records_lag_without_stalls()
+    test_lifespan_runs_monitor_and_admin_reports_it()
+    print("✅ Loop monitor tests passed")
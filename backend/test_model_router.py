@@ -0,0 +1,115 @@
+"""
+Tests for routing model calls across tiers (no API key required)
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+import main
+from schemas.application_definition import (
+    ApplicationDefinitionObject, ComponentDefinition, ComponentType, FileDefinition, FileType
+)
+from services.model_backend import FakeBackend
+from services.model_router import ModelRouter, classify_file, load_policy
+from services.ado_generator import ADOGenerator
+
+
+def make_router(**overrides) -> ModelRouter:
+    return ModelRouter(load_policy(json.dumps(overrides)) if overrides else load_policy(""), log=False)
+
+
+def test_call_types_use_their_preferred_tiers():
+    router = make_router()
+    assert router.route("ado").tier == "flash"
+    assert router.route("file").tier == "lite"
+    assert router.route("health").max_output_tokens == 100
+    assert router.route("unknown").tier == "lite"
+
+
+def test_output_budget_follows_estimate():
+    router = make_router()
+    assert router.route("file", estimated_tokens=200).max_output_tokens == 1024
+    assert router.route("file", estimated_tokens=2000).max_output_tokens == 3000
+    assert router.route("file", estimated_tokens=100000).max_output_tokens == 8192
+
+
+def test_large_components_go_to_large_tiers():
+    router = make_router()
+    assert router.route("component", estimated_tokens=2000).tier == "flash"
+    decision = router.route("component", estimated_tokens=9000)
+    assert decision.tier == "pro"
+    assert decision.model == "gemini-2.5-pro"
+
+
+def test_degraded_tier_is_skipped_until_it_recovers():
+    router = make_router(min_samples=4, window=4)
+    for _ in range(4):
+        router.record("lite", 100, ok=False)
+    decision = router.route("file")
+    assert decision.tier == "flash"
+    assert "error rate" in decision.reason
+    for _ in range(4):
+        router.record("lite", 100, ok=True)
+    assert router.route("file").tier == "lite"
+
+
+def test_skipped_tier_is_retried_once_its_stats_age_out():
+    router = make_router(min_samples=2, stats_ttl_s=0.05)
+    router.record("lite", 100, ok=False)
+    router.record("lite", 100, ok=False)
+    assert router.route("file").tier == "flash"
+    time.sleep(0.06)
+    assert router.route("file").tier == "lite"
+
+
+def test_latency_slo_and_policy_overrides():
+    router = make_router(min_samples=2, tiers={"lite": {"model": "small-model", "latency_slo_ms": 500}})
+    assert router.route("file").model == "small-model"
+    router.record("lite", 900, ok=True)
+    router.record("lite", 900, ok=True)
+    assert router.route("file").tier == "flash"
+
+
+def test_classify_file():
+    ado = ApplicationDefinitionObject(
+        name="app",
+        description="",
+        framework="react",
+        files=[],
+        components=[
+            ComponentDefinition(name="Dashboard", type=ComponentType.PAGE, file_path="src/Dashboard.jsx"),
+            ComponentDefinition(name="Button", type=ComponentType.FUNCTIONAL, file_path="src/Button.jsx"),
+        ]
+    )
+    page = FileDefinition(path="src/Dashboard.jsx", type=FileType.JSX, content="", component="Dashboard")
+    button = FileDefinition(path="src/Button.jsx", type=FileType.JSX, content="", component="Button")
+    config = FileDefinition(path="package.json", type=FileType.JSON, content="")
+    assert classify_file(page, ado)[0] == "component"
+    assert classify_file(button, ado)[0] == "file"
+    assert classify_file(config, ado) == ("file", 250)
+
+
+def test_generator_uses_routed_model_and_budget():
+    seen = []
+
+    def responder(prompt, model_name):
+        seen.append(model_name)
+        return "ok"
+
+    backend = FakeBackend(responder=responder)
+    generator = ADOGenerator("unused", backend=backend, router=make_router())
+    asyncio.run(generator._generate_with_retry("p", call_type="component", estimated_tokens=9000))
+    assert seen == ["gemini-2.5-pro"]
+
+
+if __name__ == "__main__":
+    test_call_types_use_their_preferred_tiers()
+    test_output_budget_follows_estimate()
+    test_large_components_go_to_large_tiers()
+    test_degraded_tier_is_skipped_until_it_recovers()
+    test_skipped_tier_is_retried_once_its_stats_age_out()
+    test_latency_slo_and_policy_overrides()
+    test_classify_file()
+    test_generator_uses_routed_model_and_budget()
+    test_failed_health_check_reports_the_routed_model()
+    print("✅ Model router tests passed")
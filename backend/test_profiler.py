@@ -0,0 +1,108 @@
+"""
+Tests for the on-demand sampling profiler and its admin endpoints (no API key required)
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import main
+from services.profiler import SamplingProfiler, profiler
+from test_sse import call_app
+
+
+def scope_with(headers):
+    return {"headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+
+
+def test_requested_by_header_query_or_sample_rate():
+    sampler = SamplingProfiler(sample_rate=0)
+    assert sampler.requested(scope_with({"X-Profile": "1"}))
+    assert sampler.requested(scope_with({}), {"profile": "true"})
+    assert not sampler.requested(scope_with({}))
+    assert not SamplingProfiler(sample_rate=1).requested(scope_with({"X-Profile": "0"}))
+    assert SamplingProfiler(sample_rate=1).requested(scope_with({}))
+
+
+def test_profile_records_cpu_and_wait_stacks():
+    def busy_validation():
+        end = time.perf_counter() + 0.15
+        while time.perf_counter() < end:
+            pass
+
+    async def model_call():
+        await asyncio.sleep(0.05)
+
+    async def session():
+        await model_call()
+        busy_validation()
+
+    async def scenario(sampler):
+        profile = sampler.start("session", include_current=False)
+        task = asyncio.create_task(session())
+        profile.root = task
+        await task
+        sampler.finish(profile)
+        return profile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sampler = SamplingProfiler(directory=tmp, interval_ms=2)
+        profile = asyncio.run(scenario(sampler))
+        with open(sampler.path(profile.id)) as f:
+            folded = f.read()
+        listed = sampler.list()
+
+    assert "[cpu]" in folded and "busy_validation (test_profiler.py)" in folded
+    assert "[wait];session (test_profiler.py);model_call (test_profiler.py)" in folded
+    assert listed[0]["id"] == profile.id and listed[0]["samples"] > 0
+    assert sampler.path("../etc") is None
+
+
+def test_max_active_and_pruning():
+    async def scenario(sampler):
+        first = sampler.start("a")
+        skipped = sampler.start("b")
+        sampler.finish(first)
+        second = sampler.start("c")
+        sampler.finish(second)
+        return skipped
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sampler = SamplingProfiler(directory=tmp, max_active=1, keep=1)
+        assert asyncio.run(scenario(sampler)) is None
+        assert len(sampler.list()) == 1 and len(os.listdir(tmp)) == 2
+
+
+def test_admin_endpoints_need_token_and_serve_profiles():
+    async def scenario():
+        saved = main.ADMIN_TOKEN, profiler.directory, profiler.sample_rate
+        with tempfile.TemporaryDirectory() as tmp:
+            main.ADMIN_TOKEN, profiler.directory = "secret", tmp
+            try:
+                profile = profiler.start("/api/generate")
+                await asyncio.sleep(0.02)
+                profiler.finish(profile)
+                admin = {"x-admin-token": "secret", "content-type": "application/json"}
+                denied = await call_app("GET", "/admin/profiles", headers={"x-admin-token": "wrong"})
+                listed = await call_app("GET", "/admin/profiles", headers=admin)
+                downloaded = await call_app("GET", f"/admin/profiles/{profile.id}", headers=admin)
+                missing = await call_app("GET", "/admin/profiles/nope", headers=admin)
+                toggled = await call_app("POST", "/admin/profiling", json.dumps({"sample_rate": 0.25}).encode(), admin)
+                return profile, denied, listed, downloaded, missing, toggled, profiler.sample_rate
+            finally:
+                main.ADMIN_TOKEN, profiler.directory, profiler.sample_rate = saved
+
+    profile, denied, listed, downloaded, missing, toggled, rate = asyncio.run(scenario())
+    assert denied[0] == 403
+    assert json.loads(listed[2])["profiles"][0]["id"] == profile.id
+    assert downloaded[0] == 200 and downloaded[2].decode() == profile.folded()
+    assert missing[0] == 404
+    assert toggled[0] == 200 and rate == 0.25
+
+
+if __name__ == "__main__":
+    test_requested_by_header_query_or_sample_rate()
+    test_profile_records_cpu_and_wait_stacks()
+    test_max_active_and_pruning()
+    test_admin_endpoints_need_token_and_serve_profiles()
+    print("✅ Profiler tests passed")
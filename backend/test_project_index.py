@@ -0,0 +1,84 @@
+"""
+Tests for the content-hash project indexer (no API key required)
+"""
+import json
+from services.project_index import ProjectIndexer, infer_file_type
+from schemas.application_definition import FileType
+
+SAMPLE_FILES = {
+    "package.json": json.dumps({
+        "dependencies": {"react": "^18.2.0"},
+        "devDependencies": {"vite": "^5.0.0"}
+    }),
+    "src/App.jsx": "import React from 'react';\nimport TodoList from './TodoList';\nexport default function App() { return <TodoList />; }\n",
+    "src/TodoList.jsx": "import { useState } from 'react';\nexport const EMPTY = [];\nexport default function TodoList() { return null; }\n",
+    "src/utils.js": "export function formatDate(d) { return d; }\nconst a = 1, b = 2;\nexport { a, b as bee };\n",
+    "src/index.css": "body { margin: 0; }",
+}
+
+
+def test_infer_file_type():
+    assert infer_file_type("src/App.jsx") == FileType.JSX
+    assert infer_file_type("styles/main.scss") == FileType.SCSS
+    assert infer_file_type("README.md") == FileType.MARKDOWN
+    assert infer_file_type("Makefile") == FileType.JAVASCRIPT
+
+
+def test_index_extracts_structure():
+    index = ProjectIndexer().index_files(SAMPLE_FILES)
+
+    app = index.files["src/App.jsx"]
+    assert app.component_name == "App"
+    assert app.analysis.imports == ["react", "./TodoList"]
+
+    todo = index.files["src/TodoList.jsx"]
+    assert todo.analysis.exports == ["default", "EMPTY"]
+
+    utils = index.files["src/utils.js"]
+    assert utils.component_name is None
+    assert utils.analysis.exports == ["formatDate", "a", "bee"]
+
+    deps = {(d.name, d.dev) for d in index.dependencies}
+    assert deps == {("react", False), ("vite", True)}
+
+
+def test_analysis_is_reused_per_content_hash():
+    indexer = ProjectIndexer()
+    indexer.index_files(SAMPLE_FILES)
+    assert indexer.misses == len(SAMPLE_FILES)
+
+    changed = dict(SAMPLE_FILES)
+    changed["src/index.css"] = "body { margin: 1px; }"
+    indexer.index_files(changed)
+    assert indexer.misses == len(SAMPLE_FILES) + 1
+    assert indexer.hits == len(SAMPLE_FILES) - 1
+
+
+def test_same_content_at_a_different_kind_of_path_is_reanalyzed():
+    indexer = ProjectIndexer()
+    content = '{"dependencies": {"react": "^18.2.0"}}'
+    as_package = indexer.analyze("package.json", content)
+    as_data = indexer.analyze("src/data.json", content)
+    as_script = indexer.analyze("src/App.jsx", "export default function App() {}")
+    as_text = indexer.analyze("README.md", "export default function App() {}")
+    assert [d.name for d in as_package.dependencies] == ["react"] and as_data.dependencies == []
+    assert as_script.exports == ["default"] and as_text.exports == []
+    assert indexer.hits == 0
+
+
+def test_build_ado():
+    indexer = ProjectIndexer()
+    index = indexer.index_files(SAMPLE_FILES)
+    ado = indexer.build_ado(SAMPLE_FILES, index)
+
+    assert {c.name for c in ado.components} == {"App", "TodoList"}
+    assert len(ado.files) == len(SAMPLE_FILES)
+
+
+if __name__ == "__main__":
+    test_infer_file_type()
+    test_index_extracts_structure()
+    test_analysis_is_reused_per_content_hash()
+    test_same_content_at_a_different_kind_of_path_is_reanalyzed()
+    test_build_ado()
+    print("✅ Project index tests passed")
@@ -0,0 +1,90 @@
+"""
+Tests for near-duplicate prompt reuse (no API key required)
+"""
+import asyncio
+from schemas.application_definition import ApplicationDefinitionObject, GenerationRequest
+from services.ado_generator import ADOGenerator
+from services.circuit_breaker import BreakerRegistry
+from services.model_backend import FakeBackend, default_fake_responder
+from services.model_router import ModelRouter, load_policy
+from services.prompt_reuse import PromptReuseIndex, prompt_index, prompt_terms
+from services.tenancy import current_tenant
+
+
+def test_index_matches_reworded_prompts_only():
+    index = PromptReuseIndex(threshold=0.75, max_entries=2)
+    ado = ApplicationDefinitionObject(name="todo")
+    index.add(GenerationRequest(prompt="Todo app with dark mode"), ado, cost_ms=900)
+
+    assert prompt_terms("a dark-mode todo app") == prompt_terms("todo apps with dark mode")
+    exact = index.lookup(GenerationRequest(prompt="a dark-mode todo app"))
+    assert exact.ado is ado and exact.similarity == 1.0 and exact.cost_ms == 900
+    assert index.lookup(GenerationRequest(prompt="todo app with dark mode and tags")).similarity == 0.8
+    assert index.lookup(GenerationRequest(prompt="weather dashboard")) is None
+    assert index.lookup(GenerationRequest(prompt="todo app with dark mode", framework="vue")) is None
+    # Tenants never see each other's ADOs
+    token = current_tenant.set("acme")
+    assert index.lookup(GenerationRequest(prompt="todo app with dark mode")) is None
+    current_tenant.reset(token)
+
+    index.add(GenerationRequest(prompt="weather dashboard"), ado, cost_ms=1)
+    index.add(GenerationRequest(prompt="recipe catalog"), ado, cost_ms=1)
+    # The todo entry was least recently used and is gone
+    assert index.lookup(GenerationRequest(prompt="todo app with dark mode")) is None
+    assert index.snapshot()["entries"] == 2
+
+
+def make_generator(prompts, adapt_answer=None):
+    def responder(prompt, model):
+        prompts.append(prompt)
+        if "Adapt it to the new request" in prompt and adapt_answer is not None:
+            return adapt_answer
+        return default_fake_responder(prompt, model)
+
+    router = ModelRouter(load_policy(""), log=False, breakers=BreakerRegistry())
+    return ADOGenerator("unused", backend=FakeBackend(responder=responder), router=router)
+
+
+def test_generator_reuses_and_adapts_similar_prompts():
+    prompt_index.clear()
+    before = prompt_index.snapshot()
+    prompts = []
+    generator = make_generator(prompts)
+
+    async def scenario():
+        first = await generator.generate_ado_from_prompt(GenerationRequest(prompt="todo app with dark mode"))
+        calls_after_first = len(prompts)
+        reused = await generator.generate_ado_from_prompt(GenerationRequest(prompt="A dark-mode todo app"))
+        calls_after_reuse = len(prompts)
+        adapted = await generator.generate_ado_from_prompt(GenerationRequest(prompt="todo app with dark mode and tags"))
+        return first, reused, adapted, calls_after_first, calls_after_reuse
+
+    first, reused, adapted, calls_after_first, calls_after_reuse = asyncio.run(scenario())
+    after = prompt_index.snapshot()
+
+    assert calls_after_first == 1 and calls_after_reuse == 1
+    assert reused == first and reused is not first
+    assert len(prompts) == 2 and "New request: \"todo app with dark mode and tags\"" in prompts[1]
+    assert adapted.name == first.name
+    assert after["reused"] - before["reused"] == 1 and after["adapted"] - before["adapted"] == 1
+
+
+def test_failed_adaptation_falls_back_to_full_generation():
+    prompt_index.clear()
+    prompts = []
+    generator = make_generator(prompts, adapt_answer="no json here")
+
+    async def scenario():
+        await generator.generate_ado_from_prompt(GenerationRequest(prompt="recipe catalog with search and favorites"))
+        return await generator.generate_ado_from_prompt(GenerationRequest(prompt="recipe catalog with search, favorites and tags"))
+
+    ado = asyncio.run(scenario())
+    assert ado.name == "fake-app"
+    assert ["Adapt it to the new request" in p for p in prompts] == [False, True, False]
+
+
+if __name__ == "__main__":
+    test_index_matches_reworded_prompts_only()
+    test_generator_reuses_and_adapts_similar_prompts()
+    test_failed_adaptation_falls_back_to_full_generation()
+    print("✅ Prompt reuse tests passed")
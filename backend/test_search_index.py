@@ -0,0 +1,54 @@
+"""
+Tests for the project search index used to pick chat edit targets (no API key required)
+"""
+from services.project_index import ProjectIndexer
+from services.search_index import ProjectSearchIndex, SearchIndexCache, tokenize
+from schemas.application_definition import RouteDefinition
+
+FILES = {
+    "package.json": '{"dependencies": {"react": "^18.2.0"}}',
+    "src/App.jsx": "import Header from './components/Header';\nexport default function App() { return <Header />; }",
+    "src/components/Header.jsx": "export default function Header({ title }) { return <nav className='navbar'>{title}</nav>; }",
+    "src/components/ShoppingCart.jsx": "export default function ShoppingCart({ items }) { const total = items.length; return <aside>{total} items in cart</aside>; }",
+    "src/components/ProductList.jsx": "export default function ProductList({ products }) { return <ul>{products.map(p => <li>{p.price}</li>)}</ul>; }",
+}
+
+
+def build_ado():
+    ado = ProjectIndexer().build_ado(FILES)
+    ado.routes.append(RouteDefinition(path="/checkout", component="ShoppingCart"))
+    return ado
+
+
+def test_tokenize_splits_camel_case_and_paths():
+    assert tokenize("src/components/ShoppingCart.jsx") == ["components", "shopping", "cart"]
+
+
+def test_rank_prefers_relevant_files():
+    index = ProjectSearchIndex(build_ado())
+    ranked = index.rank("show the cart total on checkout")
+    assert ranked[0][0] == "src/components/ShoppingCart.jsx"
+
+
+def test_select_targets_includes_named_components():
+    index = ProjectSearchIndex(build_ado())
+    targets = index.select_targets("Give the Header a darker navbar")
+    assert targets[0] == "src/components/Header.jsx"
+    assert "package.json" not in targets
+
+
+def test_cache_is_keyed_by_project_version():
+    cache = SearchIndexCache()
+    ado = build_ado()
+    assert cache.get(ado) is cache.get(build_ado())
+
+    ado.files[1].content += "\n// changed"
+    assert cache.get(ado) is not cache.get(build_ado())
+
+
+if __name__ == "__main__":
+    test_tokenize_splits_camel_case_and_paths()
+    test_rank_prefers_relevant_files()
+    test_select_targets_includes_named_components()
+    test_cache_is_keyed_by_project_version()
+    print("✅ Search index tests passed")
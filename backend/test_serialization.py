@@ -0,0 +1,39 @@
+"""
+Tests for the shared serializer used by HTTP, WebSocket and prompt paths (no API key required)
+"""
+import json
+from services import serialization
+from services.ado_generator import ADOValidator
+from benchmarks.fixtures import make_sample_ado
+
+
+def test_event_with_raw_ado_matches_plain_json():
+    ado = make_sample_ado(5)
+    encoded = serialization.encode_event({"event": "finish", "ado": serialization.raw_ado(ado), "message": "ok"})
+    decoded = json.loads(encoded)
+    assert decoded == {"event": "finish", "ado": ado.model_dump(mode="json"), "message": "ok"}
+
+
+def test_ado_json_is_cached_until_invalidated():
+    ado = make_sample_ado(3)
+    first = serialization.ado_json(ado)
+    assert serialization.ado_json(ado) is first
+
+    ado.dependencies.clear()
+    ADOValidator.enrich_ado(ado)  # Mutates in place and invalidates
+    assert json.loads(serialization.ado_json(ado))["dependencies"] == [
+        d.model_dump(mode="json") for d in ado.dependencies
+    ]
+
+
+def test_materialize_expands_raw_values():
+    ado = make_sample_ado(2)
+    event = serialization.materialize({"event": "finish", "ado": serialization.raw_ado(ado)})
+    assert event["ado"]["name"] == "sample-app"
+
+
+if __name__ == "__main__":
+    test_event_with_raw_ado_matches_plain_json()
+    test_ado_json_is_cached_until_invalidated()
+    test_materialize_expands_raw_values()
+    print("✅ Serialization tests passed")
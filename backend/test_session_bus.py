@@ -0,0 +1,267 @@
+"""
+Tests for the session event bus and cross-replica session attach (no API key required)
+"""
+import asyncio
+import json
+from schemas.application_definition import ApplicationDefinitionObject, FileDefinition, FileType
+from services.resp import encode_command, read_reply
+from services.session_bus import InProcessBus, RedisBus, SessionPublisher
+from services.websocket_handler import EnhancedWebSocketHandler
+from test_cancellation import FakeWebSocket
+
+
+class MiniRedis:
+    """Just enough of the Redis protocol for the session bus, in-process"""
+
+    def __init__(self):
+        self.lists = {}
+        self.strings = {}
+        self.subscribers = {}
+        # Commands answered only after a pause, to cancel clients mid-command
+        self.slow = set()
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return "redis://127.0.0.1:%d/0" % self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                name, args = command[0].decode().upper(), command[1:]
+                if name in self.slow:
+                    await asyncio.sleep(0.05)
+                writer.write(self._reply(name, args, writer))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for writers in self.subscribers.values():
+                writers.discard(writer)
+            writer.close()
+
+    def _reply(self, name, args, writer) -> bytes:
+        if name in ("PING", "AUTH", "SELECT", "SET", "EXPIRE"):
+            if name == "SET":
+                self.strings[args[0]] = args[1]
+            return b"+OK\r\n" if name != "EXPIRE" else b":1\r\n"
+        if name == "GET":
+            value = self.strings.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "RPUSH":
+            items = self.lists.setdefault(args[0], [])
+            items.extend(args[1:])
+            return b":%d\r\n" % len(items)
+        if name == "LRANGE":
+            items = self.lists.get(args[0], [])
+            stop = int(args[2])
+            items = items[int(args[1]):(None if stop == -1 else stop + 1)]
+            return b"*%d\r\n" % len(items) + b"".join(b"$%d\r\n%s\r\n" % (len(i), i) for i in items)
+        if name == "PUBLISH":
+            listeners = self.subscribers.get(args[0], set())
+            for listener in listeners:
+                listener.write(encode_command(b"message", args[0], args[1]))
+            return b":%d\r\n" % len(listeners)
+        if name == "SUBSCRIBE":
+            self.subscribers.setdefault(args[0], set()).add(writer)
+            return encode_command(b"subscribe", args[0], b"1")
+        return b"-ERR unknown command\r\n"
+
+
+async def collect(bus, session_id, start, count):
+    seen = []
+    events = bus.events(session_id, start)
+    try:
+        async for index, event in events:
+            seen.append((index, json.loads(event)))
+            if len(seen) == count:
+                break
+    finally:
+        await events.aclose()
+    return seen
+
+
+async def exercise_bus(publisher_bus, follower_bus):
+    # Events published before and after the follower starts are both seen, in order
+    await publisher_bus.publish("s1", b'{"n": 0}')
+    follower = asyncio.create_task(collect(follower_bus, "s1", 0, 3))
+    await asyncio.sleep(0.05)
+    await publisher_bus.publish("s1", b'{"n": 1}')
+    await publisher_bus.publish("s1", b'{"n": 2}')
+    seen = await asyncio.wait_for(follower, timeout=1)
+    assert [(i, e["n"]) for i, e in seen] == [(0, 0), (1, 1), (2, 2)]
+
+    # Resuming from an index skips what the client already has
+    resumed = await asyncio.wait_for(collect(follower_bus, "s1", 2, 1), timeout=1)
+    assert [i for i, _ in resumed] == [2]
+
+    await publisher_bus.set_state("k", b"v")
+    assert await follower_bus.get_state("k") == b"v"
+    assert await follower_bus.get_state("missing") is None
+
+
+def test_in_process_bus():
+    async def scenario():
+        bus = InProcessBus()
+        await exercise_bus(bus, bus)
+
+    asyncio.run(scenario())
+
+
+def test_redis_bus_across_connections():
+    async def scenario():
+        server = MiniRedis()
+        url = await server.start()
+        first, second = RedisBus(url), RedisBus(url)
+        try:
+            await exercise_bus(first, second)
+        finally:
+            await first.close()
+            await second.close()
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_redis_bus_recovers_from_a_cancelled_command():
+    async def scenario():
+        server = MiniRedis()
+        url = await server.start()
+        bus = RedisBus(url)
+        try:
+            await bus.set_state("k", b"v")
+            server.slow.add("RPUSH")
+            publish = asyncio.create_task(bus.publish("s1", b"{}"))
+            await asyncio.sleep(0.01)
+            publish.cancel()
+            await asyncio.gather(publish, return_exceptions=True)
+            server.slow.clear()
+            # The RPUSH reply still on the wire must not answer the GET
+            return await bus.get_state("k")
+        finally:
+            await bus.close()
+            await server.stop()
+
+    assert asyncio.run(scenario()) == b"v"
+
+
+def test_publisher_numbers_events_and_survives_lost_client():
+    class BrokenSender:
+        async def send_json(self, event):
+            raise ConnectionError("gone")
+
+    async def scenario():
+        bus = InProcessBus()
+        publisher = SessionPublisher(bus, "s", BrokenSender(), resumable=True)
+        await publisher.send_json({"event": "status"})
+        await publisher.send_json({"event": "finish"})
+        return publisher, await collect(bus, "s", 0, 2)
+
+    publisher, seen = asyncio.run(scenario())
+    assert publisher.sender is None
+    assert [e["seq"] for _, e in seen] == [0, 1]
+
+
+def test_in_process_logs_expire_after_the_session_ends():
+    async def scenario():
+        bus = InProcessBus(ttl=0.05)
+        resumable = SessionPublisher(bus, "kept", resumable=True)
+        await resumable.send_json({"event": "status"})
+        await resumable.send_json({"event": "finish"})
+        followed = SessionPublisher(bus, "followed")
+        follower = asyncio.create_task(collect(bus, "followed", 0, 2))
+        await asyncio.sleep(0)
+        await followed.send_json({"event": "status"})
+        await followed.send_json({"event": "error"})
+        await follower
+        unfollowed = SessionPublisher(bus, "unfollowed")
+        await unfollowed.send_json({"event": "status"})
+        await unfollowed.send_json({"event": "cancelled"})
+        await bus.set_state("k", b"v")
+
+        # A late follower of a finished non-resumable session only sees how it ended
+        late = await collect(bus, "unfollowed", 0, 1)
+        kept = [len(bus._logs[s]) for s in ("kept", "followed")]
+        dropped = bus._logs["unfollowed"].count(None)
+        await asyncio.sleep(0.06)
+        await bus.publish("next", b"{}")
+        return late, kept, dropped, set(bus._logs), await bus.get_state("k")
+
+    late, kept, dropped, after, state = asyncio.run(scenario())
+    assert [(i, e["event"]) for i, e in late] == [(1, "cancelled")]
+    assert kept == [2, 2] and dropped == 1
+    # Expired logs and state are gone
+    assert after == {"next"}
+    assert state is None
+
+
+def make_replica(url):
+    handler = EnhancedWebSocketHandler("test-key", bus=RedisBus(url))
+    ado = ApplicationDefinitionObject(name="app", files=[
+        FileDefinition(path="src/App.jsx", type=FileType.JSX, content="x" * 250),
+    ])
+
+    async def generate(request):
+        return ado
+
+    handler.ado_generator.generate_ado_from_prompt = generate
+    return handler
+
+
+def test_session_followed_from_another_replica():
+    async def scenario():
+        server = MiniRedis()
+        url = await server.start()
+        origin, other = make_replica(url), make_replica(url)
+
+        client = FakeWebSocket()
+        client.push({"prompt": "todo app", "resumable": True, "project_id": "p1"})
+        generation = asyncio.create_task(origin.handle_generate_stream(client))
+        await asyncio.sleep(0.05)
+        session_id = client.sent[0]["session_id"]
+        resume_from = client.sent[-1]["seq"] + 1
+        client.disconnect()
+
+        # The client reconnects to another replica and picks up where it left off
+        follower = FakeWebSocket()
+        follower.query_params = {"from": str(resume_from)}
+        await asyncio.wait_for(other.handle_attach(follower, session_id), timeout=2)
+        await asyncio.wait_for(generation, timeout=2)
+
+        # The finished project is visible to the other replica's chat
+        await other._sync_project("p1")
+        version = other.project_store.latest("p1")
+
+        unknown = FakeWebSocket()
+        await other.handle_attach(unknown, "nope")
+
+        await origin.bus.close()
+        await other.bus.close()
+        await server.stop()
+        return client.sent, follower.sent, version, unknown.sent
+
+    first, resumed, version, unknown = asyncio.run(scenario())
+    assert first[0]["event"] == "session" and first[0]["resumable"]
+    seqs = [e["seq"] for e in first] + [e["seq"] for e in resumed]
+    assert seqs == list(range(len(seqs)))
+    assert resumed[-1]["event"] == "finish"
+    chunks = "".join(e["chunk"] for e in first + resumed if e["event"] == "code_chunk")
+    assert chunks == "x" * 250
+    assert version.version == 1
+    assert version.ado.files[0].content == "x" * 250
+    assert unknown[0]["event"] == "error"
+
+
+if __name__ == "__main__":
+    test_in_process_bus()
+    test_redis_bus_across_connections()
+    test_redis_bus_recovers_from_a_cancelled_command()
+    test_publisher_numbers_events_and_survives_lost_client()
+    test_in_process_logs_expire_after_the_session_ends()
+    test_session_followed_from_another_replica()
+    print("✅ Session bus tests passed")
@@ -0,0 +1,87 @@
+"""
+Tests for coalescing identical concurrent model calls (no API key required)
+"""
+import asyncio
+from services.singleflight import SingleFlight, request_key
+
+
+def test_concurrent_duplicates_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight("test")
+        key = request_key("model", {"temperature": 0.7}, "todo app")
+        results = await asyncio.gather(*(flights.do(key, fetch) for _ in range(5)))
+        return results, flights
+
+    results, flights = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert (flights.calls, flights.coalesced, flights.in_flight()) == (1, 4, 0)
+
+
+def test_different_config_is_not_coalesced():
+    assert request_key("model", {"temperature": 0.7}, "p") != request_key("model", {"temperature": 0.2}, "p")
+
+
+def test_errors_are_shared_and_not_remembered():
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend down")
+
+    async def scenario():
+        flights = SingleFlight("test")
+        first = await asyncio.gather(flights.do("k", failing), flights.do("k", failing), return_exceptions=True)
+        second = await asyncio.gather(flights.do("k", failing), return_exceptions=True)
+        return first + second
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 2
+
+
+def test_call_survives_one_waiter_cancelling():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        flights = SingleFlight("test")
+        leaving = asyncio.create_task(flights.do("k", slow))
+        staying = asyncio.create_task(flights.do("k", slow))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        result = await staying
+
+        # With nobody left waiting the shared call is aborted
+        alone = asyncio.create_task(flights.do("k2", slow))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.gather(alone, return_exceptions=True)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "done"
+    assert cancelled == [1]
+
+
+if __name__ == "__main__":
+    test_concurrent_duplicates_share_one_call()
+    test_different_config_is_not_coalesced()
+    test_errors_are_shared_and_not_remembered()
+    test_call_survives_one_waiter_cancelling()
+    print("✅ Singleflight tests passed")
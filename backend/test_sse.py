@@ -0,0 +1,188 @@
+"""
+Tests for the Server-Sent Events generation stream (no API key required)
+"""
+import asyncio
+import json
+import main
+from schemas.application_definition import ApplicationDefinitionObject, FileDefinition, FileType
+from services.session_bus import InProcessBus, SessionPublisher
+from services.sse import cancel_when_abandoned, format_event, parse_event_id, session_stream
+
+
+def parse_stream(body: bytes):
+    """[(id, event, data)] from an event-stream body"""
+    events = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_event_ids_round_trip():
+    assert parse_event_id("abc:12") == ("abc", 12)
+    assert parse_event_id("abc") is None
+    assert parse_event_id("abc:x") is None
+    assert format_event("abc", 3, "status", b'{"a":1}') == b'id: abc:3\nevent: status\ndata: {"a":1}\n\n'
+
+
+def test_session_stream_resumes_and_keeps_alive():
+    async def scenario():
+        bus = InProcessBus()
+        publisher = SessionPublisher(bus, "s")
+        for event in ("session", "status", "file_start"):
+            await publisher.send_json({"event": event})
+
+        async def finish_later():
+            await asyncio.sleep(0.05)
+            await publisher.send_json({"event": "finish"})
+
+        finishing = asyncio.create_task(finish_later())
+        body = b"".join([chunk async for chunk in session_stream(bus, "s", start=2, heartbeat=0.01)])
+        await finishing
+        return body
+
+    body = asyncio.run(scenario())
+    assert b": keep-alive" in body
+    assert [(i, e) for i, e, _ in parse_stream(body)] == [("s:2", "file_start"), ("s:3", "finish")]
+
+
+async def call_app(method: str, path: str, body: bytes = b"", headers=None):
+    """Drive the ASGI app directly; returns (status, headers, body)"""
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "http_version": "1.1", "scheme": "http", "server": ("test", 80), "client": ("test", 1), "root_path": "",
+    }
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await main.app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+def test_generate_stream_emits_websocket_event_sequence_and_resumes():
+    async def scenario():
+        saved = main.api_key, main.MODEL_PRELOAD
+        main.api_key, main.MODEL_PRELOAD = "placeholder", False
+        try:
+            async with main.lifespan(main.app):
+                ado = ApplicationDefinitionObject(name="app", files=[
+                    FileDefinition(path="src/App.jsx", type=FileType.JSX, content="y" * 150),
+                ])
+
+                async def generate(request):
+                    return ado
+
+                main.websocket_handler.ado_generator.generate_ado_from_prompt = generate
+                started = await call_app("POST", "/api/generate/stream", json.dumps({"prompt": "todo app"}).encode(),
+                                         {"content-type": "application/json"})
+                first_id = parse_stream(started[2])[0][0]
+                resumed = await call_app("POST", "/api/generate/stream", headers={"last-event-id": first_id})
+                missing = await call_app("POST", "/api/generate/stream", b"{}", {"content-type": "application/json"})
+                unknown = await call_app("GET", "/api/generate/stream/nope")
+                return started, resumed, missing, unknown
+        finally:
+            main.api_key, main.MODEL_PRELOAD = saved
+
+    started, resumed, missing, unknown = asyncio.run(scenario())
+    status, headers, body = started
+    assert status == 200 and headers["content-type"].startswith("text/event-stream")
+    events = parse_stream(body)
+    names = [e for _, e, _ in events]
+    assert names[:2] == ["session", "status"]
+    for name in ("ado_generated", "structure_generated", "file_start", "code_chunk", "file_end", "finish"):
+        assert name in names
+    assert "".join(d["chunk"] for _, e, d in events if e == "code_chunk") == "y" * 150
+    assert [d["seq"] for _, _, d in events] == list(range(len(events)))
+
+    # Resuming after the first event replays the rest of the same session
+    assert [i for i, _, _ in parse_stream(resumed[2])] == [i for i, _, _ in events[1:]]
+    assert missing[0] == 400 and unknown[0] == 404
+
+
+def test_generate_stream_can_be_cancelled():
+    async def scenario():
+        saved = main.api_key, main.MODEL_PRELOAD
+        main.api_key, main.MODEL_PRELOAD = "placeholder", False
+        try:
+            async with main.lifespan(main.app):
+                async def generate(request):
+                    await asyncio.sleep(10)
+
+                main.websocket_handler.ado_generator.generate_ado_from_prompt = generate
+                stream = asyncio.create_task(call_app(
+                    "POST", "/api/generate/stream", json.dumps({"prompt": "todo app"}).encode(),
+                    {"content-type": "application/json"}
+                ))
+                while not main.websocket_handler._generations:
+                    await asyncio.sleep(0.01)
+                session_id = next(iter(main.websocket_handler._generations))
+                cancelled = await call_app("POST", f"/api/generate/stream/{session_id}/cancel")
+                started = await asyncio.wait_for(stream, timeout=1)
+                again = await call_app("POST", f"/api/generate/stream/{session_id}/cancel")
+                return started, cancelled, again
+        finally:
+            main.api_key, main.MODEL_PRELOAD = saved
+
+    started, cancelled, again = asyncio.run(scenario())
+    assert cancelled[0] == 200
+    assert parse_stream(started[2])[-1][1] == "cancelled"
+    assert again[0] == 404
+
+
+def test_sessions_nobody_follows_are_cancelled():
+    async def scenario():
+        bus = InProcessBus()
+        cancelled = []
+
+        async def watch(session_id):
+            generation = asyncio.create_task(asyncio.sleep(0.3))
+
+            async def cancel():
+                cancelled.append(session_id)
+                generation.cancel()
+
+            return generation, asyncio.create_task(cancel_when_abandoned(bus, session_id, generation, cancel, after=0.05))
+
+        publisher = SessionPublisher(bus, "followed")
+        await publisher.send_json({"event": "session"})
+
+        async def follow():
+            return [chunk async for chunk in session_stream(bus, "followed", abandon_after=0.05)]
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0)
+        followed, _ = await watch("followed")
+        abandoned, _ = await watch("abandoned")
+        await asyncio.gather(followed, abandoned, return_exceptions=True)
+        await publisher.send_json({"event": "finish"})
+        await asyncio.wait_for(follower, timeout=1)
+        return cancelled, followed.cancelled()
+
+    cancelled, followed_cancelled = asyncio.run(scenario())
+    assert cancelled == ["abandoned"] and not followed_cancelled
+
+
+if __name__ == "__main__":
+    test_event_ids_round_trip()
+    test_session_stream_resumes_and_keeps_alive()
+    test_generate_stream_emits_websocket_event_sequence_and_resumes()
+    test_generate_stream_can_be_cancelled()
+    test_sessions_nobody_follows_are_cancelled()
+    print("✅ SSE tests passed")
@@ -0,0 +1,62 @@
+"""
+Tests for lazy startup and configuration checks (no API key required)
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import main
+from fastapi import HTTPException
+
+
+def test_import_does_not_need_key_or_sdk():
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_API_KEY"}
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('google.generativeai' in sys.modules)"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_config_problems():
+    assert main.config_problems("key", "gemini") == []
+    assert main.config_problems(None, "fake") == []
+    assert main.config_problems(None, "gemini") == ["GOOGLE_API_KEY environment variable not set."]
+    assert "MODEL_BACKEND" in main.config_problems("key", "other")[0]
+
+
+def test_lifespan_validates_then_serves_live_before_ready():
+    async def scenario():
+        saved = main.api_key, main.MODEL_PRELOAD
+        try:
+            main.api_key = None
+            try:
+                async with main.lifespan(main.app):
+                    pass
+                assert False, "startup should fail without an API key"
+            except RuntimeError as e:
+                assert "GOOGLE_API_KEY" in str(e)
+
+            main.api_key, main.MODEL_PRELOAD = "placeholder", True
+            async with main.lifespan(main.app):
+                backend = main.websocket_handler.ado_generator.backend
+                backend.load = lambda: None  # keep the SDK out of the test
+                assert (await main.liveness())["status"] == "alive"
+                try:
+                    await main.readiness()
+                    assert False, "not ready before the preload runs"
+                except HTTPException as e:
+                    assert e.status_code == 503
+                await asyncio.wait_for(main.ready.wait(), timeout=1)
+                assert (await main.readiness())["status"] == "ready"
+        finally:
+            main.api_key, main.MODEL_PRELOAD = saved
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_import_does_not_need_key_or_sdk()
+    test_config_problems()
+    test_lifespan_validates_then_serves_live_before_ready()
+    print("✅ Startup tests passed")
@@ -0,0 +1,165 @@
+"""
+Tests for tenant identification, quotas, fair queuing and usage accounting (no API key required)
+"""
+import asyncio
+import json
+import main
+from services.admission import AdmissionController
+from services.tenancy import FairScheduler, TenantConfig, TenantRegistry, current_tenant
+from services.model_backend import FakeBackend
+from services.ado_generator import ADOGenerator
+import services.ado_generator as ado_generator_module
+from services.metrics import metrics
+from test_sse import call_app
+
+
+def scope(**headers):
+    return {"headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]}
+
+
+def make_registry() -> TenantRegistry:
+    return TenantRegistry(TenantConfig(**{
+        "default": {"max_concurrent": 1},
+        "tenants": {
+            "acme": {"weight": 3, "max_concurrent": 2, "api_keys": ["acme-secret"]},
+            "bulk": {"weight": 1},
+        }
+    }))
+
+
+def test_identify_by_header_key_or_query():
+    registry = make_registry()
+    assert registry.identify(scope(x_tenant_id="bulk")) == "bulk"
+    assert registry.identify(scope(x_api_key="acme-secret")) == "acme"
+    assert registry.identify(scope(authorization="Bearer acme-secret")) == "acme"
+    assert registry.identify({}, {"api_key": "acme-secret"}) == "acme"
+    assert registry.identify({}) == "anonymous"
+
+
+def test_unverified_identities_share_the_anonymous_tenant():
+    registry = make_registry()
+    # A keyed tenant cannot be claimed by name, with or without a wrong key
+    assert registry.identify(scope(x_tenant_id="acme")) == "anonymous"
+    assert registry.identify({}, {"tenant": "acme", "api_key": "guess"}) == "anonymous"
+    # Unknown keys and tenant names do not get a quota of their own
+    assert registry.identify(scope(x_api_key="someone-else")) == "anonymous"
+    assert {registry.identify(scope(x_tenant_id=f"t{i}")) for i in range(5)} == {"anonymous"}
+    assert registry.identify(scope(x_tenant_id="acme", x_api_key="acme-secret")) == "acme"
+
+
+def test_per_tenant_concurrency_limits():
+    registry = make_registry()
+    controller = AdmissionController(soft_sessions=100, hard_sessions=100, tenant_registry=registry)
+    assert controller.admit("test", tenant="acme").admitted
+    assert controller.admit("test", tenant="acme").admitted
+    rejected = controller.admit("test", tenant="acme")
+    assert rejected.reason == "tenant concurrency limit"
+    # Other tenants are unaffected
+    assert controller.admit("test", tenant="anonymous").admitted
+    controller.release("acme")
+    assert controller.admit("test", tenant="acme").admitted
+    assert controller.sessions == 3
+
+
+def run_scheduled(scheduler, submissions):
+    order = []
+
+    async def call(tenant):
+        async with scheduler.slot(tenant):
+            order.append(tenant)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        await asyncio.gather(*(call(tenant) for tenant in submissions))
+
+    asyncio.run(scenario())
+    return order
+
+
+def test_burst_from_one_tenant_does_not_starve_another():
+    scheduler = FairScheduler(make_registry(), concurrency=1)
+    order = run_scheduled(scheduler, ["bulk"] * 8 + ["anonymous"] * 2)
+    # anonymous arrives last but is served within the first few slots
+    assert order.index("anonymous") <= 2
+    assert order[-1] == "bulk"
+
+
+def test_capacity_follows_weights():
+    scheduler = FairScheduler(make_registry(), concurrency=1)
+    order = run_scheduled(scheduler, ["bulk"] * 12 + ["acme"] * 12)
+    first = order[:12]
+    assert first.count("acme") >= 2 * first.count("bulk")
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    scheduler = FairScheduler(make_registry(), concurrency=1)
+
+    async def scenario():
+        async def hold():
+            async with scheduler.slot("bulk"):
+                await asyncio.sleep(0.02)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        async with scheduler.slot("acme"):
+            pass
+        return scheduler.running
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_usage_is_accounted_per_tenant():
+    registry = make_registry()
+    original = ado_generator_module.tenants
+    ado_generator_module.tenants = registry
+    try:
+        generator = ADOGenerator("unused", backend=FakeBackend())
+
+        async def scenario():
+            current_tenant.set("acme")
+            await generator._generate_with_retry("Generate src/App.jsx", call_type="file")
+
+        asyncio.run(scenario())
+    finally:
+        ado_generator_module.tenants = original
+
+    usage = registry.usage()["acme"]
+    assert usage["calls"] == 1
+    assert usage["prompt_tokens"] > 0 and usage["output_tokens"] > 0
+    assert usage["weight"] == 3
+
+
+def test_tenant_usage_needs_the_admin_token():
+    async def scenario():
+        saved = main.ADMIN_TOKEN
+        main.ADMIN_TOKEN = "secret"
+        metrics.incr("tenant_model_calls", tenant="acme")
+        try:
+            anonymous = await call_app("GET", "/api/usage")
+            admin = await call_app("GET", "/api/usage", headers={"x-admin-token": "secret"})
+            public_metrics = await call_app("GET", "/metrics")
+            admin_metrics = await call_app("GET", "/metrics", headers={"x-admin-token": "secret"})
+            return anonymous, admin, public_metrics, admin_metrics
+        finally:
+            main.ADMIN_TOKEN = saved
+
+    anonymous, admin, public_metrics, admin_metrics = asyncio.run(scenario())
+    assert anonymous[0] == 403 and admin[0] == 200
+    assert "tenant=" not in public_metrics[2].decode()
+    assert "tenant_model_calls{tenant=acme}" in json.loads(admin_metrics[2])["counters"]
+
+
+if __name__ == "__main__":
+    test_identify_by_header_key_or_query()
+    test_unverified_identities_share_the_anonymous_tenant()
+    test_per_tenant_concurrency_limits()
+    test_burst_from_one_tenant_does_not_starve_another()
+    test_capacity_follows_weights()
+    test_cancelled_waiter_does_not_leak_its_slot()
+    test_usage_is_accounted_per_tenant()
+    test_tenant_usage_needs_the_admin_token()
+    print("✅ Tenancy tests passed")
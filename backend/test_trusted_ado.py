@@ -0,0 +1,43 @@
+"""
+Tests for trusted-path ADO construction (no API key required)
+"""
+from services import serialization
+from services.trusted_ado import TrustedADOCache
+from benchmarks.fixtures import make_sample_ado
+
+
+def test_server_produced_ado_skips_validation():
+    cache = TrustedADOCache()
+    ado = make_sample_ado(5)
+    cache.remember(ado)
+
+    client_data = serialization.loads(serialization.ado_json(ado))
+    assert cache.validate(client_data) is ado
+
+
+def test_unknown_data_is_validated_once():
+    cache = TrustedADOCache()
+    data = serialization.loads(serialization.ado_json(make_sample_ado(3)))
+    data["name"] = "edited-by-client"
+
+    first = cache.validate(data)
+    assert first.name == "edited-by-client"
+    assert cache.validate(data) is first
+
+
+def test_invalid_data_is_rejected():
+    cache = TrustedADOCache()
+    data = serialization.loads(serialization.ado_json(make_sample_ado(2)))
+    data["files"][0]["type"] = "exe"
+    try:
+        cache.validate(data)
+    except ValueError:
+        return
+    raise AssertionError("invalid ADO was accepted")
+
+
+if __name__ == "__main__":
+    test_server_produced_ado_skips_validation()
+    test_unknown_data_is_validated_once()
+    test_invalid_data_is_rejected()
+    print("✅ Trusted ADO tests passed")
@@ -0,0 +1,58 @@
+"""
+Tests for WebSocket event encodings and their negotiation (no API key required)
+"""
+import asyncio
+from services.ws_codec import FramedCodec, JsonCodec, negotiate_codec
+from services.ws_sender import OutboundSender
+
+
+class StubWebSocket:
+    def __init__(self, subprotocols=None, query=None):
+        self.scope = {"subprotocols": subprotocols or []}
+        self.query_params = query or {}
+        self.frames = []
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+
+def test_framed_round_trip():
+    events = [{"event": "code_chunk", "path": "src/App.jsx", "chunk": "x" * 500}, {"event": "file_end", "path": "src/App.jsx"}]
+    codec = FramedCodec()
+    frame = codec.encode_batch(events)
+    assert frame[0] == 1  # compressed
+    assert FramedCodec.decode(frame) == events
+    assert FramedCodec.decode(FramedCodec(compress_level=0).encode_batch(events)) == events
+
+
+def test_negotiation():
+    codec, subprotocol = negotiate_codec(StubWebSocket(subprotocols=["xverta.framed"]))
+    assert codec.name == "framed" and subprotocol == "xverta.framed"
+
+    codec, subprotocol = negotiate_codec(StubWebSocket(query={"encoding": "framed"}))
+    assert codec.name == "framed" and subprotocol is None
+
+    codec, subprotocol = negotiate_codec(StubWebSocket(subprotocols=["xverta.bogus"]))
+    assert isinstance(codec, JsonCodec) and subprotocol is None
+
+
+def test_sender_batches_binary_frames():
+    async def scenario():
+        ws = StubWebSocket()
+        sender = OutboundSender(ws, codec=FramedCodec())
+        for i in range(10):
+            await sender.send_json({"event": "status", "message": str(i)})
+        await sender.close()
+        return ws.frames
+
+    frames = asyncio.run(scenario())
+    decoded = [event for frame in frames for event in FramedCodec.decode(frame)]
+    assert [e["message"] for e in decoded] == [str(i) for i in range(10)]
+    assert len(frames) < 10
+
+
+if __name__ == "__main__":
+    test_framed_round_trip()
+    test_negotiation()
+    test_sender_batches_binary_frames()
+    print("✅ WebSocket codec tests passed")
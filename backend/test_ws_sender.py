@@ -0,0 +1,74 @@
+"""
+Tests for the backpressure-aware outbound WebSocket sender (no API key required)
+"""
+import asyncio
+import json
+from services.ws_sender import OutboundSender
+
+
+class SlowWebSocket:
+    """Socket whose sends take a fixed delay, like a slow mobile client"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent = []
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(data))
+
+
+def test_frames_are_delivered_in_order():
+    async def scenario():
+        ws = SlowWebSocket(0)
+        sender = OutboundSender(ws)
+        for i in range(5):
+            await sender.send_json({"event": "status", "message": str(i)})
+        await sender.close()
+        return ws.sent
+
+    sent = asyncio.run(scenario())
+    assert [m["message"] for m in sent] == ["0", "1", "2", "3", "4"]
+
+
+def test_chunks_coalesce_when_client_falls_behind():
+    async def scenario():
+        ws = SlowWebSocket(0.01)
+        sender = OutboundSender(ws, high_water=100)
+        await sender.send_json({"event": "file_start", "path": "a.js"})
+        for i in range(20):
+            await sender.send_json({"event": "code_chunk", "path": "a.js", "chunk": f"{i};"})
+        await sender.send_json({"event": "file_end", "path": "a.js"})
+        await sender.close()
+        return ws.sent, sender
+
+    sent, sender = asyncio.run(scenario())
+    chunks = [m for m in sent if m["event"] == "code_chunk"]
+    assert "".join(c["chunk"] for c in chunks) == "".join(f"{i};" for i in range(20))
+    assert len(chunks) < 20
+    assert sender.coalesced == 20 - len(chunks)
+    assert sent[-1]["event"] == "file_end"
+
+
+def test_producer_pauses_at_high_water():
+    async def scenario():
+        ws = SlowWebSocket(0.005)
+        sender = OutboundSender(ws, high_water=4, low_water=1)
+        max_depth = 0
+        for i in range(20):
+            await sender.send_json({"event": "status", "message": str(i)})
+            max_depth = max(max_depth, sender.depth)
+        await sender.close()
+        return ws.sent, sender, max_depth
+
+    sent, sender, max_depth = asyncio.run(scenario())
+    assert len(sent) == 20
+    assert sender.pauses > 0
+    assert max_depth <= 4
+
+
+if __name__ == "__main__":
+    test_frames_are_delivered_in_order()
+    test_chunks_coalesce_when_client_falls_behind()
+    test_producer_pauses_at_high_water()
+    print("✅ Outbound sender tests passed")
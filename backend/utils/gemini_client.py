@@ -1,14 +1,17 @@
-import google.generativeai as genai
 import os
+from services.model_router import model_router
 
-# Load API key (note: must be GOOGLE_API_KEY now)
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+def generate_code(prompt: str, language: str = "python", model_name: str = None) -> str:
+    # Imported on first use; the SDK is slow to import
+    import google.generativeai as genai
 
-def generate_code(prompt: str, language: str = "python", model_name: str = "gemini-2.5-pro") -> str:
-    model = genai.GenerativeModel(model_name)
+    # Load API key (note: must be GOOGLE_API_KEY now)
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    # Without an explicit model, use the tier the router picks for components
+    route = model_router.route("component")
+    model = genai.GenerativeModel(model_name or route.model)
     response = model.generate_content(
-        f"Generate {language} code only. Do not add explanations.\n\nUser request:\n{prompt}"
+        f"Generate {language} code only. Do not add explanations.\n\nUser request:\n{prompt}",
+        generation_config={"max_output_tokens": route.max_output_tokens}
     )
     return response.text
-
-